@@ -33,9 +33,11 @@ export function PaymentModal({
 	onPaymentComplete,
 	isProcessing = false,
 }: PaymentModalProps) {
-	const [paymentMethod, setPaymentMethod] = useState<
-		"cash" | "upi" | "split"
-	>("cash");
+	// An order has a single payment (/checkout/ rejects mixed payment
+	// types), so there is no split between cash and UPI.
+	const [paymentMethod, setPaymentMethod] = useState<"cash" | "upi">(
+		"cash"
+	);
 	const [cashAmount, setCashAmount] = useState(finalAmount);
 	const [upiAmount, setUpiAmount] = useState(0);
 	const [upiId, setUpiId] = useState("");
@@ -56,57 +58,33 @@ export function PaymentModal({
 	useEffect(() => {
 		if (paymentMethod === "cash" && receivedCash > finalAmount) {
 			setChangeAmount(receivedCash - finalAmount);
-		} else if (paymentMethod === "split" && receivedCash > cashAmount) {
-			setChangeAmount(receivedCash - cashAmount);
 		} else {
 			setChangeAmount(0);
 		}
-	}, [receivedCash, finalAmount, cashAmount, paymentMethod]);
+	}, [receivedCash, finalAmount, paymentMethod]);
 
 	// Handle payment method change
 	const handlePaymentMethodChange = (value: string) => {
-		const method = value as "cash" | "upi" | "split";
+		const method = value as "cash" | "upi";
 		setPaymentMethod(method);
 		if (method === "cash") {
 			setCashAmount(finalAmount);
 			setUpiAmount(0);
 			setReceivedCash(finalAmount);
-		} else if (method === "upi") {
+		} else {
 			setCashAmount(0);
 			setUpiAmount(finalAmount);
 			setReceivedCash(0);
-		} else {
-			// Default split to 50/50
-			setCashAmount(Math.round(finalAmount / 2));
-			setUpiAmount(finalAmount - Math.round(finalAmount / 2));
-			setReceivedCash(Math.round(finalAmount / 2));
 		}
 	};
 
-	// Handle cash amount change when split payment
-	const handleCashAmountChange = (value: number) => {
-		const newCashAmount = Math.min(Math.max(0, value), finalAmount);
-		setCashAmount(newCashAmount);
-		setUpiAmount(finalAmount - newCashAmount);
-		setReceivedCash(newCashAmount);
-	};
-
-	// Handle UPI amount change when split payment
-	const handleUpiAmountChange = (value: number) => {
-		const newUpiAmount = Math.min(Math.max(0, value), finalAmount);
-		setUpiAmount(newUpiAmount);
-		setCashAmount(finalAmount - newUpiAmount);
-	};
-
 	// Process payment
 	const handleProcessPayment = async () => {
-		if (paymentMethod === "upi" || paymentMethod === "split") {
-			if (upiAmount > 0) {
-				const upiValidation = validateUpiId(upiId);
-				if (!upiValidation.isValid) {
-					toast.error(upiValidation.message || "Invalid UPI ID");
-					return;
-				}
+		if (paymentMethod === "upi") {
+			const upiValidation = validateUpiId(upiId);
+			if (!upiValidation.isValid) {
+				toast.error(upiValidation.message || "Invalid UPI ID");
+				return;
 			}
 		}
 
@@ -115,11 +93,6 @@ export function PaymentModal({
 			return;
 		}
 
-		if (paymentMethod === "split" && receivedCash < cashAmount) {
-			toast.error("Received cash amount is less than the cash portion");
-			return;
-		}
-
 		const paymentInfo: PaymentInfo = {
 			method: paymentMethod,
 			cashAmount,
@@ -151,10 +124,9 @@ export function PaymentModal({
 					value={paymentMethod}
 					onValueChange={handlePaymentMethodChange}
 				>
-					<TabsList className="grid w-full grid-cols-3">
+					<TabsList className="grid w-full grid-cols-2">
 						<TabsTrigger value="cash">Cash</TabsTrigger>
 						<TabsTrigger value="upi">UPI</TabsTrigger>
-						<TabsTrigger value="split">Split</TabsTrigger>
 					</TabsList>
 
 					<TabsContent value="cash" className="space-y-4">
@@ -210,93 +182,6 @@ export function PaymentModal({
 							</CardContent>
 						</Card>
 					</TabsContent>
-
-					<TabsContent value="split" className="space-y-4">
-						<Card>
-							<CardContent className="pt-6 space-y-4">
-								<div className="grid grid-cols-2 gap-4">
-									<div className="space-y-2">
-										<Label htmlFor="cash-amount">
-											Cash Amount (₹)
-										</Label>
-										<Input
-											id="cash-amount"
-											type="number"
-											step="0.01"
-											value={cashAmount}
-											onChange={(e) =>
-												handleCashAmountChange(
-													parseFloat(
-														e.target.value
-													) || 0
-												)
-											}
-										/>
-									</div>
-									<div className="space-y-2">
-										<Label htmlFor="upi-amount">
-											UPI Amount (₹)
-										</Label>
-										<Input
-											id="upi-amount"
-											type="number"
-											step="0.01"
-											value={upiAmount}
-											onChange={(e) =>
-												handleUpiAmountChange(
-													parseFloat(
-														e.target.value
-													) || 0
-												)
-											}
-										/>
-									</div>
-								</div>
-
-								<div className="space-y-2">
-									<Label htmlFor="received-cash-split">
-										Received Cash (₹)
-									</Label>
-									<Input
-										id="received-cash-split"
-										type="number"
-										step="0.01"
-										value={receivedCash}
-										onChange={(e) =>
-											setReceivedCash(
-												parseFloat(e.target.value) || 0
-											)
-										}
-									/>
-								</div>
-
-								{upiAmount > 0 && (
-									<div className="space-y-2">
-										<Label htmlFor="upi-id-split">
-											UPI ID
-										</Label>
-										<Input
-											id="upi-id-split"
-											placeholder="customer@paytm"
-											value={upiId}
-											onChange={(e) =>
-												setUpiId(e.target.value)
-											}
-										/>
-									</div>
-								)}
-
-								{changeAmount > 0 && (
-									<div className="p-3 bg-green-50 rounded-md">
-										<div className="text-sm font-medium text-green-800">
-											Change to return: ₹
-											{changeAmount.toFixed(2)}
-										</div>
-									</div>
-								)}
-							</CardContent>
-						</Card>
-					</TabsContent>
 				</Tabs>
 
 				<DialogFooter>
@@ -59,7 +59,8 @@ export function ShopSwitcher() {
 						shopId: selectedShop.shop_id,
 						shopname: selectedShop.shopname,
 					},
-					response.token
+					response.token,
+					response.refresh_token
 				);
 				toast.success(`Switched to ${selectedShop.shopname}`);
 
@@ -18,11 +18,12 @@ interface User {
 
 interface AuthContextType {
 	user: User | null;
-	login: (userData: User, token?: string) => void;
+	login: (userData: User, token?: string, refreshToken?: string) => void;
 	logout: () => void;
 	updateShop: (
 		shopData: { shopId: number; shopname: string },
-		token: string
+		token: string,
+		refreshToken?: string
 	) => void;
 	isAuthenticated: boolean;
 	isLoading: boolean;
@@ -58,25 +59,34 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
 		setIsLoading(false);
 	}, []);
 
-	const login = (userData: User, authToken?: string) => {
+	const login = (
+		userData: User,
+		authToken?: string,
+		refreshToken?: string
+	) => {
 		setUser(userData);
 		localStorage.setItem("userPhone", userData.phone);
 		localStorage.setItem("userData", JSON.stringify(userData));
 		if (authToken) {
 			localStorage.setItem("authToken", authToken);
 		}
+		if (refreshToken) {
+			localStorage.setItem("refreshToken", refreshToken);
+		}
 	};
 
 	const logout = () => {
 		setUser(null);
 		localStorage.removeItem("authToken");
+		localStorage.removeItem("refreshToken");
 		localStorage.removeItem("userPhone");
 		localStorage.removeItem("userData");
 	};
 
 	const updateShop = (
 		shopData: { shopId: number; shopname: string },
-		newToken: string
+		newToken: string,
+		refreshToken?: string
 	) => {
 		if (user) {
 			const updatedUser = {
@@ -87,6 +97,9 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
 			setUser(updatedUser);
 			localStorage.setItem("userData", JSON.stringify(updatedUser));
 			localStorage.setItem("authToken", newToken);
+			if (refreshToken) {
+				localStorage.setItem("refreshToken", refreshToken);
+			}
 		}
 	};
 
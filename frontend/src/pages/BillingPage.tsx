@@ -144,19 +144,6 @@ export default function BillingPage() {
 					payment_type: "upi" as const,
 					transaction_amount: orderSummary.finalAmount,
 				});
-			} else if (paymentInfo.method === "split") {
-				if (paymentInfo.cashAmount > 0) {
-					payments.push({
-						payment_type: "cash" as const,
-						transaction_amount: paymentInfo.cashAmount,
-					});
-				}
-				if (paymentInfo.upiAmount > 0) {
-					payments.push({
-						payment_type: "upi" as const,
-						transaction_amount: paymentInfo.upiAmount,
-					});
-				}
 			}
 
 			// Process complete order
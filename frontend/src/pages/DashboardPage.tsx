@@ -40,7 +40,22 @@ export default function DashboardPage() {
 		fetchDashboardData();
 		// Set up auto-refresh every 5 minutes
 		const interval = setInterval(fetchDashboardData, 5 * 60 * 1000);
-		return () => clearInterval(interval);
+
+		// Refresh as soon as the shop sells or restocks, batching bursts of events
+		let pending: ReturnType<typeof setTimeout> | undefined;
+		const unsubscribe = apiService.subscribeToShopEvents(
+			["order", "stock", "low_stock"],
+			() => {
+				clearTimeout(pending);
+				pending = setTimeout(fetchDashboardData, 2000);
+			}
+		);
+
+		return () => {
+			clearInterval(interval);
+			clearTimeout(pending);
+			unsubscribe();
+		};
 	}, []);
 
 	const fetchDashboardData = async () => {
@@ -77,7 +77,7 @@ const LoginPage = () => {
 			};
 
 			// Update authentication state with token
-			login(userData, data.token);
+			login(userData, data.token, data.refresh_token);
 
 			// Navigate to intended destination or dashboard
 			navigate(from, { replace: true });
@@ -68,7 +68,7 @@ const RegistrationPage = () => {
 				role: "manager" as const,
 			};
 			if (data.token) {
-				login(userData, data.token);
+				login(userData, data.token, data.refresh_token);
 				toast.success(
 					"Registration successful — you are now logged in."
 				);
@@ -62,7 +62,8 @@ export default function ShopManagementPage() {
 						shopId: selectedShop.shop_id,
 						shopname: selectedShop.shopname,
 					},
-					response.token
+					response.token,
+					response.refresh_token
 				);
 
 				toast.success(`Switched to ${selectedShop.shopname}`);
@@ -8,6 +8,7 @@ import { PaymentService } from "./api/payment";
 import { DashboardService } from "./api/dashboard";
 import { StaffService } from "./api/staff";
 import { ShopService } from "./api/shop";
+import { EventService } from "./api/events";
 
 // Re-export all types for convenience
 export * from "@/types/api";
@@ -25,6 +26,7 @@ class ApiService {
 	private dashboard: DashboardService;
 	private staff: StaffService;
 	private shop: ShopService;
+	private events: EventService;
 
 	constructor() {
 		this.auth = new AuthService();
@@ -35,6 +37,7 @@ class ApiService {
 		this.dashboard = new DashboardService();
 		this.staff = new StaffService();
 		this.shop = new ShopService();
+		this.events = new EventService();
 	}
 
 	// ==================== AUTH METHODS ====================
@@ -163,6 +166,10 @@ class ApiService {
 		return this.dashboard.getSalesData(...args);
 	}
 
+	subscribeToShopEvents(...args: Parameters<EventService["subscribe"]>) {
+		return this.events.subscribe(...args);
+	}
+
 	// ==================== STAFF METHODS ====================
 	listStaff(...args: Parameters<StaffService["listStaff"]>) {
 		return this.staff.listStaff(...args);
@@ -199,14 +206,12 @@ class ApiService {
 		payments: Parameters<PaymentService["addPayments"]>[0]
 	): Promise<{ success: boolean; order_id?: number; error?: string }> {
 		try {
-			// Step 1: Create order
-			const orderResult = await this.createOrder(orderData);
-
-			// Step 2: Add order items
-			await this.addOrderItems(items);
-
-			// Step 3: Add payments
-			await this.addPayments(payments);
+			// Order, items and payment are committed together by /checkout/
+			const orderResult = await this.order.checkout(
+				orderData,
+				items,
+				payments
+			);
 
 			return { success: true, order_id: orderResult.order_id };
 		} catch (error) {
@@ -6,20 +6,62 @@ export const API_BASE_URL =
 	(import.meta.env as Record<string, string>).VITE_API_BASE_URL ||
 	"http://localhost:8000/api";
 
+let pendingRefresh: Promise<string | null> | null = null;
+
+/**
+ * Exchange the stored refresh token for a new access token.
+ * Concurrent callers share one request. Resolves to null when the session
+ * cannot be refreshed (no refresh token, or it expired / was revoked).
+ */
+export function refreshAccessToken(): Promise<string | null> {
+	if (!pendingRefresh) {
+		pendingRefresh = (async () => {
+			const refreshToken = localStorage.getItem("refreshToken");
+			if (!refreshToken) return null;
+			try {
+				const response = await fetch(`${API_BASE_URL}/token/refresh/`, {
+					method: "POST",
+					headers: { "Content-Type": "application/json" },
+					body: JSON.stringify({ refresh_token: refreshToken }),
+				});
+				if (!response.ok) return null;
+				const data = await response.json();
+				localStorage.setItem("authToken", data.token);
+				return data.token as string;
+			} catch {
+				return null;
+			}
+		})().finally(() => {
+			pendingRefresh = null;
+		});
+	}
+	return pendingRefresh;
+}
+
 export class BaseApiService {
 	protected async makeRequest(endpoint: string, options: RequestInit = {}) {
 		const url = `${API_BASE_URL}${endpoint}`;
-		// Attach Authorization header when token is present in localStorage
+		const send = (token: string | null) =>
+			fetch(url, {
+				headers: {
+					"Content-Type": "application/json",
+					// Attach Authorization header when a token is available
+					...(token ? { Authorization: `Bearer ${token}` } : {}),
+					...options.headers,
+				},
+				...options,
+			});
+
 		const token = localStorage.getItem("authToken");
-		const defaultOptions: RequestInit = {
-			headers: {
-				"Content-Type": "application/json",
-				...(token ? { Authorization: `Bearer ${token}` } : {}),
-				...options.headers,
-			},
-		};
-
-		const response = await fetch(url, { ...defaultOptions, ...options });
+		let response = await send(token);
+
+		// Access tokens are short-lived: refresh once and retry
+		if (response.status === 401 && token) {
+			const newToken = await refreshAccessToken();
+			if (newToken) {
+				response = await send(newToken);
+			}
+		}
 
 		if (!response.ok) {
 			const errorData = await response
@@ -30,10 +30,10 @@ export class DashboardService extends BaseApiService {
 		}
 	}
 
-	async getExpiringSoon(): Promise<ExpiringItem[]> {
+	async getExpiringSoon(horizon: number = 30): Promise<ExpiringItem[]> {
 		try {
 			const response = await this.makeRequest(
-				"/dashboard/expiring-soon/"
+				`/dashboard/expiring-soon/?horizon=${horizon}`
 			);
 			return Array.isArray(response) ? response : [];
 		} catch (error) {
@@ -0,0 +1,59 @@
+// file: ./src/services/api/events.ts
+
+import { API_BASE_URL, refreshAccessToken } from "./base";
+
+export type ShopEventType = "stock" | "low_stock" | "order";
+
+export class EventService {
+	/**
+	 * Listen to the shop's server-sent events (/events/).
+	 * Returns a function that closes the stream.
+	 */
+	subscribe(
+		types: ShopEventType[],
+		onEvent: (type: ShopEventType, data: any) => void
+	): () => void {
+		if (
+			!localStorage.getItem("authToken") ||
+			typeof EventSource === "undefined"
+		) {
+			return () => {};
+		}
+
+		let source: EventSource | null = null;
+		let closed = false;
+		let failures = 0;
+		const open = (token: string) => {
+			// EventSource cannot send headers, so the token goes in the query string
+			const stream = new EventSource(
+				`${API_BASE_URL}/events/?token=${encodeURIComponent(token)}`
+			);
+			types.forEach((type) =>
+				stream.addEventListener(type, (event) =>
+					onEvent(type, JSON.parse((event as MessageEvent).data))
+				)
+			);
+			stream.onopen = () => {
+				failures = 0;
+			};
+			// A rejected reconnect (e.g. expired access token) closes the
+			// stream for good; reopen it once with a refreshed token. A second
+			// rejection in a row (e.g. 501 when the server is not running
+			// under ASGI) leaves the page on its regular polling.
+			stream.onerror = () => {
+				if (stream.readyState !== EventSource.CLOSED || closed) return;
+				if (++failures > 1) return;
+				refreshAccessToken().then((newToken) => {
+					if (newToken && !closed) open(newToken);
+				});
+			};
+			source = stream;
+		};
+		open(localStorage.getItem("authToken")!);
+
+		return () => {
+			closed = true;
+			source?.close();
+		};
+	}
+}
@@ -1,7 +1,7 @@
 // file: ./src/services/api/order.ts
 
 import { BaseApiService } from "./base";
-import type { OrderData, OrderItem } from "@/types/api";
+import type { OrderData, OrderItem, PaymentData } from "@/types/api";
 
 export class OrderService extends BaseApiService {
 	async createOrder(
@@ -22,6 +22,17 @@ export class OrderService extends BaseApiService {
 		});
 	}
 
+	async checkout(
+		orderData: OrderData,
+		items: OrderItem[],
+		payments: PaymentData[]
+	): Promise<{ message: string; order_id: number }> {
+		return this.makeRequest("/checkout/", {
+			method: "POST",
+			body: JSON.stringify({ order: orderData, items, payments }),
+		});
+	}
+
 	async getOrderItems(orderId: number): Promise<any[]> {
 		return this.makeRequest(`/orders/${orderId}/items/`);
 	}
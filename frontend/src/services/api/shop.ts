@@ -11,6 +11,7 @@ export interface Shop {
 export interface SwitchShopResponse {
 	success: boolean;
 	token: string;
+	refresh_token: string;
 	shop: Shop;
 }
 
@@ -126,8 +126,11 @@ export interface LowStockItem {
 export interface SaltPrediction {
 	month: number | null;
 	city: string;
+	scope?: "city" | "shop";
 	predicted_salts: string[];
 	selected_salt: string | null;
+	forecast?: { generic_name: string; predicted_units: number }[];
+	trained_at?: string | null;
 	note: string;
 }
 
@@ -21,7 +21,7 @@ export interface CustomerInfo {
 }
 
 export interface PaymentInfo {
-	method: "cash" | "upi" | "split";
+	method: "cash" | "upi";
 	cashAmount: number;
 	upiAmount: number;
 	upiId?: string;
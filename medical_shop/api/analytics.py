@@ -0,0 +1,156 @@
+"""Sales analytics computed with NumPy over columnar order-item data.
+
+`load_sales` fetches a shop's order items for a period with one query as
+columns (quantity, price, cost, product, category, weekday/hour). The report
+functions then aggregate those arrays with np.bincount instead of looping
+over rows in Python.
+
+`cached_report` stores results in the Django cache under a key that includes
+the shop's orders/catalog/stock versions (api.versioning), so any sale,
+price or catalog change makes the old entries unreachable.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+
+from api import versioning
+from api.models import OrderItem
+
+CACHE_TTL = 600
+VERSION_KINDS = ('orders', 'catalog', 'stock')
+
+
+class SalesColumns:
+    """Parallel arrays, one entry per order item."""
+
+    def __init__(self, rows):
+        n = len(rows)
+        self.quantity = np.fromiter((r[0] for r in rows), dtype=np.float64, count=n)
+        self.unit_price = np.fromiter((r[1] for r in rows), dtype=np.float64, count=n)
+        # NaN where the batch has no recorded purchase price
+        self.unit_cost = np.fromiter((np.nan if r[2] is None else r[2] for r in rows), dtype=np.float64, count=n)
+        self.weekday = np.fromiter((r[7] - 1 for r in rows), dtype=np.int64, count=n)  # Monday = 0
+        self.hour = np.fromiter((r[8] for r in rows), dtype=np.int64, count=n)
+
+        self.product_ids, self.product_codes = np.unique(
+            np.fromiter((r[3] for r in rows), dtype=np.int64, count=n), return_inverse=True
+        )
+        first = {}
+        for i, r in enumerate(rows):
+            first.setdefault(r[3], i)
+        self.product_info = {pid: rows[i][4:6] for pid, i in first.items()}
+
+        categories = np.array([r[6] or 'Uncategorized' for r in rows], dtype=str)
+        self.categories, self.category_codes = np.unique(categories, return_inverse=True)
+
+        self.revenue = self.quantity * self.unit_price
+        self.cost = self.quantity * self.unit_cost
+
+    def __len__(self):
+        return len(self.quantity)
+
+
+def load_sales(shop_id, days):
+    """Order items of the last `days` days for a shop, as SalesColumns."""
+    start = date.today() - timedelta(days=days)
+    rows = list(
+        OrderItem.objects.filter(order__shop_id=shop_id, order__order_date__gte=start)
+        .annotate(weekday=ExtractIsoWeekDay('order__order_date'), hour=ExtractHour('order__order_date'))
+        .values_list(
+            'quantity', 'unit_price', 'batch__average_purchase_price', 'batch__product_id',
+            'batch__product__generic_name', 'batch__product__brand_name',
+            'batch__product__therapeutic_category', 'weekday', 'hour',
+        )
+        .order_by()
+    )
+    return SalesColumns(rows)
+
+
+def _margin(revenue, cost):
+    """Margin over the items with a known cost, and the share of revenue that covers."""
+    known = ~np.isnan(cost)
+    known_revenue = float(revenue[known].sum())
+    gross_margin = known_revenue - float(cost[known].sum())
+    return {
+        'gross_margin': round(gross_margin, 2),
+        'margin_percent': round(100 * gross_margin / known_revenue, 2) if known_revenue else None,
+        'cost_coverage_percent': round(100 * known_revenue / float(revenue.sum()), 2) if revenue.sum() else None,
+    }
+
+
+def summary(sales):
+    return {
+        'items': len(sales),
+        'units': int(sales.quantity.sum()),
+        'revenue': round(float(sales.revenue.sum()), 2),
+        **_margin(sales.revenue, sales.cost),
+    }
+
+
+def top_products(sales, limit=10, by='revenue'):
+    """Best products by revenue, units or gross margin."""
+    n = len(sales.product_ids)
+    codes = sales.product_codes
+    known = ~np.isnan(sales.cost)
+    revenue = np.bincount(codes, weights=sales.revenue, minlength=n)
+    units = np.bincount(codes, weights=sales.quantity, minlength=n)
+    known_revenue = np.bincount(codes[known], weights=sales.revenue[known], minlength=n)
+    margin = known_revenue - np.bincount(codes[known], weights=sales.cost[known], minlength=n)
+
+    key = {'revenue': revenue, 'units': units, 'margin': margin}[by]
+    results = []
+    for i in np.argsort(-key, kind='stable')[:limit]:
+        generic_name, brand_name = sales.product_info[int(sales.product_ids[i])]
+        results.append({
+            'generic_name': generic_name,
+            'brand_name': brand_name,
+            'units': int(units[i]),
+            'revenue': round(float(revenue[i]), 2),
+            'gross_margin': round(float(margin[i]), 2),
+        })
+    return results
+
+
+def category_mix(sales):
+    """Revenue, units and margin per therapeutic category, largest first."""
+    n = len(sales.categories)
+    codes = sales.category_codes
+    known = ~np.isnan(sales.cost)
+    revenue = np.bincount(codes, weights=sales.revenue, minlength=n)
+    units = np.bincount(codes, weights=sales.quantity, minlength=n)
+    margin = np.bincount(codes[known], weights=sales.revenue[known] - sales.cost[known], minlength=n)
+    total = revenue.sum()
+    return [{
+        'category': str(sales.categories[i]),
+        'units': int(units[i]),
+        'revenue': round(float(revenue[i]), 2),
+        'share_percent': round(float(100 * revenue[i] / total), 2) if total else 0.0,
+        'gross_margin': round(float(margin[i]), 2),
+    } for i in np.argsort(-revenue, kind='stable')]
+
+
+def hourly_heatmap(sales):
+    """7 x 24 revenue and units matrices (rows Monday-Sunday, columns hours)."""
+    cells = sales.weekday * 24 + sales.hour
+    revenue = np.bincount(cells, weights=sales.revenue, minlength=7 * 24).reshape(7, 24)
+    units = np.bincount(cells, weights=sales.quantity, minlength=7 * 24).reshape(7, 24)
+    return {
+        'days': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+        'revenue': np.round(revenue, 2).tolist(),
+        'units': units.astype(int).tolist(),
+    }
+
+
+def cached_report(shop_id, name, params, compute):
+    """Return compute() from the cache, keyed by the shop's data versions."""
+    versions = versioning.get_versions(shop_id)
+    version = '.'.join(str(versions[kind]) for kind in VERSION_KINDS)
+    args = ':'.join(f'{k}={v}' for k, v in sorted(params.items()))
+    key = f'analytics:{shop_id}:{version}:{date.today().isoformat()}:{name}:{args}'
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, CACHE_TTL)
+    return result
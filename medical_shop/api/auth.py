@@ -1,49 +1,31 @@
 import jwt
+from asgiref.sync import sync_to_async
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
 from django.http import JsonResponse
 from functools import wraps
 from api.models import Shop, Staff, Manager
+from api.identity_cache import get_identity_cache, invalidate_account
+from api.revocation import revocations
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def generate_token(user=None, *, account_phone: str = None, shop_id: int = None, days_valid: int = 7):
-    """Generate a JWT token.
+DEFAULTS = {
+    'ACCESS_TTL': 900,
+    'REFRESH_TTL': 7 * 24 * 3600,
+    'ACCEPT_LEGACY': True,
+}
 
-    Payload fields:
-    - 'account': phone of the account performing actions (Manager or Staff)
-    - 'shop': shop_id of the shop context
 
-    For new Manager registrations, account will be the manager's phone and shop will be the shop_id.
-    """
-    # Determine account/shop
-    acct = account_phone
-    shop = shop_id
-    if user is not None:
-        try:
-            if isinstance(user, Manager):
-                acct = acct or str(user.phone)
-                # shop must be provided separately for Manager
-            elif isinstance(user, Shop):
-                # Shop instance - use manager as account if available
-                acct = acct or (str(user.manager.phone) if user.manager else None)
-                shop = shop or user.shop_id
-            elif isinstance(user, Staff):
-                acct = acct or str(user.phone)
-                shop = shop or user.shop.shop_id
-        except Exception:
-            # Fallback if types are unexpected
-            acct = acct or getattr(user, 'phone', None)
-            shop = shop or getattr(user, 'shop_id', None)
-
-    payload = {
-        'account': str(acct) if acct else None,
-        'shop': int(shop) if shop else None,
-        'exp': datetime.utcnow() + timedelta(days=days_valid),
-        'iat': datetime.utcnow(),
-    }
+def get_token_settings():
+    return {**DEFAULTS, **getattr(settings, 'AUTH_TOKENS', {})}
+
+
+def _encode(payload):
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
     # PyJWT >=2 returns str
     if isinstance(token, bytes):
@@ -51,6 +33,83 @@ def generate_token(user=None, *, account_phone: str = None, shop_id: int = None,
     return token
 
 
+def issue_tokens(account_phone, role, epoch, shop_id, shop_ids):
+    """Access and refresh tokens for an account acting in a shop.
+
+    The access token carries everything `jwt_required` needs, so it is
+    checked without queries:
+    - 'account': phone of the Manager or Staff account
+    - 'role': 'manager' or 'staff'
+    - 'shop': shop_id of the shop context
+    - 'shops': every shop_id the account may switch to
+    - 'epoch': the account's token_epoch; bumping it revokes the token
+
+    The refresh token only trades for new access tokens (/api/token/refresh/),
+    which re-reads the account, so role or shop changes apply by then.
+    """
+    options = get_token_settings()
+    now = datetime.utcnow()
+    claims = {
+        'account': str(account_phone),
+        'role': role,
+        'shop': int(shop_id),
+        'epoch': int(epoch),
+        'iat': now,
+    }
+    access = {
+        **claims,
+        'typ': 'access',
+        'shops': [int(s) for s in shop_ids],
+        'exp': now + timedelta(seconds=options['ACCESS_TTL']),
+    }
+    refresh = {**claims, 'typ': 'refresh', 'exp': now + timedelta(seconds=options['REFRESH_TTL'])}
+    return {
+        'token': _encode(access),
+        'refresh_token': _encode(refresh),
+        'expires_in': options['ACCESS_TTL'],
+    }
+
+
+def issue_tokens_for(account, shop_id):
+    """`issue_tokens` for a Manager or Staff, reading its current epoch and shops."""
+    if isinstance(account, Manager):
+        epoch = Manager.objects.values_list('token_epoch', flat=True).get(phone=account.phone)
+        shop_ids = list(Shop.objects.filter(manager_id=account.phone).order_by('shop_id').values_list('shop_id', flat=True))
+        return issue_tokens(account.phone, 'manager', epoch, shop_id, shop_ids)
+    epoch = Staff.objects.values_list('token_epoch', flat=True).get(phone=account.phone)
+    return issue_tokens(account.phone, 'staff', epoch, shop_id, [shop_id])
+
+
+def revoke_account_tokens(account):
+    """Revoke every token issued so far to a Manager or Staff (logout everywhere)."""
+    model = Manager if isinstance(account, Manager) else Staff
+    role = 'manager' if model is Manager else 'staff'
+    model.objects.filter(phone=account.phone).update(token_epoch=F('token_epoch') + 1)
+    epoch = model.objects.values_list('token_epoch', flat=True).get(phone=account.phone)
+    revocations.revoke_account(role, account.phone, epoch, get_token_settings()['ACCESS_TTL'])
+    # Legacy tokens are checked against the cached account's epoch
+    invalidate_account(account.phone)
+
+
+def revoke_removed_staff_tokens(phone, epoch):
+    """Reject every token of a removed staff member, for good.
+
+    Their Staff row, and with it token_epoch, is gone; `staff_start_epoch`
+    carries the epoch over when they are added back.
+    """
+    revocations.revoke_account('staff', phone, epoch + 1, None)
+
+
+def staff_start_epoch(phone):
+    """token_epoch for a new Staff row: above every token issued to the phone before."""
+    return revocations.min_epoch('staff', phone)
+
+
+def revoke_shop_tokens(shop_id):
+    """Reject unexpired access tokens for a deleted shop."""
+    revocations.revoke_shop(shop_id, get_token_settings()['ACCESS_TTL'])
+
+
 def decode_token(token):
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
@@ -62,10 +121,99 @@ def decode_token(token):
         raise
 
 
+def resolve_identity(account_phone, shop_id):
+    """Resolve token claims into a (Shop, Staff/Manager/None) pair.
+
+    Results are cached by `api.identity_cache`; raises Shop.DoesNotExist when
+    the shop in the token no longer exists.
+    """
+    account_phone = str(account_phone) if account_phone else None
+    shop_id = int(shop_id)
+    cache = get_identity_cache()
+    identity = cache.get(account_phone, shop_id)
+    if identity is not None:
+        return identity
+
+    shop = Shop.objects.select_related('manager').get(shop_id=shop_id)
+
+    # Resolve account: prefer Staff for the given shop, else Manager
+    account = None
+    if account_phone:
+        try:
+            account = Staff.objects.select_related('shop').get(phone=account_phone, shop=shop)
+        except Staff.DoesNotExist:
+            try:
+                account = Manager.objects.get(phone=account_phone)
+            except Manager.DoesNotExist:
+                account = None
+
+    identity = (shop, account)
+    cache.set(account_phone, shop_id, identity)
+    return identity
+
+
+def identity_from_claims(claims):
+    """Build the (Shop, Staff/Manager) pair for verified access-token claims.
+
+    No queries: the instances hold the keys the token carries and defer
+    their other fields, which load on first access.
+    """
+    shop_id = int(claims['shop'])
+    phone = claims['account']
+    if claims['role'] == 'manager':
+        shop = Shop.from_db(DEFAULT_DB_ALIAS, ['shop_id', 'manager_id'], [shop_id, phone])
+        account = Manager.from_db(DEFAULT_DB_ALIAS, ['phone'], [phone])
+    else:
+        shop = Shop.from_db(DEFAULT_DB_ALIAS, ['shop_id'], [shop_id])
+        account = Staff.from_db(DEFAULT_DB_ALIAS, ['phone', 'shop_id'], [phone, shop_id])
+    return shop, account
+
+
+def check_access_claims(payload):
+    """Return an error message if a decoded token may not authenticate requests.
+
+    Access tokens are checked against the revocation set. Tokens from before
+    access/refresh tokens (no 'typ') are accepted while
+    AUTH_TOKENS['ACCEPT_LEGACY'] is on, then resolved from the database and
+    checked with `check_legacy_identity`.
+    """
+    typ = payload.get('typ')
+    if typ == 'access':
+        if payload.get('shop') not in payload.get('shops', []):
+            return 'Invalid token payload.'
+        if revocations.is_revoked(payload):
+            return 'Token has been revoked.'
+        return None
+    if typ is None and get_token_settings()['ACCEPT_LEGACY']:
+        if not payload.get('shop'):
+            return 'Invalid token payload.'
+        if revocations.is_revoked(payload):
+            return 'Token has been revoked.'
+        return None
+    return 'Invalid authentication token.'
+
+
+def check_legacy_identity(payload, shop, account):
+    """Return an error message if a legacy token's account lost the shop or logged out.
+
+    Legacy tokens carry no epoch, so any logout since (token_epoch above 0)
+    revokes them.
+    """
+    if not payload.get('account'):
+        return None
+    if account is None or (isinstance(account, Manager) and shop.manager_id != account.phone):
+        return 'Token has been revoked.'
+    if account.token_epoch > payload.get('epoch', 0):
+        return 'Token has been revoked.'
+    return None
+
+
 def jwt_required(view_func):
     """Decorator for views to require a valid JWT in Authorization header.
 
-    On success, attaches `request.register_user` to the Shop instance.
+    On success, attaches `request.register_user` to the Shop instance,
+    `request.account_user` to the Staff/Manager making the call and
+    `request.token_claims` to the decoded token.
     """
 
     @wraps(view_func)
@@ -77,34 +225,26 @@ def jwt_required(view_func):
         token = auth_header.split(' ', 1)[1].strip()
         try:
             payload = decode_token(token)
+            error = check_access_claims(payload)
+            if error:
+                return JsonResponse({'error': error}, status=401)
 
-            # Get account phone and shop_id from token
-            account_phone = payload.get('account')
-            shop_id = payload.get('shop')
-
-            if not shop_id:
-                return JsonResponse({'error': 'Invalid token payload.'}, status=401)
-
-            # Resolve shop
-            try:
-                shop = Shop.objects.get(shop_id=shop_id)
-            except Shop.DoesNotExist:
-                return JsonResponse({'error': 'Shop not found for token.'}, status=401)
-
-            # Resolve account: prefer Staff for the given shop, else Manager
-            account = None
-            if account_phone:
+            if payload.get('typ') == 'access':
+                shop, account = identity_from_claims(payload)
+            else:
+                # Legacy token: resolve shop and account, from the identity cache when possible
                 try:
-                    account = Staff.objects.get(phone=account_phone, shop=shop)
-                except Staff.DoesNotExist:
-                    try:
-                        account = Manager.objects.get(phone=account_phone)
-                    except Manager.DoesNotExist:
-                        account = None
+                    shop, account = resolve_identity(payload.get('account'), payload.get('shop'))
+                except Shop.DoesNotExist:
+                    return JsonResponse({'error': 'Shop not found for token.'}, status=401)
+                error = check_legacy_identity(payload, shop, account)
+                if error:
+                    return JsonResponse({'error': error}, status=401)
 
             # Attach for downstream
             request.register_user = shop
             request.account_user = account
+            request.token_claims = payload
             return view_func(request, *args, **kwargs)
 
         except jwt.ExpiredSignatureError:
@@ -113,3 +253,48 @@ def jwt_required(view_func):
             return JsonResponse({'error': 'Invalid authentication token.'}, status=401)
 
     return _wrapped
+
+
+def async_jwt_required(view_func):
+    """`jwt_required` for async views.
+
+    The token may also be passed as `?token=`, because browser EventSource
+    connections cannot set an Authorization header.
+    """
+
+    @wraps(view_func)
+    async def _wrapped(request, *args, **kwargs):
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+        if auth_header.startswith('Bearer '):
+            token = auth_header.split(' ', 1)[1].strip()
+        else:
+            token = request.GET.get('token', '').strip()
+        if not token:
+            return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+
+        try:
+            payload = decode_token(token)
+            # Reads the revocation table when the cache misses
+            error = await sync_to_async(check_access_claims)(payload)
+            if error:
+                return JsonResponse({'error': error}, status=401)
+            if payload.get('typ') == 'access':
+                shop, account = identity_from_claims(payload)
+            else:
+                shop, account = await sync_to_async(resolve_identity)(payload.get('account'), payload.get('shop'))
+                error = check_legacy_identity(payload, shop, account)
+                if error:
+                    return JsonResponse({'error': error}, status=401)
+        except Shop.DoesNotExist:
+            return JsonResponse({'error': 'Shop not found for token.'}, status=401)
+        except jwt.ExpiredSignatureError:
+            return JsonResponse({'error': 'Token has expired.'}, status=401)
+        except Exception:
+            return JsonResponse({'error': 'Invalid authentication token.'}, status=401)
+
+        request.register_user = shop
+        request.account_user = account
+        request.token_claims = payload
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped
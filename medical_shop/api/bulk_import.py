@@ -0,0 +1,273 @@
+"""Bulk import of products and batches from CSV or JSON.
+
+Rows are read lazily (`read_rows`) and handled CHUNK_SIZE at a time. Each
+chunk is validated row by row, batch rows get their product_id resolved
+with one IN query, and the valid rows are upserted with a single
+bulk_create(update_conflicts=True) on the model's unique key. Only the
+columns present in the input are overwritten on conflict, and a batch's
+quantity_in_stock is set, not added to.
+
+Each chunk commits on its own. When the file turns out to be malformed
+part way through, the rows read before that point stay imported and the
+report's `read_error` says where reading stopped.
+
+bulk_create sends no signals, so every chunk then refreshes the derived
+data itself: the search index, version counters, sync change log and stock
+totals (through signals.stock_changed).
+"""
+import codecs
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection
+
+from api import changelog, search_index, versioning
+from api.models import Batch, Product
+from api.signals import stock_changed
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 1000
+
+PRODUCT_FIELDS = ['brand_name', 'generic_name', 'hsn', 'gst', 'prescription_required',
+                  'composition_id', 'therapeutic_category', 'reorder_point']
+BATCH_FIELDS = ['expiry_date', 'average_purchase_price', 'selling_price', 'quantity_in_stock']
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', ''}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, content_type):
+    """Yield dict rows from a binary stream of CSV, NDJSON or a JSON array."""
+    if 'json' in content_type:
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        rows = json.load(stream)
+        if not isinstance(rows, list):
+            raise ValueError('JSON body must be an array of objects')
+        yield from rows
+        return
+    yield from csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+
+
+def _text(row, field, max_length, required=False):
+    value = str(row.get(field) if row.get(field) is not None else '').strip()
+    if required and not value:
+        raise RowError(f'{field} is required')
+    if len(value) > max_length:
+        raise RowError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def _decimal(row, field, default=None):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        return default
+    try:
+        return Decimal(str(value).strip())
+    except InvalidOperation:
+        raise RowError(f'{field} must be a number')
+
+
+def _integer(row, field, default=None, minimum=None):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        return default
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise RowError(f'{field} must be a whole number')
+    if minimum is not None and number < minimum:
+        raise RowError(f'{field} must be at least {minimum}')
+    return number
+
+
+def _boolean(row, field):
+    value = str(row.get(field, '')).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f'{field} must be true or false')
+
+
+def _date(row, field):
+    value = _text(row, field, 10, required=True)
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f'{field} must be a YYYY-MM-DD date')
+
+
+def _product(shop, row):
+    return Product(
+        shop=shop,
+        product_id=_text(row, 'product_id', 10, required=True),
+        generic_name=_text(row, 'generic_name', 100, required=True),
+        brand_name=_text(row, 'brand_name', 100),
+        hsn=_text(row, 'hsn', 50),
+        gst=_decimal(row, 'gst', Decimal('0')),
+        prescription_required=_boolean(row, 'prescription_required'),
+        composition_id=_integer(row, 'composition_id'),
+        therapeutic_category=_text(row, 'therapeutic_category', 100),
+        reorder_point=_integer(row, 'reorder_point', 10, minimum=0),
+    )
+
+
+def _batch(shop, row, product_pks):
+    code = _text(row, 'product_id', 10, required=True)
+    if code not in product_pks:
+        raise RowError(f'Product {code} does not exist in your shop')
+    selling_price = _decimal(row, 'selling_price')
+    if selling_price is None:
+        raise RowError('selling_price is required')
+    return Batch(
+        shop=shop,
+        product_id=product_pks[code],
+        batch_number=_text(row, 'batch_number', 50, required=True),
+        expiry_date=_date(row, 'expiry_date'),
+        average_purchase_price=_decimal(row, 'average_purchase_price'),
+        selling_price=selling_price,
+        quantity_in_stock=_integer(row, 'quantity_in_stock', 0, minimum=0),
+    )
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.errors = []
+        self.error_count = 0
+        self.read_error = None
+
+    def error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+        }
+
+
+def _chunks(rows, size, report):
+    """Yield chunks of numbered rows, stopping at the first unreadable one."""
+    numbered = enumerate(rows, start=1)
+    while True:
+        chunk = []
+        try:
+            chunk.extend(islice(numbered, size))
+        except (ValueError, csv.Error) as e:
+            # json.JSONDecodeError and UnicodeDecodeError are ValueErrors too
+            read = report.rows + len(chunk)
+            report.read_error = f'Could not read import file after row {read}: {e}' if read else f'Could not read import file: {e}'
+            if chunk:
+                yield chunk
+            return
+        if not chunk:
+            return
+        yield chunk
+
+
+def _upsert(model, objects, unique_fields, update_fields):
+    """bulk_create `objects`, overwriting `update_fields` of rows that already exist."""
+    if not update_fields:
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        return
+    # MySQL's ON DUPLICATE KEY UPDATE matches on the table's unique keys and
+    # cannot be given one
+    target = unique_fields if connection.features.supports_update_conflicts_with_target else None
+    model.objects.bulk_create(objects, update_conflicts=True, unique_fields=target, update_fields=update_fields)
+
+
+def _validate(chunk, build, report, key):
+    """Build objects for valid rows, keeping the last row for each unique key."""
+    objects = {}
+    for number, row in chunk:
+        report.rows += 1
+        if not isinstance(row, dict):
+            report.error(number, 'Row must be an object')
+            continue
+        try:
+            obj = build(row)
+        except RowError as e:
+            report.error(number, str(e))
+            continue
+        objects[key(obj)] = obj
+    return list(objects.values())
+
+
+def _columns(chunk, fields):
+    present = set()
+    for _, row in chunk:
+        if isinstance(row, dict):
+            present.update(row)
+    return [field for field in fields if field in present]
+
+
+def import_products(shop, rows, chunk_size=CHUNK_SIZE):
+    report = ImportReport()
+    for chunk in _chunks(rows, chunk_size, report):
+        products = _validate(chunk, lambda row: _product(shop, row), report, lambda p: p.product_id)
+        update_fields = _columns(chunk, PRODUCT_FIELDS)
+        if not products:
+            continue
+        codes = [p.product_id for p in products]
+        with versioning.writing():
+            before = {
+                code: names for code, *names in
+                Product.objects.filter(shop=shop, product_id__in=codes).values_list('product_id', 'generic_name', 'brand_name')
+            }
+            _upsert(Product, products, ['product_id', 'shop'], update_fields)
+            # Not every backend returns primary keys from an upsert
+            saved = list(Product.objects.filter(shop=shop, product_id__in=codes))
+            renamed = [p for p in saved if before.get(p.product_id) != [p.generic_name, p.brand_name]]
+            versioning.bump(shop.shop_id, 'catalog')
+            changelog.record(shop.shop_id, 'product', codes)
+            search_index.index_products(renamed)
+            stock_changed(shop.shop_id, [p.pk for p in renamed])
+            # Synced batches carry the product names
+            changelog.record(shop.shop_id, 'batch', Batch.objects.filter(
+                product__in=[p for p in renamed if p.product_id in before]
+            ).values_list('id', flat=True))
+        report.imported += len(products)
+    return report
+
+
+def import_batches(shop, rows, chunk_size=CHUNK_SIZE):
+    report = ImportReport()
+    for chunk in _chunks(rows, chunk_size, report):
+        codes = {str(row.get('product_id', '')).strip() for _, row in chunk if isinstance(row, dict)}
+        product_pks = dict(Product.objects.filter(shop=shop, product_id__in=codes).values_list('product_id', 'id'))
+        batches = _validate(chunk, lambda row: _batch(shop, row, product_pks), report,
+                            lambda b: (b.batch_number, b.product_id))
+        update_fields = _columns(chunk, BATCH_FIELDS)
+        if not batches:
+            continue
+        with versioning.writing():
+            _upsert(Batch, batches, ['batch_number', 'product', 'shop'], update_fields)
+            keys = {(b.batch_number, b.product_id) for b in batches}
+            saved_ids = [
+                batch_id for batch_id, *key in
+                Batch.objects.filter(shop=shop, batch_number__in={number for number, _ in keys})
+                .values_list('id', 'batch_number', 'product_id')
+                if tuple(key) in keys
+            ]
+            stock_changed(shop.shop_id, {product_id for _, product_id in keys})
+            changelog.record(shop.shop_id, 'batch', saved_ids)
+        report.imported += len(batches)
+    return report
@@ -0,0 +1,112 @@
+"""Read-through cache of each shop's serialized catalog reads.
+
+The product list, the batch list and medicine search results are stored as
+encoded JSON in the Django cache named by CATALOG_CACHE['CACHE_ALIAS']. It
+can be local memory for a single node, or file-based or Redis when several
+workers share it (see CACHES in settings). A hit returns the stored bytes
+without querying or serializing the catalog.
+
+Keys belong to one shop and carry its data version counters
+(api.versioning), e.g. `catalog:12:batches:41.907`. The signal handlers in
+api.signals, and the bulk paths that bypass signals, bump those counters on
+every product or batch change. A write therefore makes later reads miss
+without deleting anything, and unreachable entries expire after TTL.
+Search keys also carry the date, because results leave out expired
+batches.
+
+Hits and misses are counted per kind in this process and exported at
+/api/_metrics.
+"""
+import hashlib
+import json
+import threading
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api import metrics
+from api.versioning import get_versions
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'catalog',
+    'TTL': 3600,
+}
+
+# kind -> data version counters its content depends on
+KINDS = {
+    'products': ('catalog',),
+    'batches': ('catalog', 'stock'),
+    'search': ('catalog', 'stock'),
+}
+
+
+def get_settings():
+    return {**DEFAULTS, **getattr(settings, 'CATALOG_CACHE', {})}
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = dict.fromkeys(KINDS, 0)
+        self.misses = dict.fromkeys(KINDS, 0)
+
+    def record(self, kind, hit):
+        with self._lock:
+            counts = self.hits if hit else self.misses
+            counts[kind] += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = dict.fromkeys(KINDS, 0)
+            self.misses = dict.fromkeys(KINDS, 0)
+
+    def collect(self):
+        with self._lock:
+            samples = [({'kind': kind, 'result': 'hit'}, self.hits[kind]) for kind in KINDS]
+            samples += [({'kind': kind, 'result': 'miss'}, self.misses[kind]) for kind in KINDS]
+        return [('catalog_cache_requests_total', 'counter', 'Catalog cache lookups, by kind and result.', samples)]
+
+
+stats = CacheStats()
+metrics.register_collector(stats.collect)
+
+
+def make_key(kind, shop_id, versions, variant=''):
+    stamp = '.'.join(str(versions[name]) for name in KINDS[kind])
+    key = f'catalog:{shop_id}:{kind}:{stamp}'
+    return f'{key}:{variant}' if variant else key
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+
+def get_or_build(kind, shop_id, build, versions=None, variant=''):
+    """Return the encoded JSON for a shop's `kind` read, calling `build()` on a miss.
+
+    `versions` are the shop's data version counters. The `versioned` view
+    decorator has already read them (request.data_versions); otherwise they
+    are read here. They must be read before `build()` runs, so a concurrent
+    write can only leave newer data under an older key.
+    """
+    options = get_settings()
+    if not options['ENABLED']:
+        return encode(build())
+
+    key = make_key(kind, shop_id, versions or get_versions(shop_id), variant)
+    cache = caches[options['CACHE_ALIAS']]
+    content = cache.get(key)
+    stats.record(kind, content is not None)
+    if content is None:
+        content = encode(build())
+        cache.set(key, content, options['TTL'])
+    return content
+
+
+def search_variant(query):
+    """Key suffix for a search: the normalized query and today's date."""
+    digest = hashlib.sha1(query.lower().encode('utf-8')).hexdigest()[:16]
+    return f'{date.today().isoformat()}:{digest}'
@@ -0,0 +1,88 @@
+"""Product/Batch change log (CatalogChange) behind the delta sync endpoint.
+
+Signal handlers in api.signals, and bulk paths that bypass signals, append
+one row per changed product or batch, with `deleted` set for tombstones. A
+client's sync token is the id of the last change it has seen.
+
+Entries are written in the same transaction as the change, while it holds
+the shop's version row lock (`versioning.lock`; inside a
+`versioning.writing()` block, at its end). A shop's change ids are therefore
+committed in increasing order, so a reader never skips over an id that is
+still uncommitted, and a change is never committed without its entries.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api import versioning
+from api.models import CatalogChange, ShopDataVersion
+
+
+def record(shop_id, kind, keys, deleted=False):
+    """Log that the given products (by product_id) or batches (by id) changed."""
+    keys = sorted({str(key) for key in keys})
+    if not keys:
+        return
+
+    def write():
+        with transaction.atomic():
+            if not versioning.lock(shop_id):
+                return
+            CatalogChange.objects.bulk_create([
+                CatalogChange(shop_id=shop_id, kind=kind, key=key, deleted=deleted) for key in keys
+            ])
+
+    versioning.defer(shop_id, write)
+
+
+def last_change_id(shop_id):
+    return CatalogChange.objects.filter(shop_id=shop_id).aggregate(last=Max('id'))['last'] or 0
+
+
+def sync_floor(shop_id):
+    """Oldest token still answerable with a delta; older tokens need a reset."""
+    return ShopDataVersion.objects.filter(shop_id=shop_id).values_list('sync_floor', flat=True).first() or 0
+
+
+def changes_since(shop_id, since, limit):
+    """Collapse up to `limit` changes after `since` into their latest state.
+
+    Returns ({kind: changed keys}, {kind: deleted keys}, last id, has_more).
+    """
+    rows = list(
+        CatalogChange.objects.filter(shop_id=shop_id, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'kind', 'key', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for _, kind, key, deleted in rows:
+        latest[(kind, key)] = deleted
+
+    changed = {kind: set() for kind, _ in CatalogChange.KINDS}
+    deleted = {kind: set() for kind, _ in CatalogChange.KINDS}
+    for (kind, key), is_deleted in latest.items():
+        (deleted if is_deleted else changed)[kind].add(key)
+    return changed, deleted, (rows[-1][0] if rows else since), has_more
+
+
+def prune(days, shop_id=None):
+    """Delete changes older than `days` days and raise the shops' sync floors.
+
+    Returns the number of deleted entries.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    changes = CatalogChange.objects.filter(changed_at__lt=cutoff)
+    if shop_id is not None:
+        changes = changes.filter(shop_id=shop_id)
+
+    deleted = 0
+    for row in changes.values('shop_id').annotate(last=Max('id')):
+        ShopDataVersion.objects.get_or_create(shop_id=row['shop_id'])
+        ShopDataVersion.objects.filter(shop_id=row['shop_id'], sync_floor__lt=row['last']).update(sync_floor=row['last'])
+        deleted += CatalogChange.objects.filter(shop_id=row['shop_id'], id__lte=row['last']).delete()[0]
+    return deleted
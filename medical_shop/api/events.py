@@ -0,0 +1,194 @@
+"""Per-shop push events for the server-sent events endpoint (/api/events/).
+
+Writes publish small events after commit:
+- 'stock': a batch's quantity_in_stock changed (or the batch was deleted)
+- 'low_stock': a batch dropped below SHOP_EVENTS['LOW_STOCK_THRESHOLD']
+- 'order': an order was placed
+
+Open event streams wait on a broker subscription, so idle dashboards cost no
+database queries. Brokers (settings.SHOP_EVENTS['BROKER']):
+- 'local': in-process pub/sub (default without REDIS_URL); only reaches
+  streams served by the process that made the write, so it suits a single
+  worker
+- 'redis': Redis pub/sub at SHOP_EVENTS['REDIS_URL'], required when several
+  worker processes serve writes and streams (needs redis>=5.0.1)
+- a dotted path to a class with publish(shop_id, event) and subscribe(shop_id)
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BROKER': 'local',
+    'LOW_STOCK_THRESHOLD': 10,
+    'KEEPALIVE': 15,
+    'QUEUE_SIZE': 100,
+    'REDIS_URL': 'redis://localhost:6379/0',
+}
+
+
+def options():
+    return {**DEFAULTS, **getattr(settings, 'SHOP_EVENTS', {})}
+
+
+class LocalSubscription:
+    def __init__(self, broker, shop_id, maxsize):
+        self.broker = broker
+        self.shop_id = shop_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        # Runs on the subscriber's loop; a slow client loses its oldest events
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process pub/sub; publish() is safe to call from any thread."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, shop_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(shop_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self._unsubscribe(subscription)
+
+    def subscribe(self, shop_id):
+        """Must be called from the event loop that will read the subscription."""
+        subscription = LocalSubscription(self, shop_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(shop_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.shop_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.shop_id]
+
+
+class RedisSubscription:
+    def __init__(self, broker, shop_id):
+        self.broker = broker
+        self.channel = broker.channel(shop_id)
+        self._client = None
+        self._pubsub = None
+
+    async def get(self, timeout):
+        if self._pubsub is None:
+            self._client = self.broker.redis.asyncio.from_url(self.broker.url)
+            self._pubsub = self._client.pubsub()
+            await self._pubsub.subscribe(self.channel)
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+    async def aclose(self):
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            await self._client.aclose()
+
+
+class RedisBroker:
+    """Redis pub/sub with one channel per shop."""
+
+    def __init__(self, url, prefix='shop-events'):
+        try:
+            import redis
+            import redis.asyncio  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured("SHOP_EVENTS['BROKER'] = 'redis' requires the redis package")
+        self.redis = redis
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def channel(self, shop_id):
+        return f'{self.prefix}:{shop_id}'
+
+    def publish(self, shop_id, event):
+        self._client.publish(self.channel(shop_id), json.dumps(event, cls=DjangoJSONEncoder))
+
+    def subscribe(self, shop_id):
+        return RedisSubscription(self, shop_id)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured in settings."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                opts = options()
+                backend = opts['BROKER']
+                if backend == 'local':
+                    _broker = LocalBroker(queue_size=opts['QUEUE_SIZE'])
+                elif backend == 'redis':
+                    _broker = RedisBroker(opts['REDIS_URL'])
+                else:
+                    _broker = import_string(backend)()
+    return _broker
+
+
+def publish(shop_id, event_type, data):
+    """Publish an event to the shop's streams once the transaction commits."""
+    event = {'type': event_type, 'data': data}
+    # robust: a broker outage must not fail a write that already committed
+    transaction.on_commit(lambda: get_broker().publish(shop_id, event), robust=True)
+
+
+def stock_moved(shop_id, batch, old_quantity, new_quantity, deleted=False):
+    """Publish 'stock' (and 'low_stock' on crossing the threshold) for a batch."""
+    if old_quantity == new_quantity and not deleted:
+        return
+    data = {
+        'batch_id': batch.id,
+        'batch_number': batch.batch_number,
+        'quantity_in_stock': new_quantity,
+    }
+    if deleted:
+        publish(shop_id, 'stock', {**data, 'deleted': True})
+        return
+    publish(shop_id, 'stock', data)
+    threshold = options()['LOW_STOCK_THRESHOLD']
+    if new_quantity < threshold <= (old_quantity if old_quantity is not None else threshold):
+        publish(shop_id, 'low_stock', {**data, 'threshold': threshold})
+
+
+def order_placed(order):
+    publish(order.shop_id, 'order', {
+        'order_id': order.order_id,
+        'total_amount': order.total_amount,
+        'order_date': order.order_date,
+    })
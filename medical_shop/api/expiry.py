@@ -0,0 +1,100 @@
+"""Expiry bucket summary (ShopExpiryBucket) behind the dashboard expiry tile.
+
+`refresh_summary` buckets every in-stock batch by days to expiry with one
+conditional aggregate per run and replaces the shops' rows in one
+transaction. It is meant to run nightly
+(`manage.py refresh_expiry_summary`). `get_summary` serves the stored rows
+and recomputes a shop's rows itself when they are from an earlier day, so a
+missed cron run only costs one scan.
+"""
+from datetime import date, timedelta
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from api.models import Batch, Shop, ShopExpiryBucket
+
+# bucket -> (first day, last day) relative to today; None is open-ended
+BUCKET_RANGES = {
+    'expired': (None, -1),
+    '7d': (0, 7),
+    '30d': (8, 30),
+    '90d': (31, 90),
+}
+
+
+def _bucket_filter(today, first, last):
+    condition = Q(expiry_date__lte=today + timedelta(days=last))
+    if first is not None:
+        condition &= Q(expiry_date__gte=today + timedelta(days=first))
+    return condition
+
+
+def refresh_summary(shop_id=None):
+    """Recompute the expiry buckets of one shop, or of every shop.
+
+    Returns the number of rows written.
+    """
+    return len(_refresh(shop_id))
+
+
+def _refresh(shop_id):
+    today = date.today()
+    # Stock is valued at cost, falling back to the selling price
+    value = ExpressionWrapper(
+        F('quantity_in_stock') * Coalesce('average_purchase_price', 'selling_price'),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    aggregates = {}
+    for bucket, (first, last) in BUCKET_RANGES.items():
+        condition = _bucket_filter(today, first, last)
+        aggregates[f'{bucket}__batch_count'] = Count('id', filter=condition)
+        aggregates[f'{bucket}__units'] = Sum('quantity_in_stock', filter=condition)
+        aggregates[f'{bucket}__value_at_risk'] = Sum(value, filter=condition)
+
+    batches = Batch.objects.filter(
+        quantity_in_stock__gt=0,
+        expiry_date__lte=today + timedelta(days=max(last for _, last in BUCKET_RANGES.values())),
+    )
+    shops = Shop.objects.all()
+    if shop_id is not None:
+        batches = batches.filter(shop_id=shop_id)
+        shops = shops.filter(shop_id=shop_id)
+    totals = {row.pop('shop_id'): row for row in batches.values('shop_id').annotate(**aggregates)}
+
+    rows = []
+    for sid in shops.values_list('shop_id', flat=True):
+        shop_totals = totals.get(sid, {})
+        for bucket in BUCKET_RANGES:
+            rows.append(ShopExpiryBucket(
+                shop_id=sid,
+                bucket=bucket,
+                computed_on=today,
+                batch_count=shop_totals.get(f'{bucket}__batch_count') or 0,
+                units=shop_totals.get(f'{bucket}__units') or 0,
+                value_at_risk=shop_totals.get(f'{bucket}__value_at_risk') or 0,
+            ))
+    # Delete and insert rather than upsert: MySQL cannot target the
+    # (shop, bucket) key in bulk_create(update_conflicts=True)
+    stale = ShopExpiryBucket.objects.all()
+    if shop_id is not None:
+        stale = stale.filter(shop_id=shop_id)
+    with transaction.atomic():
+        stale.delete()
+        ShopExpiryBucket.objects.bulk_create(rows, batch_size=1000)
+    return rows
+
+
+def get_summary(shop_id):
+    """Return the shop's bucket rows, recomputing them if not from today."""
+    rows = list(ShopExpiryBucket.objects.filter(shop_id=shop_id))
+    if len(rows) != len(BUCKET_RANGES) or any(row.computed_on != date.today() for row in rows):
+        try:
+            rows = _refresh(shop_id)
+        except (IntegrityError, OperationalError):
+            # Another request replaced the same rows concurrently (duplicate
+            # key or deadlock); read what it wrote
+            rows = list(ShopExpiryBucket.objects.filter(shop_id=shop_id))
+    order = list(BUCKET_RANGES)
+    return sorted(rows, key=lambda row: order.index(row.bucket))
@@ -0,0 +1,289 @@
+"""Streamed export of a shop's products, batches, orders and payments.
+
+Rows are read in keyset pages (`pk > last ORDER BY pk LIMIT n`) rather than
+with one big SELECT. MySQL drivers buffer a whole result set client-side,
+so each page acts as the server-side cursor and memory stays bounded by
+PAGE_SIZE whatever the table size. Pages are encoded as they arrive, either
+as CSV or as the columnar format below, and can be gzipped on the fly.
+
+Columnar format (".mpc"): written one row group (one page) at a time.
+
+    b'MPCOL1\\n'
+    uint32 length + JSON header {"kind", "columns": [{"name", "type", "scale"?}]}
+    per row group: uint32 row count, then per column:
+        uint32 byte length of the block that follows
+        uint8 has-nulls flag [+ packed null bitmap, one bit per row]
+        values: int64 / float64 / bool (uint8) / date (int32 days since
+        1970-01-01) / timestamp (int64 microseconds since 1970-01-01) /
+        decimal (int64 scaled by 10**scale) / string (uint32 offsets for
+        n + 1 positions, then the UTF-8 data)
+    uint32 0 (end)
+
+All integers are little-endian. Nulls are stored as zero values. A reader
+can skip a column using its block length. `read_columnar` decodes a file.
+"""
+import csv
+import io
+import json
+import struct
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import models
+
+from api.models import Batch, Order, OrderItem, Payment, Product
+
+PAGE_SIZE = 2000
+MAGIC = b'MPCOL1\n'
+EPOCH = date(1970, 1, 1)
+EPOCH_DATETIME = datetime(1970, 1, 1)
+
+# kind -> (model, shop lookup, [(column, field lookup)])
+EXPORTS = {
+    'products': (Product, 'shop_id', [
+        ('product_id', 'product_id'),
+        ('generic_name', 'generic_name'),
+        ('brand_name', 'brand_name'),
+        ('hsn', 'hsn'),
+        ('gst', 'gst'),
+        ('prescription_required', 'prescription_required'),
+        ('composition_id', 'composition_id'),
+        ('therapeutic_category', 'therapeutic_category'),
+        ('reorder_point', 'reorder_point'),
+        ('stock_on_hand', 'stock_on_hand'),
+    ]),
+    'batches': (Batch, 'shop_id', [
+        ('id', 'id'),
+        ('product_id', 'product__product_id'),
+        ('batch_number', 'batch_number'),
+        ('expiry_date', 'expiry_date'),
+        ('average_purchase_price', 'average_purchase_price'),
+        ('selling_price', 'selling_price'),
+        ('quantity_in_stock', 'quantity_in_stock'),
+    ]),
+    'orders': (Order, 'shop_id', [
+        ('order_id', 'order_id'),
+        ('order_date', 'order_date'),
+        ('customer_name', 'customer_name'),
+        ('customer_number', 'customer_number'),
+        ('doctor_name', 'doctor_name'),
+        ('discount_percentage', 'discount_percentage'),
+        ('total_amount', 'total_amount'),
+    ]),
+    'order-items': (OrderItem, 'order__shop_id', [
+        ('id', 'id'),
+        ('order_id', 'order_id'),
+        ('product_id', 'batch__product__product_id'),
+        ('batch_number', 'batch__batch_number'),
+        ('quantity', 'quantity'),
+        ('unit_price', 'unit_price'),
+    ]),
+    'payments': (Payment, 'order__shop_id', [
+        ('order_id', 'order_id'),
+        ('order_date', 'order__order_date'),
+        ('payment_type', 'payment_type'),
+        ('transaction_amount', 'transaction_amount'),
+    ]),
+}
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'columnar': ('application/octet-stream', 'mpc'),
+}
+
+
+def _field(model, lookup):
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    field = model._meta.get_field(name)
+    return field.target_field if field.is_relation else field
+
+
+def column_types(kind):
+    """[{'name', 'type', 'scale'?}] for an export, from the model fields."""
+    model, _, columns = EXPORTS[kind]
+    types = []
+    for name, lookup in columns:
+        field = _field(model, lookup)
+        if isinstance(field, models.BooleanField):
+            column = {'name': name, 'type': 'bool'}
+        elif isinstance(field, models.DecimalField):
+            column = {'name': name, 'type': 'decimal', 'scale': field.decimal_places}
+        elif isinstance(field, models.FloatField):
+            column = {'name': name, 'type': 'float64'}
+        elif isinstance(field, models.IntegerField):  # includes the auto and big/positive variants
+            column = {'name': name, 'type': 'int64'}
+        elif isinstance(field, models.DateTimeField):
+            column = {'name': name, 'type': 'timestamp'}
+        elif isinstance(field, models.DateField):
+            column = {'name': name, 'type': 'date'}
+        else:
+            column = {'name': name, 'type': 'string'}
+        types.append(column)
+    return types
+
+
+def pages(kind, shop_id, page_size=PAGE_SIZE):
+    """Yield lists of row tuples for a shop, in primary key order."""
+    model, shop_lookup, columns = EXPORTS[kind]
+    queryset = model.objects.filter(**{shop_lookup: shop_id}).order_by('pk')
+    fields = ['pk'] + [lookup for _, lookup in columns]
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(page.values_list(*fields)[:page_size])
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [row[1:] for row in rows]
+        if len(rows) < page_size:
+            return
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def to_csv(kind, row_pages):
+    """Encode pages of rows as CSV, one bytes chunk per page."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORTS[kind][2]])
+    for rows in row_pages:
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _encode_column(column, values):
+    nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    kind = column['type']
+    if kind == 'string':
+        encoded = [(v or '').encode('utf-8') for v in values]
+        offsets = np.zeros(len(values) + 1, dtype='<u4')
+        np.cumsum([len(v) for v in encoded], out=offsets[1:])
+        data = offsets.tobytes() + b''.join(encoded)
+    else:
+        if kind == 'decimal':
+            factor = 10 ** column['scale']
+            values = [0 if v is None else int(v * factor) for v in values]
+            dtype = '<i8'
+        elif kind == 'date':
+            values = [0 if v is None else (v - EPOCH).days for v in values]
+            dtype = '<i4'
+        elif kind == 'timestamp':
+            values = [0 if v is None else (v - EPOCH_DATETIME) // timedelta(microseconds=1) for v in values]
+            dtype = '<i8'
+        else:
+            dtype = {'int64': '<i8', 'float64': '<f8', 'bool': 'u1'}[kind]
+            values = [0 if v is None else v for v in values]
+        data = np.asarray(values, dtype=dtype).tobytes()
+    if nulls.any():
+        block = b'\x01' + np.packbits(nulls).tobytes() + data
+    else:
+        block = b'\x00' + data
+    return struct.pack('<I', len(block)) + block
+
+
+def to_columnar(kind, row_pages):
+    """Encode pages of rows in the columnar format, one row group per page."""
+    columns = column_types(kind)
+    header = json.dumps({'kind': kind, 'columns': columns}).encode('utf-8')
+    yield MAGIC + struct.pack('<I', len(header)) + header
+    for rows in row_pages:
+        chunk = [struct.pack('<I', len(rows))]
+        for column, values in zip(columns, zip(*rows)):
+            chunk.append(_encode_column(column, values))
+        yield b''.join(chunk)
+    yield struct.pack('<I', 0)
+
+
+def gzipped(chunks, level=6):
+    """Compress a stream of bytes chunks into one gzip stream as it goes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, shop_id, fmt='csv', compress=False, page_size=PAGE_SIZE):
+    """Stream an export as bytes chunks."""
+    encode = to_columnar if fmt == 'columnar' else to_csv
+    chunks = encode(kind, pages(kind, shop_id, page_size))
+    return gzipped(chunks) if compress else chunks
+
+
+def filename(kind, shop_id, fmt='csv', compress=False):
+    name = f'{kind}-shop{shop_id}-{date.today().isoformat()}.{FORMATS[fmt][1]}'
+    return name + '.gz' if compress else name
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError('Truncated columnar file')
+    return data
+
+
+def _decode_column(column, block, n):
+    has_nulls, block = block[0], block[1:]
+    nulls = np.zeros(n, dtype=bool)
+    if has_nulls:
+        width = (n + 7) // 8
+        nulls = np.unpackbits(np.frombuffer(block[:width], dtype=np.uint8), count=n).astype(bool)
+        block = block[width:]
+    kind = column['type']
+    if kind == 'string':
+        offsets = np.frombuffer(block[:4 * (n + 1)], dtype='<u4')
+        data = block[4 * (n + 1):]
+        values = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(n)]
+    elif kind == 'decimal':
+        exponent = Decimal(1).scaleb(-column['scale'])
+        values = [Decimal(int(v)).scaleb(-column['scale']).quantize(exponent) for v in np.frombuffer(block, dtype='<i8')]
+    elif kind == 'date':
+        values = [EPOCH + timedelta(days=int(v)) for v in np.frombuffer(block, dtype='<i4')]
+    elif kind == 'timestamp':
+        values = [EPOCH_DATETIME + timedelta(microseconds=int(v)) for v in np.frombuffer(block, dtype='<i8')]
+    elif kind == 'bool':
+        values = [bool(v) for v in np.frombuffer(block, dtype='u1')]
+    elif kind == 'float64':
+        values = np.frombuffer(block, dtype='<f8').tolist()
+    else:
+        values = np.frombuffer(block, dtype='<i8').tolist()
+    return [None if null else value for value, null in zip(values, nulls)]
+
+
+def read_columnar(stream):
+    """Decode a columnar export: returns (header, iterator of row groups).
+
+    Each row group is a dict of column name -> list of values.
+    """
+    if _read(stream, len(MAGIC)) != MAGIC:
+        raise ValueError('Not a columnar export')
+    (length,) = struct.unpack('<I', _read(stream, 4))
+    header = json.loads(_read(stream, length))
+
+    def row_groups():
+        while True:
+            (n,) = struct.unpack('<I', _read(stream, 4))
+            if n == 0:
+                return
+            group = {}
+            for column in header['columns']:
+                (size,) = struct.unpack('<I', _read(stream, 4))
+                group[column['name']] = _decode_column(column, _read(stream, size), n)
+            yield group
+
+    return header, row_groups()
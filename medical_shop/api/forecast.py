@@ -0,0 +1,199 @@
+"""Seasonal demand forecast of salts (generic names) behind predict_salts.
+
+Training (`manage.py train_demand_forecast`) runs offline:
+
+1. `load_order_items` pulls (shop, generic name, month, units) columns from
+   OrderItem history. The database pre-groups rows per month.
+2. `build_series` turns those columns into a series x month matrix of units
+   with NumPy (np.unique + np.bincount), one row per (shop, generic name).
+3. `fit_seasonal` fits every series at once. Each forecast is a level (mean
+   monthly units over the last 12 active months) times a calendar-month
+   seasonal index. The index is shrunk towards 1 when a month has been seen
+   in only a few years.
+4. `top_forecasts` ranks names per shop, and per city across its shops. The
+   best TOP_N per calendar month are stored in DemandForecast.
+
+The endpoint then reads one indexed slice of that table per request.
+"""
+from datetime import date
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from api.models import DemandForecast, OrderItem, Shop
+
+HISTORY_MONTHS = 36
+TOP_N = 20
+# Pseudo-observations pulling a month's seasonal index towards 1
+SEASONAL_SHRINKAGE = 2.0
+
+
+def month_index(year, month):
+    return year * 12 + (month - 1)
+
+
+def load_order_items(start, end):
+    """Columns of monthly units sold per (shop, generic name) in [start, end)."""
+    rows = (
+        OrderItem.objects.filter(order__order_date__gte=start, order__order_date__lt=end)
+        .annotate(year=ExtractYear('order__order_date'), month=ExtractMonth('order__order_date'))
+        .values_list('order__shop_id', 'batch__product__generic_name', 'year', 'month')
+        .annotate(units=Sum('quantity'))
+        .order_by()
+    )
+    shops, names, months, units = [], [], [], []
+    for shop_id, name, year, month, quantity in rows.iterator(chunk_size=10000):
+        shops.append(shop_id)
+        names.append((name or '').strip())
+        months.append(month_index(year, month))
+        units.append(quantity or 0)
+    return (
+        np.asarray(shops, dtype=np.int64),
+        np.asarray(names, dtype=object),
+        np.asarray(months, dtype=np.int64),
+        np.asarray(units, dtype=np.float64),
+    )
+
+
+def _factorize(names):
+    """Integer codes for names compared case-insensitively, plus each code's first spelling."""
+    # A dict pass beats np.unique on a large array of Python strings
+    codes = {}
+    display = []
+    out = np.empty(len(names), dtype=np.int64)
+    for i, name in enumerate(names):
+        key = name.lower()
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(display)
+            display.append(name)
+        out[i] = code
+    return out, np.array(display, dtype=object)
+
+
+def build_series(shops, names, months, units, first_month, n_months):
+    """Aggregate item columns into a (series x n_months) matrix of units.
+
+    Returns (series_shop, series_name, matrix). Names are matched
+    case-insensitively and shown as first seen. Rows outside the window are
+    dropped.
+    """
+    keep = (months >= first_month) & (months < first_month + n_months)
+    shops, names, months, units = shops[keep], names[keep], months[keep], units[keep]
+
+    name_codes, display = _factorize(names)
+    n_names = max(len(display), 1)
+
+    series_keys, series_codes = np.unique(shops * n_names + name_codes, return_inverse=True)
+    cells = series_codes * n_months + (months - first_month)
+    matrix = np.bincount(cells, weights=units, minlength=len(series_keys) * n_months)
+    matrix = matrix.reshape(len(series_keys), n_months)
+    return series_keys // n_names, display[series_keys % n_names], matrix
+
+
+def fit_seasonal(matrix, first_month):
+    """Forecast units for each calendar month (columns 0-11 = Jan-Dec)."""
+    n_series, n_months = matrix.shape
+    forecast = np.zeros((n_series, 12))
+    if n_series == 0:
+        return forecast
+
+    # Only months since a series' first sale count, so new products are not
+    # diluted by the empty months before they were stocked.
+    sold = matrix > 0
+    first_sale = np.where(sold.any(axis=1), sold.argmax(axis=1), n_months)
+    active = np.arange(n_months)[None, :] >= first_sale[:, None]
+    active_months = active.sum(axis=1)
+
+    recent = active & (np.arange(n_months)[None, :] >= n_months - 12)
+    level = np.divide(
+        (matrix * recent).sum(axis=1), recent.sum(axis=1),
+        out=np.zeros(n_series), where=recent.any(axis=1),
+    )
+    overall = np.divide(
+        (matrix * active).sum(axis=1), active_months,
+        out=np.zeros(n_series), where=active_months > 0,
+    )
+
+    calendar = (first_month + np.arange(n_months)) % 12
+    for month in range(12):
+        columns = calendar == month
+        counts = active[:, columns].sum(axis=1)
+        totals = (matrix[:, columns] * active[:, columns]).sum(axis=1)
+        raw = np.divide(totals, counts * overall, out=np.ones(n_series), where=(counts > 0) & (overall > 0))
+        index = (counts * raw + SEASONAL_SHRINKAGE) / (counts + SEASONAL_SHRINKAGE)
+        forecast[:, month] = level * index
+    return forecast
+
+
+def top_forecasts(groups, names, forecast, top_n=TOP_N):
+    """Yield (group, month 1-12, rank, name, units) for the best names per group."""
+    for month in range(12):
+        values = forecast[:, month]
+        order = np.lexsort((-values, groups))
+        sorted_groups = groups[order]
+        starts = np.r_[0, np.flatnonzero(sorted_groups[1:] != sorted_groups[:-1]) + 1]
+        ranks = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        chosen = (ranks < top_n) & (values[order] > 0)
+        for i, rank in zip(order[chosen], ranks[chosen]):
+            yield groups[i], month + 1, int(rank) + 1, names[i], float(values[i])
+
+
+def train(history_months=HISTORY_MONTHS, top_n=TOP_N, today=None):
+    """Fit the forecast from order history and replace DemandForecast.
+
+    Returns the number of series fitted.
+    """
+    today = today or date.today()
+    # Train on complete months only
+    end_month = month_index(today.year, today.month)
+    first_month = end_month - history_months
+    start = date(first_month // 12, first_month % 12 + 1, 1)
+    end = date(today.year, today.month, 1)
+
+    shops, names, months, units = load_order_items(start, end)
+    series_shop, series_name, matrix = build_series(shops, names, months, units, first_month, history_months)
+    forecast = fit_seasonal(matrix, first_month)
+    trained_at = timezone.now()
+
+    rows = [
+        DemandForecast(shop_id=int(shop_id), month=month, rank=rank, generic_name=name,
+                       predicted_units=value, trained_at=trained_at)
+        for shop_id, month, rank, name, value in top_forecasts(series_shop, series_name, forecast, top_n)
+    ]
+
+    # City forecasts add up the forecasts of the city's shops per name
+    cities = dict(Shop.objects.exclude(city='').values_list('shop_id', 'city'))
+    series_city = np.array([cities.get(int(s), '').strip().lower() for s in series_shop], dtype=object)
+    in_city = series_city != ''
+    if in_city.any():
+        city_keys, city_codes = np.unique(series_city[in_city].astype(str), return_inverse=True)
+        name_codes, display = _factorize(series_name[in_city])
+        pair_keys, pair_codes = np.unique(city_codes * len(display) + name_codes, return_inverse=True)
+        city_forecast = np.zeros((len(pair_keys), 12))
+        np.add.at(city_forecast, pair_codes, forecast[in_city])
+        rows.extend(
+            DemandForecast(city=city_keys[code], month=month, rank=rank, generic_name=name,
+                           predicted_units=value, trained_at=trained_at)
+            for code, month, rank, name, value in top_forecasts(
+                pair_keys // len(display), display[pair_keys % len(display)], city_forecast, top_n
+            )
+        )
+
+    with transaction.atomic():
+        DemandForecast.objects.all().delete()
+        DemandForecast.objects.bulk_create(rows, batch_size=1000)
+    return len(matrix)
+
+
+def predictions(month, shop_id=None, city=None, limit=6):
+    """Stored top forecasts for a calendar month, by shop or by city."""
+    rows = DemandForecast.objects.filter(month=month)
+    if city:
+        rows = rows.filter(city=city.strip().lower(), shop__isnull=True)
+    else:
+        rows = rows.filter(shop_id=shop_id)
+    return list(rows.order_by('rank').values('generic_name', 'predicted_units', 'trained_at')[:limit])
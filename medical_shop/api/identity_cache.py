@@ -0,0 +1,172 @@
+"""Cache of identities resolved from JWT claims.
+
+`jwt_required` resolves a legacy token's `shop`/`account` claims into a Shop
+and a Staff/Manager instance (access tokens carry enough to skip this). Those rows change rarely, so the resolved pair is
+cached here keyed on the claims and invalidated explicitly by the views that
+change shops or staff membership.
+
+Backends (selected with settings.IDENTITY_CACHE['BACKEND']):
+- 'django': a Django cache alias (default). With a cache every worker shares
+  (file-based or Redis), an invalidation reaches all of them at once, which
+  is required when running more than one worker process.
+- 'local': in-process LRU with TTL. Invalidations only reach the process
+  that made them; other workers keep stale identities for up to TTL.
+- 'none': disable caching
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULTS = {
+    'BACKEND': 'django',
+    'TTL': 60,
+    'MAX_ENTRIES': 1024,
+    'CACHE_ALIAS': 'shared',
+}
+
+
+class NullIdentityCache:
+    """Backend that never caches anything."""
+
+    def get(self, account_phone, shop_id):
+        return None
+
+    def set(self, account_phone, shop_id, identity):
+        pass
+
+    def invalidate_shop(self, shop_id):
+        pass
+
+    def invalidate_account(self, account_phone, shop_id=None):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LocalIdentityCache:
+    """In-process LRU cache with per-entry TTL."""
+
+    def __init__(self, ttl=60, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, account_phone, shop_id):
+        key = (account_phone, shop_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return identity
+
+    def set(self, account_phone, shop_id, identity):
+        key = (account_phone, shop_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_shop(self, shop_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == shop_id]:
+                del self._entries[key]
+
+    def invalidate_account(self, account_phone, shop_id=None):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == account_phone and (shop_id is None or k[1] == shop_id)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoIdentityCache:
+    """Shared cache backed by a Django cache alias.
+
+    Every entry key carries a generation number for its shop and one for its
+    account. Invalidation bumps the generation, so stale entries simply stop
+    being addressed, for every shop of an account at once if needed.
+    """
+
+    def __init__(self, ttl=60, alias='shared'):
+        self.ttl = ttl
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, account_phone, shop_id):
+        shop_gen = f'identity:gen:{shop_id}'
+        account_gen = f'identity:gen:account:{account_phone}'
+        generations = self.cache.get_many([shop_gen, account_gen])
+        return (f'identity:{shop_id}:{generations.get(shop_gen, 0)}:'
+                f'{account_phone}:{generations.get(account_gen, 0)}')
+
+    def _bump(self, key):
+        # Not incr(): the file-based cache's incr re-sets the key with the
+        # default timeout, after which the generation would fall back to 0.
+        self.cache.set(key, self.cache.get(key, 0) + 1, None)
+
+    def get(self, account_phone, shop_id):
+        return self.cache.get(self._key(account_phone, shop_id))
+
+    def set(self, account_phone, shop_id, identity):
+        self.cache.set(self._key(account_phone, shop_id), identity, self.ttl)
+
+    def invalidate_shop(self, shop_id):
+        self._bump(f'identity:gen:{shop_id}')
+
+    def invalidate_account(self, account_phone, shop_id=None):
+        if shop_id is None:
+            self._bump(f'identity:gen:account:{account_phone}')
+            return
+        self.cache.delete(self._key(account_phone, shop_id))
+
+    def clear(self):
+        self.cache.clear()
+
+
+_identity_cache = None
+_identity_cache_lock = threading.Lock()
+
+
+def get_identity_cache():
+    """Return the process-wide identity cache configured in settings."""
+    global _identity_cache
+    if _identity_cache is None:
+        with _identity_cache_lock:
+            if _identity_cache is None:
+                options = {**DEFAULTS, **getattr(settings, 'IDENTITY_CACHE', {})}
+                backend = options['BACKEND']
+                if backend == 'local':
+                    _identity_cache = LocalIdentityCache(ttl=options['TTL'], max_entries=options['MAX_ENTRIES'])
+                elif backend == 'django':
+                    _identity_cache = DjangoIdentityCache(ttl=options['TTL'], alias=options['CACHE_ALIAS'])
+                elif backend == 'none':
+                    _identity_cache = NullIdentityCache()
+                else:
+                    raise ValueError(f"Unknown IDENTITY_CACHE backend: {backend}")
+    return _identity_cache
+
+
+def invalidate_shop(shop_id):
+    """Drop every cached identity for a shop (shop renamed/deleted)."""
+    get_identity_cache().invalidate_shop(int(shop_id))
+
+
+def invalidate_account(account_phone, shop_id=None):
+    """Drop cached identities for an account (staff added/removed)."""
+    get_identity_cache().invalidate_account(str(account_phone), int(shop_id) if shop_id is not None else None)
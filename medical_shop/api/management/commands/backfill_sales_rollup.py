@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.rollups import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-shop daily sales rollup (ShopDailyStats) from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only rebuild this shop_id')
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_stats(shop_id=options['shop'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {rows} daily sales rows'))
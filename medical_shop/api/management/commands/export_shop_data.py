@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from api import export
+from api.models import Shop
+
+
+class Command(BaseCommand):
+    help = 'Export a shop\'s products, batches, orders and payments as streamed CSV or columnar files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, required=True, help='shop_id to export')
+        parser.add_argument('--kind', action='append', choices=list(export.EXPORTS),
+                            help='Export only this kind (repeatable; default all)')
+        parser.add_argument('--format', choices=list(export.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the files')
+        parser.add_argument('--output-dir', default='.', help='Directory to write the files to')
+        parser.add_argument('--page-size', type=int, default=export.PAGE_SIZE, help='Rows read per query')
+
+    def handle(self, *args, **options):
+        shop_id = options['shop']
+        if not Shop.objects.filter(shop_id=shop_id).exists():
+            raise CommandError(f'Shop {shop_id} does not exist')
+        os.makedirs(options['output_dir'], exist_ok=True)
+
+        for kind in options['kind'] or export.EXPORTS:
+            path = os.path.join(options['output_dir'], export.filename(kind, shop_id, options['format'], options['gzip']))
+            size = 0
+            with open(path, 'wb') as f:
+                for chunk in export.export(kind, shop_id, options['format'], options['gzip'], options['page_size']):
+                    f.write(chunk)
+                    size += len(chunk)
+            self.stdout.write(self.style.SUCCESS(f'✓ Wrote {path} ({size} bytes)'))
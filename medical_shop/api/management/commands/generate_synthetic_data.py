@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from api import synthetic
+
+
+class Command(BaseCommand):
+    help = ('Generate N shops x M products x K orders of realistic synthetic data (seeded, deterministic). '
+            'Adds new shops; run manage.py flush first for a clean database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=1, help='Shops to create')
+        parser.add_argument('--products', type=int, default=200, help='Products per shop')
+        parser.add_argument('--orders', type=int, default=5000, help='Orders per shop')
+        parser.add_argument('--days', type=int, default=365, help='Days of order history')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--password', default='password', help='Login password of the generated managers')
+
+    def handle(self, *args, **options):
+        if options['shops'] < 1 or options['products'] < 1 or options['orders'] < 0 or options['days'] < 1:
+            raise CommandError('--shops, --products and --days must be positive and --orders not negative')
+        if options['products'] > 999999:
+            raise CommandError('--products is limited to 999999 per shop')
+
+        started = time.monotonic()
+        counts = synthetic.generate(
+            shops=options['shops'], products=options['products'], orders=options['orders'],
+            days=options['days'], seed=options['seed'], password=options['password'],
+            log=self.stdout.write,
+        )
+        elapsed = time.monotonic() - started
+        summary = ', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'✓ Generated {summary} in {elapsed:.1f}s'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.changelog import prune
+
+
+class Command(BaseCommand):
+    help = 'Delete old catalog change-log entries; clients with older sync tokens get a full reset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Keep changes from the last N days (default 30)')
+        parser.add_argument('--shop', type=int, help='Only prune this shop_id')
+
+    def handle(self, *args, **options):
+        deleted = prune(options['days'], shop_id=options['shop'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Pruned {deleted} catalog changes'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Product
+from api import search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product name trigram search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only rebuild products of this shop_id')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        products = Product.objects.only('id', 'shop_id', 'generic_name', 'brand_name').order_by('id')
+        if options['shop']:
+            products = products.filter(shop_id=options['shop'])
+
+        total = 0
+        last_id = 0
+        while True:
+            chunk = list(products.filter(id__gt=last_id)[:options['chunk_size']])
+            if not chunk:
+                break
+            with transaction.atomic():
+                search_index.index_products(chunk)
+            total += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(f'  indexed {total} products...')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Search index rebuilt for {total} products'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.expiry import refresh_summary
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-shop expiry bucket summary (run nightly, after midnight)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only refresh this shop_id')
+
+    def handle(self, *args, **options):
+        rows = refresh_summary(shop_id=options['shop'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Refreshed {rows} expiry bucket rows'))
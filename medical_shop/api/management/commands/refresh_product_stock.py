@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from api import product_stock
+
+
+class Command(BaseCommand):
+    help = 'Recompute product stock totals whose batches expired (run nightly); --all recomputes every product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only refresh this shop_id')
+        parser.add_argument('--all', action='store_true', help='Recompute every product, not only expired totals')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            count = product_stock.rebuild(shop_id=options['shop'])
+        else:
+            count = product_stock.refresh_expired(shop_id=options['shop'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Refreshed stock totals of {count} products'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from api import forecast
+
+
+class Command(BaseCommand):
+    help = 'Fit the seasonal salt demand forecast from order history (run offline, e.g. nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=forecast.HISTORY_MONTHS,
+                            help=f'Months of history to train on (default {forecast.HISTORY_MONTHS})')
+        parser.add_argument('--top', type=int, default=forecast.TOP_N,
+                            help=f'Salts stored per shop/city and month (default {forecast.TOP_N})')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        series = forecast.train(history_months=options['months'], top_n=options['top'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'✓ Trained {series} demand series in {elapsed:.1f}s'))
@@ -0,0 +1,365 @@
+"""Per-endpoint request metrics: SQL queries and time, Python time, response size.
+
+`QueryMetricsMiddleware` measures every request that resolves to a URL name.
+Database cost is counted by an execute wrapper installed on each connection.
+The wrapper charges queries to the request held in a context variable, so
+sync views, and async views calling the ORM through sync_to_async, are both
+covered. Views can time a part of their own work with `span('serialize')`.
+
+Each response gets a `Server-Timing` header (db, serialize, app, total).
+Totals are aggregated per URL name in each worker process. Every worker
+copies its totals into the shared cache (REQUEST_METRICS['CACHE_ALIAS']) at
+most every PUBLISH_INTERVAL seconds, so whichever worker answers
+`/api/_metrics` serves all of them in the Prometheus text format. Samples
+carry a `worker` label (host:pid), which keeps each counter monotonic;
+aggregate with e.g. `sum by (endpoint) (rate(...))`. A worker's copy expires
+WORKER_TTL seconds after it last published.
+
+settings.REQUEST_METRICS['QUERY_BUDGETS'] maps URL names to the most queries
+a request may run. Over budget, BUDGET_ACTION 'log' logs a warning and
+'raise' raises QueryBudgetExceeded, which fails the test that made the
+request.
+
+Bodies of streaming responses are produced after the middleware returns, so
+their queries and size are not counted.
+"""
+import contextvars
+import copy
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'QUERY_BUDGETS': {},
+    'DEFAULT_QUERY_BUDGET': None,
+    'BUDGET_ACTION': 'log',
+    'TOKEN': '',
+    'CACHE_ALIAS': 'shared',
+    'PUBLISH_INTERVAL': 5,
+    'WORKER_TTL': 24 * 3600,
+}
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PREFIX = 'minipharma'
+WORKERS_KEY = f'{PREFIX}:metrics:workers'
+
+
+def get_settings():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+def worker_id():
+    """The `worker` label of this process (host:pid)."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _worker_key(worker):
+    return f'{PREFIX}:metrics:worker:{worker}'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestCost:
+    """What one request has spent so far."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.spans = {}
+
+
+_current = contextvars.ContextVar('request_cost', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    cost = _current.get()
+    if cost is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        cost.queries += 1
+        cost.sql_seconds += time.perf_counter() - started
+
+
+def _install(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def span(name):
+    """Time a block of the current request, reported under `name`.
+
+    SQL run inside the block is left out; it is already reported as db.
+    """
+    cost = _current.get()
+    if cost is None:
+        yield
+        return
+    started = time.perf_counter()
+    sql_before = cost.sql_seconds
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (cost.sql_seconds - sql_before)
+        cost.spans[name] = cost.spans.get(name, 0.0) + elapsed
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = {}  # status class ("2xx") -> count
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.app_seconds = 0.0
+        self.span_seconds = {}
+        self.response_bytes = 0
+        self.over_budget = 0
+
+
+class Registry:
+    """Aggregated stats per URL name for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._published_at = None
+
+    def observe(self, endpoint, status, seconds, cost, size, over_budget):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            status_class = f'{status // 100}xx'
+            stats.requests[status_class] = stats.requests.get(status_class, 0) + 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+            stats.seconds += seconds
+            stats.queries += cost.queries
+            stats.sql_seconds += cost.sql_seconds
+            stats.app_seconds += max(seconds - cost.sql_seconds, 0.0)
+            for name, value in cost.spans.items():
+                stats.span_seconds[name] = stats.span_seconds.get(name, 0.0) + value
+            stats.response_bytes += size or 0
+            stats.over_budget += over_budget
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._published_at = None
+
+    def snapshot(self):
+        """This process's endpoint stats and registered collector output."""
+        with self._lock:
+            endpoints = copy.deepcopy(self._endpoints)
+        return {
+            'endpoints': endpoints,
+            'collected': [family for collect in _collectors for family in collect()],
+        }
+
+    def publish(self, options=None, force=False):
+        """Copy this process's snapshot to the shared cache, at most every PUBLISH_INTERVAL."""
+        options = options or get_settings()
+        if not options['CACHE_ALIAS']:
+            return
+        now = time.monotonic()
+        with self._lock:
+            recent = self._published_at is not None and now - self._published_at < options['PUBLISH_INTERVAL']
+            if recent and not force:
+                return
+            self._published_at = now
+        cache = caches[options['CACHE_ALIAS']]
+        worker = worker_id()
+        cache.set(_worker_key(worker), self.snapshot(), options['WORKER_TTL'])
+        workers = cache.get(WORKERS_KEY) or []
+        if worker not in workers:
+            # A concurrent update may drop this entry; the next publish adds it back
+            cache.set(WORKERS_KEY, workers + [worker], None)
+
+    def gather(self, options=None):
+        """[(worker, snapshot)] for every worker that has published, this one included.
+
+        This process publishes first and then reads its own copy back like
+        the others, so a worker's series only ever come from its published
+        copies, whichever worker serves the scrape.
+        """
+        options = options or get_settings()
+        if not options['CACHE_ALIAS']:
+            return [(worker_id(), self.snapshot())]
+        self.publish(options, force=True)
+        cache = caches[options['CACHE_ALIAS']]
+        workers = cache.get(WORKERS_KEY) or []
+        found = cache.get_many([_worker_key(w) for w in workers])
+        snapshots = {w: found[_worker_key(w)] for w in workers if _worker_key(w) in found}
+        if len(snapshots) != len(workers):
+            # Forget workers whose copy expired
+            cache.set(WORKERS_KEY, sorted(snapshots), None)
+        return sorted(snapshots.items())
+
+    def render(self, options=None):
+        """Prometheus text exposition format (version 0.0.4), one series per worker."""
+        workers = self.gather(options)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f'{PREFIX}_{name}{{{label_text}}} {value}')
+
+        def per_endpoint(sample):
+            return [
+                labeled for worker, snapshot in workers
+                for e, s in sorted(snapshot['endpoints'].items())
+                for labeled in sample(worker, e, s)
+            ]
+
+        metric('requests_total', 'counter', 'Requests handled, by endpoint and status class.', per_endpoint(
+            lambda w, e, s: [({'worker': w, 'endpoint': e, 'status': status}, count)
+                             for status, count in sorted(s.requests.items())]
+        ))
+        lines.append(f'# HELP {PREFIX}_request_duration_seconds Time spent handling requests.')
+        lines.append(f'# TYPE {PREFIX}_request_duration_seconds histogram')
+        for worker, snapshot in workers:
+            for e, s in sorted(snapshot['endpoints'].items()):
+                labels = f'worker="{worker}",endpoint="{e}"'
+                total = sum(s.requests.values())
+                for bound, count in zip(DURATION_BUCKETS, s.buckets):
+                    lines.append(f'{PREFIX}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{PREFIX}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {total}')
+                lines.append(f'{PREFIX}_request_duration_seconds_sum{{{labels}}} {s.seconds:.6f}')
+                lines.append(f'{PREFIX}_request_duration_seconds_count{{{labels}}} {total}')
+
+        metric('db_queries_total', 'counter', 'SQL queries run while handling requests.',
+               per_endpoint(lambda w, e, s: [({'worker': w, 'endpoint': e}, s.queries)]))
+        metric('db_seconds_total', 'counter', 'Time spent in SQL queries.',
+               per_endpoint(lambda w, e, s: [({'worker': w, 'endpoint': e}, f'{s.sql_seconds:.6f}')]))
+        metric('app_seconds_total', 'counter', 'Time spent outside SQL (Python, serialization).',
+               per_endpoint(lambda w, e, s: [({'worker': w, 'endpoint': e}, f'{s.app_seconds:.6f}')]))
+        metric('span_seconds_total', 'counter', 'Time spent in named spans such as serialize.', per_endpoint(
+            lambda w, e, s: [({'worker': w, 'endpoint': e, 'span': name}, f'{value:.6f}')
+                             for name, value in sorted(s.span_seconds.items())]
+        ))
+        metric('response_bytes_total', 'counter', 'Bytes of non-streaming response bodies.',
+               per_endpoint(lambda w, e, s: [({'worker': w, 'endpoint': e}, s.response_bytes)]))
+        metric('query_budget_exceeded_total', 'counter', 'Requests that ran more queries than their budget.',
+               per_endpoint(lambda w, e, s: [({'worker': w, 'endpoint': e}, s.over_budget)]))
+
+        # Collector families in first-seen order, samples from every worker
+        families = {}
+        for worker, snapshot in workers:
+            for name, kind, help_text, samples in snapshot['collected']:
+                family = families.setdefault(name, (kind, help_text, []))
+                family[2].extend(({'worker': worker, **labels}, value) for labels, value in samples)
+        for name, (kind, help_text, samples) in families.items():
+            metric(name, kind, help_text, samples)
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+_collectors = []
+
+
+def register_collector(collect):
+    """Add metrics from another module to /api/_metrics.
+
+    `collect()` returns [(name, kind, help, [(labels, value)])]; names get
+    the minipharma_ prefix.
+    """
+    if collect not in _collectors:
+        _collectors.append(collect)
+
+
+def query_budget(endpoint, options=None):
+    options = options or get_settings()
+    return options['QUERY_BUDGETS'].get(endpoint, options['DEFAULT_QUERY_BUDGET'])
+
+
+def _server_timing(seconds, cost):
+    parts = [f'db;dur={cost.sql_seconds * 1000:.2f};desc="{cost.queries} queries"']
+    parts += [f'{name};dur={value * 1000:.2f}' for name, value in cost.spans.items()]
+    parts.append(f'app;dur={max(seconds - cost.sql_seconds, 0.0) * 1000:.2f}')
+    parts.append(f'total;dur={seconds * 1000:.2f}')
+    return ', '.join(parts)
+
+
+class QueryMetricsMiddleware:
+    """Measure each request's queries and timings (see module docstring)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        connection_created.connect(_install, dispatch_uid='api.metrics.install')
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        options = get_settings()
+        if not options['ENABLED']:
+            return self.get_response(request)
+        cost = RequestCost()
+        token = _current.set(cost)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, cost, time.perf_counter() - started, options)
+
+    async def __acall__(self, request):
+        options = get_settings()
+        if not options['ENABLED']:
+            return await self.get_response(request)
+        cost = RequestCost()
+        token = _current.set(cost)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, cost, time.perf_counter() - started, options)
+
+    def _finish(self, request, response, cost, seconds, options):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+        endpoint = match.url_name or match.view_name
+
+        budget = query_budget(endpoint, options)
+        over_budget = budget is not None and cost.queries > budget
+        size = None if response.streaming else len(response.content)
+        registry.observe(endpoint, response.status_code, seconds, cost, size, over_budget)
+        registry.publish(options)
+        if options['SERVER_TIMING']:
+            response['Server-Timing'] = _server_timing(seconds, cost)
+
+        if over_budget:
+            message = f"{endpoint} ran {cost.queries} queries, over its budget of {budget} ({request.method} {request.path})"
+            if options['BUDGET_ACTION'] == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
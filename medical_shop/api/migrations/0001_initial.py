@@ -52,7 +52,7 @@ class Migration(migrations.Migration):
         migrations.CreateModel(
             name='Shop',
             fields=[
-                ('phone', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('shop_id', models.AutoField(primary_key=True, serialize=False)),
                 ('shopname', models.CharField(max_length=100)),
                 ('manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shops', to='api.manager')),
             ],
@@ -63,7 +63,7 @@ class Migration(migrations.Migration):
         migrations.CreateModel(
             name='Product',
             fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id', models.AutoField(primary_key=True, serialize=False)),
                 ('product_id', models.CharField(max_length=10)),
                 ('brand_name', models.CharField(blank=True, max_length=100, null=True)),
                 ('generic_name', models.CharField(max_length=100)),
@@ -86,7 +86,7 @@ class Migration(migrations.Migration):
         migrations.CreateModel(
             name='Batch',
             fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
                 ('batch_number', models.CharField(max_length=50)),
                 ('expiry_date', models.DateField()),
                 ('average_purchase_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
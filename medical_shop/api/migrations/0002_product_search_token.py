@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_tokens(apps, schema_editor):
+    from api.search_index import trigrams
+
+    Product = apps.get_model('api', 'Product')
+    ProductSearchToken = apps.get_model('api', 'ProductSearchToken')
+    tokens = []
+    for product in Product.objects.only('id', 'shop_id', 'generic_name', 'brand_name').iterator(chunk_size=1000):
+        tokens.extend(
+            ProductSearchToken(shop_id=product.shop_id, product_id=product.id, gram=gram)
+            for gram in trigrams(product.generic_name, product.brand_name)
+        )
+        if len(tokens) >= 5000:
+            ProductSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    ProductSearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='api.product')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.shop')),
+            ],
+            options={
+                'db_table': 'api_product_search_token',
+                'indexes': [models.Index(fields=['shop', 'gram'], name='api_product_shop_id_56b741_idx')],
+                'unique_together': {('product', 'gram')},
+            },
+        ),
+        migrations.RunPython(build_search_tokens, migrations.RunPython.noop),
+    ]
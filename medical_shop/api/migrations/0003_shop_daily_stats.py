@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    Order = apps.get_model('api', 'Order')
+    ShopDailyStats = apps.get_model('api', 'ShopDailyStats')
+    rows = Order.objects.annotate(day=TruncDate('order_date')).values('shop_id', 'day').annotate(
+        order_count=Count('order_id'), revenue=Sum('total_amount')
+    ).order_by()
+    ShopDailyStats.objects.bulk_create([
+        ShopDailyStats(shop_id=row['shop_id'], date=row['day'], order_count=row['order_count'], revenue=row['revenue'] or 0)
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_product_search_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='api.shop')),
+            ],
+            options={
+                'db_table': 'api_shop_daily_stats',
+                'unique_together': {('shop', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:12
+
+from django.db import migrations, models
+
+
+def backfill_sales_split(apps, schema_editor):
+    from api.rollups import rebuild_daily_stats
+
+    rebuild_daily_stats(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_shop_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shopdailystats',
+            name='card_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='shopdailystats',
+            name='cash_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='shopdailystats',
+            name='item_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shopdailystats',
+            name='upi_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_sales_split, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_shop_daily_stats_sales_split'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopDataVersion',
+            fields=[
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to='api.shop')),
+                ('catalog', models.BigIntegerField(default=0)),
+                ('stock', models.BigIntegerField(default=0)),
+                ('orders', models.BigIntegerField(default=0)),
+                ('payments', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'api_shop_data_version',
+            },
+        ),
+    ]
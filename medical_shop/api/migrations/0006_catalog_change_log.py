@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_shop_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shopdataversion',
+            name='sync_floor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('batch', 'Batch')], max_length=7)),
+                ('key', models.CharField(max_length=20)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_changes', to='api.shop')),
+            ],
+            options={
+                'db_table': 'api_catalog_change',
+                'indexes': [models.Index(fields=['shop', 'id'], name='api_catalog_shop_id_59f64d_idx')],
+            },
+        ),
+    ]
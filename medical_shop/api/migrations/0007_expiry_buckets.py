@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_catalog_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopExpiryBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(choices=[('expired', 'Expired'), ('7d', 'Within 7 days'), ('30d', '8 to 30 days'), ('90d', '31 to 90 days')], max_length=7)),
+                ('computed_on', models.DateField()),
+                ('batch_count', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('value_at_risk', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'db_table': 'api_shop_expiry_bucket',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['shop', 'expiry_date', 'quantity_in_stock'], name='api_batch_shop_id_11cf59_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='batch',
+            name='api_batch_shop_id_f91d20_idx',
+        ),
+        migrations.AddField(
+            model_name='shopexpirybucket',
+            name='shop',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiry_buckets', to='api.shop'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='shopexpirybucket',
+            unique_together={('shop', 'bucket')},
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:20
+
+from django.db import migrations, models
+
+
+def backfill_product_stock(apps, schema_editor):
+    from api.product_stock import rebuild
+
+    rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_expiry_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='next_expiry',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stock_on_hand',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shop', 'stock_on_hand'], name='api_product_shop_id_5e5921_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shop', 'next_expiry'], name='api_product_shop_id_5cbff5_idx'),
+        ),
+        migrations.RunPython(backfill_product_stock, migrations.RunPython.noop),
+    ]
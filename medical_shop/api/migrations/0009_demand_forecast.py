@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_product_stock_on_hand'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='city',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(blank=True, default='', max_length=100)),
+                ('month', models.PositiveSmallIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('generic_name', models.CharField(max_length=100)),
+                ('predicted_units', models.FloatField()),
+                ('trained_at', models.DateTimeField()),
+                ('shop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='api.shop')),
+            ],
+            options={
+                'db_table': 'api_demand_forecast',
+                'indexes': [models.Index(fields=['shop', 'month', 'rank'], name='api_demand__shop_id_7c1c7f_idx'), models.Index(fields=['city', 'month', 'rank'], name='api_demand__city_346bc5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_demand_forecast'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='manager',
+            name='password',
+            field=models.CharField(max_length=128),
+        ),
+        migrations.AlterField(
+            model_name='staff',
+            name='password',
+            field=models.CharField(max_length=128),
+        ),
+    ]
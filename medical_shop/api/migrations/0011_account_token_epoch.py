@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_widen_password_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manager',
+            name='token_epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='staff',
+            name='token_epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+def use_binary_collation(apps, schema_editor):
+    # MySQL's default collations are case- and accent-insensitive, under which
+    # distinct trigrams ("é" vs "e", "ß" vs "s") collide on unique (product, gram)
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE api_product_search_token '
+        'MODIFY gram varchar(3) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL'
+    )
+
+
+def rebuild_search_tokens(apps, schema_editor):
+    from api.search_index import trigrams
+
+    Product = apps.get_model('api', 'Product')
+    ProductSearchToken = apps.get_model('api', 'ProductSearchToken')
+    ProductSearchToken.objects.all().delete()
+    tokens = []
+    for product in Product.objects.only('id', 'shop_id', 'generic_name', 'brand_name').iterator(chunk_size=1000):
+        tokens.extend(
+            ProductSearchToken(shop_id=product.shop_id, product_id=product.id, gram=gram)
+            for gram in trigrams(product.generic_name, product.brand_name)
+        )
+        if len(tokens) >= 5000:
+            ProductSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    ProductSearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_account_token_epoch'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_binary_collation, migrations.RunPython.noop),
+        # Tokens are now accent-folded
+        migrations.RunPython(rebuild_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_search_token_binary_gram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'api_token_revocation',
+                'indexes': [models.Index(fields=['expires_at'], name='api_token_r_expires_eeef95_idx')],
+            },
+        ),
+    ]
@@ -6,7 +6,8 @@ class Manager(models.Model):
     """Manager account - can manage multiple shops"""
     phone = models.CharField(max_length=10, primary_key=True)
     name = models.CharField(max_length=100)
-    password = models.CharField(max_length=100)
+    password = models.CharField(max_length=128)
+    token_epoch = models.PositiveIntegerField(default=0)  # bumped to revoke issued tokens
 
     class Meta:
         db_table = 'api_manager'
@@ -20,6 +21,7 @@ class Shop(models.Model):
     shop_id = models.AutoField(primary_key=True)
     shopname = models.CharField(max_length=100)
     manager = models.ForeignKey(Manager, on_delete=models.CASCADE, related_name='shops')
+    city = models.CharField(max_length=100, blank=True, default='')
 
     class Meta:
         db_table = 'api_shop'
@@ -35,9 +37,10 @@ class Staff(models.Model):
     """Staff accounts tied to a specific shop"""
     phone = models.CharField(max_length=10, primary_key=True)
     name = models.CharField(max_length=100)
-    password = models.CharField(max_length=100)
+    password = models.CharField(max_length=128)
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='staff_members')
     is_active = models.BooleanField(default=True)
+    token_epoch = models.PositiveIntegerField(default=0)  # bumped to revoke issued tokens
 
     class Meta:
         db_table = 'api_staff'
@@ -61,6 +64,11 @@ class Product(models.Model):
     prescription_required = models.BooleanField(default=False)
     composition_id = models.IntegerField(null=True, blank=True)
     therapeutic_category = models.CharField(max_length=100, null=True, blank=True)
+    reorder_point = models.PositiveIntegerField(default=10)
+    # Maintained by api.product_stock: unexpired units across batches, and the
+    # earliest expiry among them (after which the total is out of date)
+    stock_on_hand = models.IntegerField(default=0)
+    next_expiry = models.DateField(null=True, blank=True)
 
     class Meta:
         db_table = 'api_product'
@@ -68,12 +76,31 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=['shop', 'product_id']),
             models.Index(fields=['shop', 'generic_name']),
+            models.Index(fields=['shop', 'stock_on_hand']),
+            models.Index(fields=['shop', 'next_expiry']),
         ]
 
     def __str__(self):
         return f"{self.generic_name} ({self.product_id}) - {self.shop.shopname}"
 
 
+class ProductSearchToken(models.Model):
+    """Trigram index over product brand/generic names, kept in sync by api.search_index"""
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_tokens')
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        db_table = 'api_product_search_token'
+        unique_together = ('product', 'gram')
+        indexes = [
+            models.Index(fields=['shop', 'gram']),
+        ]
+
+    def __str__(self):
+        return f"{self.gram} -> {self.product_id}"
+
+
 class Batch(models.Model):
     """Product batches with stock and pricing"""
     id = models.BigAutoField(primary_key=True)
@@ -89,10 +116,19 @@ class Batch(models.Model):
         db_table = 'api_batch'
         unique_together = ('batch_number', 'product', 'shop')
         indexes = [
-            models.Index(fields=['shop', 'expiry_date']),
+            # Expiry range scans check the stock filter on index entries, so
+            # only rows of in-stock batches are read
+            models.Index(fields=['shop', 'expiry_date', 'quantity_in_stock']),
             models.Index(fields=['shop', 'quantity_in_stock']),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored stock so saves can tell whether it moved
+        instance._loaded_quantity = instance.__dict__.get('quantity_in_stock')
+        return instance
+
     def __str__(self):
         return f"Batch {self.batch_number} - {self.product.generic_name} - {self.shop.shopname}"
 
@@ -115,6 +151,13 @@ class Order(models.Model):
             models.Index(fields=['shop', 'customer_number']),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored total so rollups can apply the delta on save
+        instance._loaded_total_amount = instance.__dict__.get('total_amount')
+        return instance
+
     def __str__(self):
         return f"Order {self.order_id} - {self.shop.shopname} - {self.order_date}"
 
@@ -149,6 +192,133 @@ class Payment(models.Model):
     class Meta:
         db_table = 'api_payment'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored payment so rollups can apply the delta on save
+        instance._loaded_payment = (instance.__dict__.get('payment_type'), instance.__dict__.get('transaction_amount'))
+        return instance
+
     def __str__(self):
         return f"Payment for Order {self.order.order_id} - {self.payment_type} - ₹{self.transaction_amount}"
 
+
+class ShopDailyStats(models.Model):
+    """Per-shop, per-day sales rollup maintained by api.rollups"""
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.IntegerField(default=0)  # units sold
+    upi_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cash_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    card_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'api_shop_daily_stats'
+        unique_together = ('shop', 'date')
+
+    def __str__(self):
+        return f"{self.shop_id} @ {self.date}: {self.order_count} orders, ₹{self.revenue}"
+
+
+class ShopDataVersion(models.Model):
+    """Per-shop change counters used for ETags, bumped by api.versioning"""
+    shop = models.OneToOneField(Shop, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    catalog = models.BigIntegerField(default=0)
+    stock = models.BigIntegerField(default=0)
+    orders = models.BigIntegerField(default=0)
+    payments = models.BigIntegerField(default=0)
+    sync_floor = models.BigIntegerField(default=0)  # CatalogChange ids up to here were pruned
+
+    class Meta:
+        db_table = 'api_shop_data_version'
+
+    def __str__(self):
+        return f"{self.shop_id}: catalog {self.catalog}, stock {self.stock}, orders {self.orders}, payments {self.payments}"
+
+
+class CatalogChange(models.Model):
+    """Change log of a shop's products and batches, read by the sync endpoint"""
+    KINDS = [
+        ('product', 'Product'),
+        ('batch', 'Batch'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='catalog_changes')
+    kind = models.CharField(max_length=7, choices=KINDS)
+    key = models.CharField(max_length=20)  # Product.product_id or Batch.id
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_catalog_change'
+        indexes = [
+            models.Index(fields=['shop', 'id']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.key}{' deleted' if self.deleted else ''}"
+
+
+class ShopExpiryBucket(models.Model):
+    """Per-shop stock grouped by time to expiry, refreshed nightly by api.expiry"""
+    BUCKETS = [
+        ('expired', 'Expired'),
+        ('7d', 'Within 7 days'),
+        ('30d', '8 to 30 days'),
+        ('90d', '31 to 90 days'),
+    ]
+
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='expiry_buckets')
+    bucket = models.CharField(max_length=7, choices=BUCKETS)
+    computed_on = models.DateField()
+    batch_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    value_at_risk = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'api_shop_expiry_bucket'
+        unique_together = ('shop', 'bucket')
+
+    def __str__(self):
+        return f"{self.shop_id} {self.bucket} @ {self.computed_on}: {self.batch_count} batches, ₹{self.value_at_risk}"
+
+
+class DemandForecast(models.Model):
+    """Top forecast salts (generic names) per shop or per city and calendar month, written by api.forecast"""
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, null=True, blank=True, related_name='demand_forecasts')
+    city = models.CharField(max_length=100, blank=True, default='')  # lower-cased; set on city-wide rows
+    month = models.PositiveSmallIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    generic_name = models.CharField(max_length=100)
+    predicted_units = models.FloatField()
+    trained_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'api_demand_forecast'
+        indexes = [
+            models.Index(fields=['shop', 'month', 'rank']),
+            models.Index(fields=['city', 'month', 'rank']),
+        ]
+
+    def __str__(self):
+        scope = self.shop_id or self.city
+        return f"{scope} month {self.month} #{self.rank}: {self.generic_name} ({self.predicted_units:.1f})"
+
+
+class TokenRevocation(models.Model):
+    """Revoked access tokens by account or shop, fronted by a cache in api.revocation"""
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField()  # minimum token epoch, or revocation time (Unix) for shops
+    expires_at = models.DateTimeField(null=True, blank=True)  # null: kept for good
+
+    class Meta:
+        db_table = 'api_token_revocation'
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.key} >= {self.value}"
@@ -0,0 +1,118 @@
+"""Password hashing for Manager and Staff accounts.
+
+settings.PASSWORD_HASHERS lists the hashers below, the configured one
+(settings.PASSWORD_HASHING['HASHER']) first. New hashes use that one with the
+cost parameters from PASSWORD_HASHING. Hashes made by another hasher, or
+with other parameters, still verify, and `verify_password` rehashes them on
+the next successful login. Existing accounts therefore move to the new
+scheme as their users log in.
+
+The default is Argon2id at the OWASP minimum (19 MiB, 2 passes, 1 lane):
+about 50 ms per hash, against about 400 ms for PBKDF2 with Django's
+1,000,000 iterations. It requires the argon2-cffi package.
+
+Hashing is CPU and memory heavy, so at most MAX_CONCURRENT hashes run at once
+per process. A caller that cannot get a slot within ACQUIRE_TIMEOUT seconds
+gets HashingBusy, which views turn into a 503. A burst of logins then queues
+on the semaphore instead of taking every worker thread from billing
+requests.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+DEFAULTS = {
+    'HASHER': 'argon2',
+    'PBKDF2_ITERATIONS': hashers.PBKDF2PasswordHasher.iterations,
+    'SCRYPT_WORK_FACTOR': hashers.ScryptPasswordHasher.work_factor,
+    'SCRYPT_BLOCK_SIZE': hashers.ScryptPasswordHasher.block_size,
+    'SCRYPT_PARALLELISM': hashers.ScryptPasswordHasher.parallelism,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,  # KiB
+    'ARGON2_PARALLELISM': 1,
+    'MAX_CONCURRENT': 2,
+    'ACQUIRE_TIMEOUT': 5.0,
+}
+
+
+def get_settings():
+    return {**DEFAULTS, **getattr(settings, 'PASSWORD_HASHING', {})}
+
+
+class HashingBusy(Exception):
+    """No hashing slot became free within ACQUIRE_TIMEOUT."""
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return get_settings()['PBKDF2_ITERATIONS']
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return get_settings()['SCRYPT_WORK_FACTOR']
+
+    @property
+    def block_size(self):
+        return get_settings()['SCRYPT_BLOCK_SIZE']
+
+    @property
+    def parallelism(self):
+        return get_settings()['SCRYPT_PARALLELISM']
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return get_settings()['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return get_settings()['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return get_settings()['ARGON2_PARALLELISM']
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def _get_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(max(get_settings()['MAX_CONCURRENT'], 1))
+        return _slots
+
+
+class _hashing_slot:
+    def __enter__(self):
+        if not _get_slots().acquire(timeout=get_settings()['ACQUIRE_TIMEOUT']):
+            raise HashingBusy('Too many password checks in progress')
+
+    def __exit__(self, *exc_info):
+        _get_slots().release()
+
+
+def hash_password(raw_password):
+    """make_password, within the concurrency limit."""
+    with _hashing_slot():
+        return hashers.make_password(raw_password)
+
+
+def verify_password(raw_password, encoded, model, pk):
+    """Check a password against an account's stored hash.
+
+    When the hash is outdated, the account row (`model` with primary key
+    `pk`) is updated with a fresh hash from the preferred hasher.
+    """
+    def rehash(raw):
+        model.objects.filter(pk=pk).update(password=hashers.make_password(raw))
+
+    with _hashing_slot():
+        return hashers.check_password(raw_password, encoded, setter=rehash)
@@ -0,0 +1,61 @@
+"""Product-level stock totals (Product.stock_on_hand / next_expiry).
+
+`stock_on_hand` is the sum of in-stock units across a product's unexpired
+batches. `signals.stock_changed` recomputes the affected products inside the
+writing transaction, so it covers batch saves/deletes and the bulk checkout
+path alike. A total also goes stale without any write once its earliest
+batch expires; `next_expiry` records that day, and `refresh_expired`
+recomputes the products past it (nightly via `manage.py
+refresh_product_stock`, and lazily by the reorder endpoint).
+"""
+from datetime import date
+
+from django.apps import apps as django_apps
+from django.db.models import DateField, IntegerField, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def refresh_products(product_ids, apps=django_apps):
+    """Recompute stock_on_hand/next_expiry for the given product pks with one UPDATE."""
+    Product = apps.get_model('api', 'Product')
+    Batch = apps.get_model('api', 'Batch')
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return 0
+    # Correlated subqueries keep the statement the same size however many
+    # products are refreshed (bulk imports pass a thousand at a time)
+    counted = Batch.objects.filter(
+        product_id=OuterRef('pk'), quantity_in_stock__gt=0, expiry_date__gt=date.today()
+    ).order_by().values('product_id')
+    return Product.objects.filter(id__in=product_ids).update(
+        stock_on_hand=Coalesce(
+            Subquery(counted.annotate(units=Sum('quantity_in_stock')).values('units')),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        next_expiry=Subquery(counted.annotate(first=Min('expiry_date')).values('first'), output_field=DateField()),
+    )
+
+
+def refresh_expired(shop_id=None, chunk_size=500, apps=django_apps):
+    """Recompute products whose earliest counted batch has expired since."""
+    Product = apps.get_model('api', 'Product')
+    stale = Product.objects.filter(next_expiry__lte=date.today())
+    if shop_id is not None:
+        stale = stale.filter(shop_id=shop_id)
+    ids = list(stale.values_list('id', flat=True))
+    for i in range(0, len(ids), chunk_size):
+        refresh_products(ids[i:i + chunk_size], apps=apps)
+    return len(ids)
+
+
+def rebuild(shop_id=None, chunk_size=500, apps=django_apps):
+    """Recompute every product, e.g. after bulk edits that bypass signals."""
+    Product = apps.get_model('api', 'Product')
+    products = Product.objects.order_by('id')
+    if shop_id is not None:
+        products = products.filter(shop_id=shop_id)
+    ids = list(products.values_list('id', flat=True))
+    for i in range(0, len(ids), chunk_size):
+        refresh_products(ids[i:i + chunk_size], apps=apps)
+    return len(ids)
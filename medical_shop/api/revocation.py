@@ -0,0 +1,111 @@
+"""Revocation set for access tokens, shared by every worker process.
+
+Access tokens are checked from their claims alone, without a database query,
+so revoking one before it expires needs state that every request can check
+cheaply. Entries are stored as TokenRevocation rows and fronted by the Django
+cache AUTH_TOKENS['REVOCATION_CACHE'] ("shared"), so a revocation reaches all
+workers at once. A key missing from the cache is read back from the table,
+absence included, so an evicted or flushed entry costs one query rather than
+letting revoked tokens through. Two kinds are kept:
+
+- account: tokens for (role, phone) issued with an epoch below a minimum
+  are rejected, in every shop. A logout's entry expires with the access
+  tokens it covers (ACCESS_TTL). Removing a staff member deletes their
+  Staff row, so that entry is kept for good and a staff member added back
+  starts at its minimum (`min_epoch`): nothing issued before the removal,
+  refresh tokens included, becomes valid again.
+- shop: tokens for a shop issued before its revocation are rejected
+  (shop deleted); kept for ACCESS_TTL.
+
+Refresh goes to the database (`token_epoch`) as well, so no worker issues
+new tokens after a revocation either.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import TokenRevocation
+
+
+class RevocationSet:
+    def __init__(self, alias=None):
+        self._alias = alias
+
+    @property
+    def options(self):
+        return getattr(settings, 'AUTH_TOKENS', {})
+
+    @property
+    def cache(self):
+        return caches[self._alias or self.options.get('REVOCATION_CACHE', 'shared')]
+
+    def _account_key(self, role, phone):
+        return f'revoked:account:{role}:{phone}'
+
+    def _shop_key(self, shop_id):
+        return f'revoked:shop:{int(shop_id)}'
+
+    def _store(self, key, value, ttl):
+        """Raise the entry to at least `value` for `ttl` seconds (None: for good)."""
+        now = timezone.now()
+        expires_at = None if ttl is None else now + timedelta(seconds=ttl)
+        with transaction.atomic():
+            TokenRevocation.objects.filter(expires_at__lte=now).delete()
+            row, created = TokenRevocation.objects.select_for_update().get_or_create(
+                key=key, defaults={'value': value, 'expires_at': expires_at},
+            )
+            if not created:
+                row.value = max(row.value, value)
+                if row.expires_at is not None:
+                    row.expires_at = None if expires_at is None else max(row.expires_at, expires_at)
+                row.save(update_fields=['value', 'expires_at'])
+        self.cache.set(key, row.value, self.options.get('ACCESS_TTL', 900))
+
+    def _stored(self, keys):
+        return dict(
+            TokenRevocation.objects.filter(key__in=keys)
+            .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+            .values_list('key', 'value')
+        )
+
+    def _lookup(self, keys):
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            stored = self._stored(missing)
+            for key in missing:
+                found[key] = stored.get(key, 0)
+                # add(), not set(): a revocation cached since the read wins
+                self.cache.add(key, found[key], self.options.get('ACCESS_TTL', 900))
+        return found
+
+    def revoke_account(self, role, phone, min_epoch, ttl):
+        """Reject the account's tokens with an epoch below `min_epoch`."""
+        self._store(self._account_key(role, phone), min_epoch, ttl)
+
+    def min_epoch(self, role, phone):
+        """The lowest epoch the account's tokens may carry, read from the database."""
+        key = self._account_key(role, phone)
+        return self._stored([key]).get(key, 0)
+
+    def revoke_shop(self, shop_id, ttl):
+        self._store(self._shop_key(shop_id), int(time.time()), ttl)
+
+    def is_revoked(self, claims):
+        role, phone, shop_id = claims.get('role'), claims.get('account'), claims.get('shop')
+        if shop_id is None:
+            return False
+        account_key, shop_key = self._account_key(role, phone), self._shop_key(shop_id)
+        found = self._lookup([account_key, shop_key])
+        if claims.get('epoch', 0) < found[account_key]:
+            return True
+        revoked_at = found[shop_key]
+        return bool(revoked_at) and claims.get('iat', 0) <= revoked_at
+
+
+revocations = RevocationSet()
@@ -0,0 +1,153 @@
+"""Incrementally maintained per-shop daily sales rollups (ShopDailyStats).
+
+Order and Payment signal handlers in api.signals, and the bulk order-item
+path in order_views, apply deltas here inside the writing transaction, so the
+rollup commits or rolls back together with the sale. Every sale of a shop
+updates the same row of the day, so inside a `versioning.writing()` block
+the deltas are summed and applied as the block's last statement, holding
+that row lock only for the moment before commit. `rebuild_daily_stats`
+recomputes rows from history (see `manage.py backfill_sales_rollup`).
+"""
+from decimal import Decimal
+
+from django.apps import apps as django_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+from api import versioning
+from api.models import ShopDailyStats
+
+PAYMENT_COLUMNS = {
+    'UPI': 'upi_amount',
+    'CASH': 'cash_amount',
+    'CARD': 'card_amount',
+}
+
+
+def _decimal(value):
+    return Decimal(str(value)) if value is not None else Decimal('0')
+
+
+def _payment_column(payment_type):
+    return PAYMENT_COLUMNS.get(str(payment_type or '').upper())
+
+
+def bump_daily_stats(shop_id, day, create=True, **deltas):
+    """Add `deltas` to the (shop, day) row, creating it when `create` is set.
+
+    Inside a `versioning.writing()` block this happens at the end of the block.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    versioning.accumulate(shop_id, _apply_daily_stats, (shop_id, day, create), deltas)
+
+
+def _apply_daily_stats(key, deltas):
+    shop_id, day, create = key
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if ShopDailyStats.objects.filter(shop_id=shop_id, date=day).update(**changes) or not create:
+        return
+    try:
+        with transaction.atomic():
+            ShopDailyStats.objects.create(shop_id=shop_id, date=day, **deltas)
+    except IntegrityError:
+        # Another transaction created the row first
+        ShopDailyStats.objects.filter(shop_id=shop_id, date=day).update(**changes)
+
+
+def order_saved(order, created):
+    day = order.order_date.date()
+    if created:
+        bump_daily_stats(order.shop_id, day, order_count=1, revenue=_decimal(order.total_amount))
+    elif hasattr(order, '_loaded_total_amount'):
+        bump_daily_stats(order.shop_id, day, revenue=_decimal(order.total_amount) - _decimal(order._loaded_total_amount))
+    order._loaded_total_amount = order.total_amount
+
+
+def order_deleting(order):
+    # Items go away through the cascade without signals; count them first
+    order._item_units = order.items.aggregate(units=Sum('quantity'))['units'] or 0
+
+
+def order_deleted(order):
+    bump_daily_stats(order.shop_id, order.order_date.date(), create=False,
+                     order_count=-1, revenue=-_decimal(order.total_amount),
+                     item_count=-getattr(order, '_item_units', 0))
+
+
+def items_added(order, units):
+    bump_daily_stats(order.shop_id, order.order_date.date(), item_count=units)
+
+
+def payment_saved(payment, created):
+    order = payment.order
+    day = order.order_date.date()
+    deltas = {}
+    if not created and hasattr(payment, '_loaded_payment'):
+        old_type, old_amount = payment._loaded_payment
+        old_column = _payment_column(old_type)
+        if old_column:
+            deltas[old_column] = -_decimal(old_amount)
+    column = _payment_column(payment.payment_type)
+    if column:
+        deltas[column] = deltas.get(column, 0) + _decimal(payment.transaction_amount)
+    bump_daily_stats(order.shop_id, day, **deltas)
+    payment._loaded_payment = (payment.payment_type, payment.transaction_amount)
+
+
+def payment_deleted(payment):
+    column = _payment_column(payment.payment_type)
+    if column:
+        order = payment.order
+        bump_daily_stats(order.shop_id, order.order_date.date(), create=False,
+                         **{column: -_decimal(payment.transaction_amount)})
+
+
+def rebuild_daily_stats(shop_id=None, apps=django_apps):
+    """Recompute ShopDailyStats from the order history.
+
+    `apps` lets data migrations pass their historical app registry.
+    """
+    Order = apps.get_model('api', 'Order')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    Payment = apps.get_model('api', 'Payment')
+    DailyStats = apps.get_model('api', 'ShopDailyStats')
+
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    payments = Payment.objects.all()
+    existing = DailyStats.objects.all()
+    if shop_id is not None:
+        orders = orders.filter(shop_id=shop_id)
+        items = items.filter(order__shop_id=shop_id)
+        payments = payments.filter(order__shop_id=shop_id)
+        existing = existing.filter(shop_id=shop_id)
+
+    rows = {}
+
+    def row(shop, day):
+        return rows.setdefault((shop, day), DailyStats(shop_id=shop, date=day))
+
+    for r in orders.annotate(day=TruncDate('order_date')).values('shop_id', 'day').annotate(
+            n=Count('order_id'), revenue=Sum('total_amount')).order_by():
+        stats = row(r['shop_id'], r['day'])
+        stats.order_count = r['n']
+        stats.revenue = r['revenue'] or 0
+
+    for r in items.annotate(day=TruncDate('order__order_date')).values('order__shop_id', 'day').annotate(
+            units=Sum('quantity')).order_by():
+        row(r['order__shop_id'], r['day']).item_count = r['units'] or 0
+
+    for r in payments.annotate(day=TruncDate('order__order_date')).values('order__shop_id', 'day', 'payment_type').annotate(
+            amount=Sum('transaction_amount')).order_by():
+        column = _payment_column(r['payment_type'])
+        if column:
+            stats = row(r['order__shop_id'], r['day'])
+            setattr(stats, column, (getattr(stats, column) or 0) + (r['amount'] or 0))
+
+    with transaction.atomic():
+        existing.delete()
+        DailyStats.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
@@ -0,0 +1,79 @@
+"""Trigram search index for product names.
+
+`icontains` on brand/generic name compiles to LIKE '%q%', which no B-tree
+index can serve. Every product instead gets one ProductSearchToken row per
+distinct trigram of its case- and accent-folded names; a query matches the products that
+own all of the query's trigrams, which the (shop, gram) index answers
+directly. Callers still apply the icontains filter to that small candidate set
+to drop products whose trigrams match but are not contiguous.
+
+Folding in Python keeps the index accent-insensitive like MySQL's default
+collation, and the gram column itself is compared in binary (migration
+0012), so trigrams the collation would still call equal never collide on the
+(product, gram) unique key.
+
+The index is maintained by the Product post_save signal (tokens go away with
+the product through the FK cascade) and can be rebuilt with
+`manage.py rebuild_search_index`.
+"""
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from api.models import ProductSearchToken
+
+GRAM_SIZE = 3
+TOKEN_BATCH_SIZE = 5000
+
+
+def normalize(text):
+    """Case-fold `text`, drop accents and collapse whitespace ("Café" -> "cafe")."""
+    decomposed = unicodedata.normalize('NFKD', (text or '').casefold())
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def trigrams(*texts):
+    """Distinct trigrams of the given texts."""
+    grams = set()
+    for text in texts:
+        text = normalize(text)
+        for i in range(len(text) - GRAM_SIZE + 1):
+            grams.add(text[i:i + GRAM_SIZE])
+    return grams
+
+
+def index_products(products):
+    """(Re)build the tokens of the given products."""
+    products = list(products)
+    if not products:
+        return
+    rows = [(p.shop_id, p.pk, gram) for p in products for gram in trigrams(p.generic_name, p.brand_name)]
+    # Products average a dozen tokens each; a plain executemany skips building
+    # a model instance per token, which dominates bulk imports and rebuilds
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(ProductSearchToken._meta.get_field(name).column) for name in ('shop', 'product', 'gram'))
+    sql = f'INSERT INTO {qn(ProductSearchToken._meta.db_table)} ({columns}) VALUES (%s, %s, %s)'
+    with transaction.atomic(), connection.cursor() as cursor:
+        ProductSearchToken.objects.filter(product__in=products).delete()
+        for i in range(0, len(rows), TOKEN_BATCH_SIZE):
+            cursor.executemany(sql, rows[i:i + TOKEN_BATCH_SIZE])
+
+
+def index_product(product):
+    index_products([product])
+
+
+def matching_product_ids(shop, query):
+    """Queryset of product pks in `shop` containing every trigram of `query`.
+
+    Returns None when the query is too short to produce a trigram.
+    """
+    grams = trigrams(query)
+    if not grams:
+        return None
+    return ProductSearchToken.objects.filter(
+        shop=shop, gram__in=grams
+    ).values('product_id').annotate(
+        matched=Count('gram')
+    ).filter(matched=len(grams)).values('product_id')
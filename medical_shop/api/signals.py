@@ -0,0 +1,97 @@
+"""Model signal handlers keeping derived data in sync with the core tables.
+
+Code paths that change rows with bulk queries (which send no signals) call
+the `*_changed` helpers below directly.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from api.models import Shop, Product, Batch, Order, Payment
+from api import search_index, suggestions, rollups, versioning, changelog, events, product_stock
+
+SEARCH_FIELDS = {'generic_name', 'brand_name'}
+
+
+def stock_changed(shop_id, product_ids):
+    """Batches of the given products changed stock, price or expiry."""
+    product_ids = set(product_ids)
+    versioning.bump(shop_id, 'stock')
+    product_stock.refresh_products(product_ids)
+    transaction.on_commit(lambda: suggestions.refresh_products(shop_id, product_ids), robust=True)
+
+
+@receiver(pre_delete, sender=Shop)
+def shop_deleting(sender, instance, **kwargs):
+    versioning.shop_deleting(instance.shop_id)
+
+
+@receiver(post_delete, sender=Shop)
+def shop_deleted(sender, instance, **kwargs):
+    versioning.shop_deleted(instance.shop_id)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, update_fields=None, **kwargs):
+    versioning.bump(instance.shop_id, 'catalog')
+    changelog.record(instance.shop_id, 'product', [instance.product_id])
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    search_index.index_product(instance)
+    stock_changed(instance.shop_id, [instance.pk])
+    if not created:
+        # Synced batches carry the product names
+        changelog.record(instance.shop_id, 'batch', instance.batches.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    versioning.bump(instance.shop_id, 'catalog')
+    changelog.record(instance.shop_id, 'product', [instance.product_id], deleted=True)
+    stock_changed(instance.shop_id, [instance.pk])
+
+
+@receiver(post_save, sender=Batch)
+def batch_saved(sender, instance, **kwargs):
+    stock_changed(instance.shop_id, [instance.product_id])
+    changelog.record(instance.shop_id, 'batch', [instance.pk])
+    events.stock_moved(instance.shop_id, instance, getattr(instance, '_loaded_quantity', None), instance.quantity_in_stock)
+    instance._loaded_quantity = instance.quantity_in_stock
+
+
+@receiver(post_delete, sender=Batch)
+def batch_deleted(sender, instance, **kwargs):
+    stock_changed(instance.shop_id, [instance.product_id])
+    changelog.record(instance.shop_id, 'batch', [instance.pk], deleted=True)
+    events.stock_moved(instance.shop_id, instance, getattr(instance, '_loaded_quantity', None), 0, deleted=True)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    versioning.bump(instance.shop_id, 'orders')
+    rollups.order_saved(instance, created)
+    if created:
+        events.order_placed(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleting(sender, instance, **kwargs):
+    rollups.order_deleting(instance)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    versioning.bump(instance.shop_id, 'orders')
+    rollups.order_deleted(instance)
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, created, **kwargs):
+    versioning.bump(instance.order.shop_id, 'payments')
+    rollups.payment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    versioning.bump(instance.order.shop_id, 'payments')
+    rollups.payment_deleted(instance)
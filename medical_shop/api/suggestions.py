@@ -0,0 +1,148 @@
+"""In-process per-shop autocomplete index for get_medicine_suggestions.
+
+Each shop's index is built lazily on first use from one aggregate query. It
+holds one entry per product with in-stock, unexpired batches, carrying the
+minimum selling price and total stock. Entries are reachable from a sorted
+list of (term, product pk) keys, where the terms are the lower-cased brand and
+generic names and every word suffix of them ("dolo 650" and "650"), so a
+prefix lookup is a bisect plus a short scan no matter how big the catalog is.
+
+Entries are refreshed one product at a time through `refresh_products`, which
+the Batch/Product signal handlers call after commit. Other worker processes
+only see changes when their copy expires (settings.SUGGESTION_INDEX['TTL'])
+or the day rolls over and expired batches have to drop out.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Min, Sum
+
+from api.models import Product
+
+DEFAULTS = {
+    'TTL': 300,
+    'MAX_SHOPS': 64,
+}
+
+MAX_RESULTS = 10
+
+
+def _options():
+    return {**DEFAULTS, **getattr(settings, 'SUGGESTION_INDEX', {})}
+
+
+def _terms(*names):
+    terms = set()
+    for name in names:
+        words = (name or '').lower().split()
+        for i in range(len(words)):
+            terms.add(' '.join(words[i:]))
+    return terms
+
+
+def _aggregate(shop_id, product_ids=None):
+    products = Product.objects.filter(
+        shop_id=shop_id,
+        batches__quantity_in_stock__gt=0,
+        batches__expiry_date__gt=date.today()
+    )
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+    return products.annotate(
+        min_price=Min('batches__selling_price'),
+        total_stock=Sum('batches__quantity_in_stock')
+    ).values('id', 'product_id', 'generic_name', 'brand_name', 'min_price', 'total_stock')
+
+
+class ShopSuggestionIndex:
+    """Sorted prefix index over one shop's in-stock products."""
+
+    def __init__(self, shop_id):
+        self.shop_id = shop_id
+        self.built_on = date.today()
+        self.built_at = time.monotonic()
+        self._entries = {}
+        self._keys = []
+        self._lock = threading.Lock()
+        for row in _aggregate(shop_id):
+            self._add(row)
+
+    def is_stale(self, ttl):
+        return self.built_on != date.today() or time.monotonic() - self.built_at > ttl
+
+    def _add(self, row):
+        self._entries[row['id']] = {
+            'product_id': row['product_id'],
+            'generic_name': row['generic_name'],
+            'brand_name': row['brand_name'],
+            'min_price': float(row['min_price']) if row['min_price'] is not None else None,
+            'total_stock': row['total_stock'],
+        }
+        for term in _terms(row['generic_name'], row['brand_name']):
+            insort(self._keys, (term, row['id']))
+
+    def _remove(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        for term in _terms(entry['generic_name'], entry['brand_name']):
+            i = bisect_left(self._keys, (term, pk))
+            if i < len(self._keys) and self._keys[i] == (term, pk):
+                del self._keys[i]
+
+    def refresh(self, product_ids):
+        rows = list(_aggregate(self.shop_id, product_ids))
+        with self._lock:
+            for pk in product_ids:
+                self._remove(pk)
+            for row in rows:
+                self._add(row)
+
+    def search(self, query, limit=MAX_RESULTS):
+        query = ' '.join(query.lower().split())
+        matched = set()
+        with self._lock:
+            i = bisect_left(self._keys, (query,))
+            while i < len(self._keys) and self._keys[i][0].startswith(query):
+                matched.add(self._keys[i][1])
+                i += 1
+            results = [self._entries[pk] for pk in matched]
+        results.sort(key=lambda e: e['brand_name'] or '')
+        return results[:limit]
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(shop_id):
+    """Return the shop's index, building it on first use or when stale."""
+    options = _options()
+    with _indexes_lock:
+        index = _indexes.get(shop_id)
+        if index is not None and not index.is_stale(options['TTL']):
+            _indexes.move_to_end(shop_id)
+            return index
+
+    index = ShopSuggestionIndex(shop_id)
+    with _indexes_lock:
+        _indexes[shop_id] = index
+        _indexes.move_to_end(shop_id)
+        while len(_indexes) > options['MAX_SHOPS']:
+            _indexes.popitem(last=False)
+    return index
+
+
+def refresh_products(shop_id, product_ids):
+    """Re-aggregate the given products if this process has the shop loaded."""
+    index = _indexes.get(shop_id)
+    if index is not None and product_ids:
+        index.refresh(list(product_ids))
+
+
+def drop(shop_id):
+    _indexes.pop(shop_id, None)
@@ -0,0 +1,315 @@
+"""Synthetic shop data for reproducing production-scale load locally.
+
+`generate` creates N shops. Each gets M products (with 1-3 batches each)
+and K orders spread over the last `days` days. Data comes from a NumPy
+generator seeded per (seed, shop number), so the same arguments always give
+the same data. Distributions:
+
+- Product popularity is Zipf-like, so a few products make most of the sales.
+- Each therapeutic category has a monthly seasonal profile (antihistamines
+  peak in spring, antipyretics in the monsoon). It scales which products
+  are bought, on top of a milder seasonal and weekly order volume.
+- Orders cluster in the late morning and evening. Baskets hold
+  1 + Poisson(BASKET_EXTRA_ITEMS) items and quantities are geometric.
+- Most batch expiries fall 6-24 months out. A small share is already
+  expired or expires within 90 days, so the expiry views have data.
+
+Orders, items and payments are written ORDER_CHUNK orders at a time, which
+keeps memory flat. Rows use explicit primary keys and go in through
+executemany (`_insert`) rather than bulk_create: auto_now_add would
+overwrite the generated order dates, and building a model instance per row
+is most of the cost at ten million items. Derived tables (search index,
+stock totals, daily rollups, expiry buckets) are rebuilt per shop at the
+end.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from api import expiry, product_stock, rollups, search_index, versioning
+from api.models import Batch, Manager, Order, OrderItem, Payment, Product, Shop
+
+ORDER_CHUNK = 50000
+INSERT_BATCH = 5000
+SHOP_NAME_PREFIX = 'Synthetic Pharmacy'
+BASKET_EXTRA_ITEMS = 1.6
+MAX_BASKET = 10
+POPULARITY_EXPONENT = 1.1
+
+# (brand, generic, hsn, gst, prescription, category)
+MEDICINES = [
+    ('Paracetamol', 'Acetaminophen', '30049011', 12, False, 'Analgesic'),
+    ('Dolo 650', 'Paracetamol', '30049011', 12, False, 'Antipyretic'),
+    ('Crocin Advance', 'Paracetamol', '30049011', 12, False, 'Analgesic'),
+    ('Azithromycin', 'Azithromycin', '30042090', 12, True, 'Antibiotic'),
+    ('Amoxicillin', 'Amoxicillin', '30042090', 12, True, 'Antibiotic'),
+    ('Cipro 500', 'Ciprofloxacin', '30042090', 12, True, 'Antibiotic'),
+    ('Cetirizine', 'Cetirizine', '30049099', 12, False, 'Antihistamine'),
+    ('Allegra 120', 'Fexofenadine', '30049099', 12, False, 'Antihistamine'),
+    ('Omeprazole', 'Omeprazole', '30049039', 12, False, 'Antacid'),
+    ('Pantoprazole', 'Pantoprazole', '30049039', 12, False, 'Antacid'),
+    ('Metformin 500', 'Metformin', '30049049', 12, True, 'Antidiabetic'),
+    ('Glimepiride', 'Glimepiride', '30049049', 12, True, 'Antidiabetic'),
+    ('Amlodipine', 'Amlodipine', '30049019', 12, True, 'Antihypertensive'),
+    ('Atenolol', 'Atenolol', '30049019', 12, True, 'Antihypertensive'),
+    ('Vitamin C', 'Ascorbic Acid', '30049091', 12, False, 'Vitamin'),
+    ('Vitamin D3', 'Cholecalciferol', '30049091', 12, False, 'Vitamin'),
+    ('Multivitamin', 'Multivitamin', '30049091', 12, False, 'Supplement'),
+    ('Ibuprofen', 'Ibuprofen', '30049011', 12, False, 'NSAID'),
+    ('Diclofenac', 'Diclofenac', '30049011', 12, False, 'NSAID'),
+    ('Aspirin', 'Acetylsalicylic Acid', '30049011', 12, False, 'Antiplatelet'),
+]
+BRAND_VARIANTS = ['', ' Forte', ' Plus', ' SR', ' DS', ' 250', ' 500', ' Kid']
+
+# category -> (peak month 1-12, amplitude); other categories are flat
+SEASONAL_PEAKS = {
+    'Antipyretic': (8, 0.6),
+    'Antibiotic': (8, 0.3),
+    'Antihistamine': (3, 0.7),
+    'Analgesic': (12, 0.2),
+    'Vitamin': (1, 0.3),
+}
+VOLUME_PEAK = (8, 0.15)
+WEEKDAY_VOLUME = np.array([1.0, 1.0, 1.0, 1.0, 1.05, 1.15, 0.75])  # Monday first
+HOUR_WEIGHTS = np.array([0, 0, 0, 0, 0, 0, 0, 0.2, 0.6, 1.0, 1.3, 1.4, 1.2, 0.9,
+                         0.7, 0.6, 0.7, 0.9, 1.3, 1.5, 1.3, 0.8, 0.3, 0])
+PAYMENT_TYPES = ['UPI', 'CASH', 'CARD']
+PAYMENT_WEIGHTS = [0.6, 0.3, 0.1]
+DISCOUNTS = np.array([0, 0, 0, 0, 5, 10, 15])
+
+CITIES = ['Mumbai', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Guwahati']
+CUSTOMER_NAMES = ['Rajesh Kumar', 'Priya Sharma', 'Amit Patel', 'Sneha Reddy', 'Vikram Singh',
+                  'Anita Desai', 'Ravi Verma', 'Deepika Nair', 'Suresh Gupta', 'Kavita Joshi',
+                  'Arjun Mehta', 'Pooja Iyer', 'Nikhil Rao', 'Swati Malhotra', 'Akash Chopra']
+DOCTOR_NAMES = ['Dr. Ramesh Kumar', 'Dr. Sunita Patel', 'Dr. Anil Sharma', 'Dr. Meera Reddy',
+                'Dr. Rajiv Singh', 'Dr. Neha Gupta', 'Dr. Suresh Rao', 'Dr. Anjali Verma']
+
+
+def _seasonal(peak, amplitude, months):
+    """Multiplier per month (1-12 array) peaking at `peak`."""
+    return 1 + amplitude * np.cos(2 * np.pi * (months - peak) / 12)
+
+
+def _insert(model, fields, rows):
+    """Plain multi-row INSERT of value tuples into a model's table."""
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(model._meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    sql = f'INSERT INTO {qn(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), INSERT_BATCH):
+            cursor.executemany(sql, rows[i:i + INSERT_BATCH])
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _create_shops(count, rng, password):
+    """One manager per shop, with unused 10-digit phone numbers starting with 6."""
+    hashed = make_password(password)
+    taken = set(Manager.objects.filter(phone__startswith='6').values_list('phone', flat=True))
+    shops = []
+    number = 0
+    for i in range(count):
+        while f'6{number:09d}' in taken:
+            number += 1
+        phone = f'6{number:09d}'
+        taken.add(phone)
+        manager = Manager.objects.create(phone=phone, name=f'Synthetic Manager {number}', password=hashed)
+        shop = Shop.objects.create(manager=manager, shopname=SHOP_NAME_PREFIX, city=CITIES[rng.integers(len(CITIES))])
+        shop.shopname = f'{SHOP_NAME_PREFIX} {shop.shop_id}'
+        shop.save(update_fields=['shopname'])
+        shops.append(shop)
+    return shops
+
+
+class ShopCatalog:
+    """A shop's generated products and batches, as arrays indexed by product."""
+
+    def __init__(self, rng, n_products, first_product_id, first_batch_id, today):
+        base = np.arange(n_products) % len(MEDICINES)
+        self.ids = first_product_id + np.arange(n_products)
+        self.categories = np.array([MEDICINES[b][5] for b in base])
+        rank = rng.permutation(n_products) + 1
+        self.popularity = 1.0 / rank ** POPULARITY_EXPONENT
+
+        self.products = []
+        for i, b in enumerate(base):
+            brand, generic, hsn, gst, prescription, category = MEDICINES[b]
+            variant = i // len(MEDICINES)
+            suffix = BRAND_VARIANTS[variant % len(BRAND_VARIANTS)]
+            if variant >= len(BRAND_VARIANTS):
+                suffix += f' {variant // len(BRAND_VARIANTS) + 1}'
+            self.products.append((
+                int(self.ids[i]), f'SYN{i:06d}', brand + suffix, generic, hsn, gst, prescription,
+                int(b) + 1, category, int(rng.integers(5, 30)),
+            ))
+
+        # Batches: 1-3 per product, laid out contiguously per product
+        self.batch_counts = rng.integers(1, 4, size=n_products)
+        self.batch_starts = np.r_[0, np.cumsum(self.batch_counts)[:-1]]
+        n_batches = int(self.batch_counts.sum())
+        batch_products = np.repeat(np.arange(n_products), self.batch_counts)
+        self.batch_ids = first_batch_id + np.arange(n_batches)
+
+        base_cost = rng.lognormal(mean=4.0, sigma=0.8, size=n_products)
+        cost = np.round(base_cost[batch_products] * rng.uniform(0.95, 1.05, size=n_batches), 2)
+        self.selling_price = np.round(cost * rng.uniform(1.2, 1.8, size=n_batches), 2)
+
+        kind = rng.random(n_batches)
+        expiry_days = np.where(
+            kind < 0.02, rng.integers(-60, 0, size=n_batches),
+            np.where(kind < 0.08, rng.integers(0, 91, size=n_batches), rng.integers(180, 731, size=n_batches)),
+        )
+        expiry_dates = (np.datetime64(today) + expiry_days).tolist()
+        quantities = rng.integers(0, 300, size=n_batches)
+
+        self.batches = list(zip(
+            self.batch_ids.tolist(), [f'B{n:05d}' for n in range(n_batches)], self.ids[batch_products].tolist(),
+            expiry_dates, cost.tolist(), self.selling_price.tolist(), quantities.tolist(),
+        ))
+
+    def month_weights(self):
+        """(12 x products) probabilities of picking each product by calendar month."""
+        months = np.arange(1, 13)
+        weights = np.tile(self.popularity, (12, 1))
+        for category, (peak, amplitude) in SEASONAL_PEAKS.items():
+            in_category = self.categories == category
+            weights[:, in_category] *= _seasonal(peak, amplitude, months)[:, None]
+        return weights / weights.sum(axis=1, keepdims=True)
+
+
+def _order_days(rng, n_orders, start, days):
+    """Day offset (from start) of every order, in chronological order."""
+    day_dates = np.datetime64(start) + np.arange(days)
+    months = (day_dates.astype('datetime64[M]').astype(int) % 12) + 1
+    weekdays = (day_dates.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    volume = WEEKDAY_VOLUME[weekdays] * _seasonal(*VOLUME_PEAK, months) * np.linspace(0.8, 1.0, days)
+    counts = rng.multinomial(n_orders, volume / volume.sum())
+    return np.repeat(np.arange(days, dtype=np.int32), counts)
+
+
+def _write_orders(rng, shop, catalog, month_weights, order_days, start, first_order_id, first_item_id):
+    """Generate and insert one chunk of orders with their items and payments."""
+    n = len(order_days)
+    order_ids = first_order_id + np.arange(n)
+    hours = rng.choice(24, size=n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = order_days.astype(np.int64) * 86400 + hours * 3600 + rng.integers(0, 3600, size=n)
+    order_dates = np.datetime64(datetime.combine(start, datetime.min.time()), 's') + seconds
+    months = order_dates.astype('datetime64[M]').astype(int) % 12
+
+    basket = 1 + np.minimum(rng.poisson(BASKET_EXTRA_ITEMS, size=n), MAX_BASKET - 1)
+    item_orders = np.repeat(np.arange(n), basket)
+    item_months = months[item_orders]
+    n_items = len(item_orders)
+
+    products = np.empty(n_items, dtype=np.int64)
+    for month in range(12):
+        in_month = item_months == month
+        products[in_month] = rng.choice(len(catalog.ids), size=int(in_month.sum()), p=month_weights[month])
+    batches = catalog.batch_starts[products] + (rng.random(n_items) * catalog.batch_counts[products]).astype(np.int64)
+    quantities = np.minimum(rng.geometric(0.55, size=n_items), 10)
+
+    # An order holds each batch once: merge repeat picks into one line
+    n_batches = len(catalog.batch_ids)
+    lines, line_codes = np.unique(item_orders * n_batches + batches, return_inverse=True)
+    quantities = np.bincount(line_codes, weights=quantities).astype(np.int64)
+    item_orders, batches = lines // n_batches, lines % n_batches
+    n_items = len(lines)
+    prices = catalog.selling_price[batches]
+
+    discounts = rng.choice(DISCOUNTS, size=n)
+    totals = np.bincount(item_orders, weights=quantities * prices, minlength=n) * (1 - discounts / 100)
+    totals = np.round(totals, 2)
+
+    customers = rng.integers(len(CUSTOMER_NAMES), size=n)
+    phones = rng.integers(7000000000, 10000000000, size=n)
+    doctors = np.where(rng.random(n) < 0.7, rng.integers(len(DOCTOR_NAMES), size=n), -1)
+    payment_types = rng.choice(len(PAYMENT_TYPES), size=n, p=PAYMENT_WEIGHTS)
+
+    with transaction.atomic():
+        _insert(Order, ['order_id', 'shop', 'customer_name', 'customer_number', 'doctor_name',
+                        'total_amount', 'discount_percentage', 'order_date'], list(zip(
+            order_ids.tolist(), [shop.shop_id] * n, [CUSTOMER_NAMES[c] for c in customers],
+            [str(p) for p in phones], [DOCTOR_NAMES[d] if d >= 0 else None for d in doctors],
+            totals.tolist(), discounts.astype(float).tolist(), order_dates.astype('datetime64[us]').tolist(),
+        )))
+        _insert(OrderItem, ['id', 'order', 'batch', 'quantity', 'unit_price'], list(zip(
+            (first_item_id + np.arange(n_items)).tolist(), order_ids[item_orders].tolist(),
+            catalog.batch_ids[batches].tolist(), quantities.tolist(), prices.tolist(),
+        )))
+        _insert(Payment, ['order', 'payment_type', 'transaction_amount'], list(zip(
+            order_ids.tolist(), [PAYMENT_TYPES[t] for t in payment_types], totals.tolist(),
+        )))
+    return n_items
+
+
+def generate(shops=1, products=200, orders=5000, days=365, seed=42, password='password', log=None):
+    """Create `shops` shops of synthetic data; returns row counts."""
+    log = log or (lambda message: None)
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+    counts = {'shops': 0, 'products': 0, 'batches': 0, 'orders': 0, 'order_items': 0}
+
+    created = _create_shops(shops, np.random.default_rng([seed, 0]), password)
+    product_id, batch_id = _next_id(Product), _next_id(Batch)
+    order_id, item_id = _next_id(Order), _next_id(OrderItem)
+
+    for number, shop in enumerate(created, start=1):
+        rng = np.random.default_rng([seed, number])
+        catalog = ShopCatalog(rng, products, product_id, batch_id, today)
+        with transaction.atomic():
+            _insert(Product, ['id', 'shop', 'product_id', 'brand_name', 'generic_name', 'hsn', 'gst',
+                              'prescription_required', 'composition_id', 'therapeutic_category', 'reorder_point',
+                              'stock_on_hand'],
+                    [(p[0], shop.shop_id, *p[1:], 0) for p in catalog.products])
+            _insert(Batch, ['id', 'batch_number', 'product', 'shop', 'expiry_date', 'average_purchase_price',
+                            'selling_price', 'quantity_in_stock'],
+                    [(b[0], b[1], b[2], shop.shop_id, *b[3:]) for b in catalog.batches])
+        product_id += len(catalog.products)
+        batch_id += len(catalog.batches)
+
+        month_weights = catalog.month_weights()
+        order_days = _order_days(rng, orders, start, days)
+        for i in range(0, orders, ORDER_CHUNK):
+            chunk = order_days[i:i + ORDER_CHUNK]
+            n_items = _write_orders(rng, shop, catalog, month_weights, chunk, start, order_id, item_id)
+            order_id += len(chunk)
+            item_id += n_items
+            counts['order_items'] += n_items
+            log(f'  shop {shop.shop_id}: {min(i + ORDER_CHUNK, orders)}/{orders} orders')
+
+        _refresh_derived(shop.shop_id)
+        counts['shops'] += 1
+        counts['products'] += len(catalog.products)
+        counts['batches'] += len(catalog.batches)
+        counts['orders'] += orders
+
+    # Explicit ids leave sequence-based backends behind; no-op on MySQL/SQLite
+    statements = connection.ops.sequence_reset_sql(no_style(), [Product, Batch, Order, OrderItem])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    return counts
+
+
+def _refresh_derived(shop_id):
+    """Rebuild what signals would have maintained for a shop's generated rows."""
+    products = Product.objects.filter(shop_id=shop_id).only('id', 'shop_id', 'generic_name', 'brand_name').order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(products.filter(id__gt=last_id)[:1000])
+        if not chunk:
+            break
+        search_index.index_products(chunk)
+        last_id = chunk[-1].id
+    product_stock.rebuild(shop_id)
+    rollups.rebuild_daily_stats(shop_id)
+    expiry.refresh_summary(shop_id)
+    versioning.bump(shop_id, *versioning.KINDS)
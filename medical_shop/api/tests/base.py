@@ -0,0 +1,82 @@
+"""Fixtures shared by the api tests.
+
+Every cache alias is swapped for local memory, so tests neither see nor
+leave entries in the file-based "shared" cache of a running server.
+"""
+import datetime
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from api.auth import issue_tokens_for
+from api.models import Batch, Manager, Product, Shop
+
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'test-{alias}'}
+    for alias in ('default', 'shared', 'catalog')
+}
+
+
+class ApiFixtures:
+    """A manager with one shop, and helpers to call the API as them."""
+
+    password = 'secret-pw'
+
+    @classmethod
+    def create_fixtures(cls):
+        cls.manager = Manager.objects.create(phone='9000000001', name='Manager', password=make_password(cls.password))
+        cls.shop = Shop.objects.create(shopname='Main', manager=cls.manager)
+
+    def clear_caches(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+    def auth(self, account=None, shop=None):
+        """Authorization header with a fresh access token."""
+        tokens = issue_tokens_for(account or self.manager, (shop or self.shop).shop_id)
+        return {'HTTP_AUTHORIZATION': f"Bearer {tokens['token']}"}
+
+    def bearer(self, token):
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def get_json(self, url, headers=None, **params):
+        return self.client.get(url, params, **(self.auth() if headers is None else headers))
+
+    def post_json(self, url, data=None, headers=None):
+        return self.client.post(url, json.dumps(data or {}), content_type='application/json',
+                                **(self.auth() if headers is None else headers))
+
+    def delete_json(self, url, headers=None):
+        return self.client.delete(url, **(self.auth() if headers is None else headers))
+
+    def make_batch(self, product_id='P1', batch_number='B1', quantity=10, price='10.00', days_to_expiry=180, shop=None):
+        shop = shop or self.shop
+        product, _ = Product.objects.get_or_create(
+            product_id=product_id, shop=shop, defaults={'generic_name': f'Generic {product_id}', 'brand_name': f'Brand {product_id}'},
+        )
+        return Batch.objects.create(
+            batch_number=batch_number, product=product, shop=shop,
+            expiry_date=datetime.date.today() + datetime.timedelta(days=days_to_expiry),
+            selling_price=price, average_purchase_price='5.00', quantity_in_stock=quantity,
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ApiTestCase(ApiFixtures, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def setUp(self):
+        self.clear_caches()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ApiTransactionTestCase(ApiFixtures, TransactionTestCase):
+    """For tests that need real commits (on_commit hooks, concurrent writers)."""
+
+    def setUp(self):
+        self.clear_caches()
+        self.create_fixtures()
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from api.models import Batch, Product
+from api.tests.base import ApiTestCase
+
+PRODUCTS_CSV = '''product_id,generic_name,brand_name,gst,prescription_required
+P1,Paracetamol,Crocin,12,no
+P2,,NoName,5,no
+P3,Ibuprofen,Brufen,abc,no
+P4,Cetirizine,Okacet,12,maybe
+P5,Amoxicillin,Mox,12,yes
+'''
+
+
+class BulkImportReportTests(ApiTestCase):
+    """user-018: invalid rows are skipped and reported, valid ones imported."""
+
+    def upload(self, kind, body, content_type='text/csv'):
+        return self.client.post(f'/api/import/{kind}/', body, content_type=content_type, **self.auth())
+
+    def test_invalid_rows_are_reported_by_number(self):
+        response = self.upload('products', PRODUCTS_CSV)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['rows'], report['imported'], report['failed']), (5, 2, 3))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4])
+        self.assertIn('generic_name', report['errors'][0]['error'])
+        self.assertFalse(report['errors_truncated'])
+        self.assertEqual(set(Product.objects.filter(shop=self.shop).values_list('product_id', flat=True)), {'P1', 'P5'})
+
+    def test_batches_of_unknown_products_fail_alone(self):
+        self.upload('products', PRODUCTS_CSV)
+        response = self.upload('batches', (
+            '[{"product_id": "P1", "batch_number": "B1", "expiry_date": "2030-01-01", "selling_price": "10", "quantity_in_stock": 5},'
+            ' {"product_id": "P9", "batch_number": "B2", "expiry_date": "2030-01-01", "selling_price": "10"},'
+            ' {"product_id": "P5", "batch_number": "B3", "expiry_date": "01/01/2030", "selling_price": "10"},'
+            ' "not a row"]'
+        ), 'application/json')
+        report = response.json()
+        self.assertEqual((report['imported'], report['failed']), (1, 3))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4])
+        self.assertIn('P9', report['errors'][0]['error'])
+        self.assertEqual(Batch.objects.get(shop=self.shop).quantity_in_stock, 5)
+
+    def test_unreadable_file_keeps_the_rows_before_it(self):
+        lines = [f'{{"product_id": "Q{n}", "generic_name": "Salt {n}"}}' for n in range(5)]
+        body = '\n'.join(lines[:3] + ['{broken'] + lines[3:])
+        response = self.upload('products', body, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        report = response.json()
+        self.assertEqual((report['rows'], report['imported']), (3, 3))
+        self.assertIn('after row 3', report['error'])
+        self.assertEqual(Product.objects.filter(shop=self.shop).count(), 3)
+
+    def test_error_list_is_capped(self):
+        rows = ''.join(f'X{n},,,,no\n' for n in range(5))
+        with mock.patch('api.bulk_import.MAX_ERRORS', 3):
+            report = self.upload('products', 'product_id,generic_name,brand_name,gst,prescription_required\n' + rows).json()
+        self.assertEqual((report['failed'], len(report['errors'])), (5, 3))
+        self.assertTrue(report['errors_truncated'])
@@ -0,0 +1,116 @@
+from decimal import Decimal
+
+from api.models import Batch, Order, OrderItem, Payment, ShopDailyStats
+from api.tests.base import ApiTestCase
+
+
+class CheckoutTests(ApiTestCase):
+    """user-002: /api/checkout/ writes order, items and payment all or nothing."""
+
+    def setUp(self):
+        super().setUp()
+        self.batch = self.make_batch(quantity=5, price='12.50')
+        self.other = self.make_batch(product_id='P2', batch_number='B2', quantity=3)
+
+    def checkout(self, items=None, payments=None, **order):
+        payload = {
+            'order': {'customer_name': 'Asha', 'total_amount': '25.00', **order},
+            'items': items if items is not None else [self.item(self.batch, 2)],
+            'payments': payments if payments is not None else [{'payment_type': 'cash', 'transaction_amount': '25.00'}],
+        }
+        return self.post_json('/api/checkout/', payload)
+
+    def item(self, batch, quantity, unit_price='12.50'):
+        return {'product_id': batch.product.product_id, 'batch_id': batch.id, 'quantity': quantity, 'unit_price': unit_price}
+
+    def assertNothingWritten(self):
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(ShopDailyStats.objects.exists())
+        self.batch.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.batch.quantity_in_stock, self.other.quantity_in_stock), (5, 3))
+
+    def test_places_order(self):
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(order_id=response.json()['order_id'])
+        self.assertEqual(order.total_amount, Decimal('25.00'))
+        self.assertEqual(order.items.get().quantity, 2)
+        self.assertEqual((order.payment.payment_type, order.payment.transaction_amount), ('CASH', Decimal('25.00')))
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.quantity_in_stock, 3)
+
+    def test_oversell_rolls_back_whole_order(self):
+        response = self.checkout(items=[self.item(self.other, 1), self.item(self.batch, 6)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient stock', response.json()['error'])
+        self.assertNothingWritten()
+
+    def test_repeated_batch_lines_count_together(self):
+        response = self.checkout(items=[self.item(self.batch, 3), self.item(self.batch, 3)])
+        self.assertEqual(response.status_code, 400)
+        self.assertNothingWritten()
+
+    def test_unknown_batch_rolls_back(self):
+        response = self.checkout(items=[self.item(self.batch, 1), {**self.item(self.batch, 1), 'batch_id': 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertNothingWritten()
+
+    def test_invalid_numbers_are_rejected(self):
+        cases = [
+            {'items': [self.item(self.batch, 1, unit_price='abc')]},
+            {'items': [self.item(self.batch, 1, unit_price='nan')]},
+            {'items': [self.item(self.batch, 1, unit_price='-1')]},
+            {'items': [self.item(self.batch, '2.9')]},
+            {'items': [self.item(self.batch, 0)]},
+            {'items': [self.item(self.batch, True)]},
+            {'items': [{**self.item(self.batch, 1), 'batch_id': 'x'}]},
+            {'items': [{'batch_id': self.batch.id, 'quantity': 1}]},
+            {'payments': [{'payment_type': 'cash', 'transaction_amount': 'nan'}]},
+            {'payments': [{'payment_type': 'cash', 'transaction_amount': 'Infinity'}]},
+            {'payments': [{'payment_type': 'cash', 'transaction_amount': 'abc'}]},
+            {'payments': [{'payment_type': 'cheque', 'transaction_amount': '25'}]},
+            {'total_amount': 'abc'},
+            {'total_amount': '1e300'},
+            {'discount_percentage': 'inf'},
+            {'discount_percentage': '150'},
+        ]
+        for case in cases:
+            with self.subTest(case=case):
+                response = self.checkout(**case)
+                self.assertEqual(response.status_code, 400, response.content)
+        self.assertNothingWritten()
+
+    def test_malformed_payload(self):
+        for payload in ([], {'order': 'x', 'items': []}, {'items': 'abc'}, {'items': [self.item(self.batch, 1)], 'payments': 5}):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post_json('/api/checkout/', payload).status_code, 400)
+        self.assertNothingWritten()
+
+    def test_mixed_payment_types_are_rejected(self):
+        response = self.checkout(payments=[
+            {'payment_type': 'cash', 'transaction_amount': '10'},
+            {'payment_type': 'upi', 'transaction_amount': '15'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertNothingWritten()
+
+    def test_amounts_stay_exact(self):
+        response = self.checkout(
+            items=[self.item(self.batch, 1, unit_price='0.1'), self.item(self.other, 1, unit_price='0.2')],
+            payments=[{'payment_type': 'upi', 'transaction_amount': '0.1'}, {'payment_type': 'upi', 'transaction_amount': '0.2'}],
+            total_amount='0.3',
+        )
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.payment.transaction_amount, Decimal('0.30'))
+        self.assertEqual(sorted(order.items.values_list('unit_price', flat=True)), [Decimal('0.10'), Decimal('0.20')])
+        self.assertEqual(ShopDailyStats.objects.get().upi_amount, Decimal('0.30'))
+
+    def test_add_order_items_validates_quantities(self):
+        order = Order.objects.create(shop=self.shop, total_amount=0)
+        response = self.post_json('/api/order-items/', {'order_id': order.order_id, 'items': [self.item(self.batch, '2.9')]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderItem.objects.exists())
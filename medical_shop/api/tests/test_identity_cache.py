@@ -0,0 +1,58 @@
+import datetime
+
+import jwt
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.identity_cache import DjangoIdentityCache, invalidate_account
+from api.models import Staff
+from api.tests.base import ApiTestCase
+
+
+def legacy_token(account, shop_id):
+    """A token from before access/refresh tokens: only account and shop."""
+    exp = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    return jwt.encode({'account': account, 'shop': shop_id, 'exp': exp}, settings.SECRET_KEY, algorithm='HS256')
+
+
+class IdentityCacheTests(ApiTestCase):
+    """user-001: legacy tokens resolve their identity once, then from the shared cache."""
+
+    def test_second_request_skips_identity_lookups(self):
+        headers = self.bearer(legacy_token(self.manager.phone, self.shop.shop_id))
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.get_json('/api/shops/mine/', headers).status_code, 200)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.get_json('/api/shops/mine/', headers).status_code, 200)
+        self.assertLess(len(second), len(first))
+
+    def test_invalidation_reaches_other_instances(self):
+        # Two instances on one alias stand in for two worker processes
+        worker_a, worker_b = DjangoIdentityCache(), DjangoIdentityCache()
+        worker_a.set('9000000002', self.shop.shop_id, ('shop', 'staff'))
+        worker_a.set('9000000002', 99, ('other shop', 'staff'))
+        self.assertEqual(worker_b.get('9000000002', self.shop.shop_id), ('shop', 'staff'))
+
+        worker_b.invalidate_account('9000000002')
+        self.assertIsNone(worker_a.get('9000000002', self.shop.shop_id))
+        self.assertIsNone(worker_a.get('9000000002', 99))
+
+    def test_removed_staff_legacy_token_is_rejected(self):
+        Staff.objects.create(phone='9000000002', name='Staff', password='x', shop=self.shop)
+        headers = self.bearer(legacy_token('9000000002', self.shop.shop_id))
+        self.assertEqual(self.get_json('/api/products/', headers).status_code, 200)
+
+        response = self.delete_json(f'/api/shops/{self.shop.shop_id}/staffs/9000000002/remove/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_json('/api/products/', headers).status_code, 401)
+
+    def test_invalidate_account_without_shop(self):
+        headers = self.bearer(legacy_token(self.manager.phone, self.shop.shop_id))
+        self.get_json('/api/shops/mine/', headers)
+        with CaptureQueriesContext(connection) as cached:
+            self.get_json('/api/shops/mine/', headers)
+        invalidate_account(self.manager.phone)
+        with CaptureQueriesContext(connection) as resolved:
+            self.get_json('/api/shops/mine/', headers)
+        self.assertGreater(len(resolved), len(cached))
@@ -0,0 +1,52 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Manager, Order, OrderItem, Shop
+from api.tests.base import ApiTestCase
+
+
+class AddOrderItemsTests(ApiTestCase):
+    """user-003: add_order_items locks and decrements a whole basket at once."""
+
+    def setUp(self):
+        super().setUp()
+        self.batches = [self.make_batch(product_id=f'P{i}', batch_number=f'B{i}', quantity=10) for i in range(6)]
+        self.order = Order.objects.create(shop=self.shop, total_amount=0)
+        self.headers = self.auth()
+
+    def add(self, batches, quantity=1):
+        items = [{'product_id': b.product.product_id, 'batch_id': b.id, 'quantity': quantity, 'unit_price': '10.00'} for b in batches]
+        return self.post_json('/api/order-items/', {'order_id': self.order.order_id, 'items': items}, self.headers)
+
+    def stock(self):
+        return [b.quantity_in_stock for b in type(self.batches[0]).objects.order_by('id')]
+
+    def test_decrements_every_batch(self):
+        self.assertEqual(self.add(self.batches[:3], quantity=4).status_code, 201)
+        self.assertEqual(self.stock(), [6, 6, 6, 10, 10, 10])
+        self.assertEqual(self.order.items.count(), 3)
+
+    def test_query_count_does_not_grow_with_basket(self):
+        self.get_json('/api/orders/')  # look up the token's revocations once
+        with CaptureQueriesContext(connection) as small:
+            self.add(self.batches[:2])
+        self.order = Order.objects.create(shop=self.shop, total_amount=0)
+        with CaptureQueriesContext(connection) as large:
+            self.add(self.batches)
+        self.assertEqual(len(large), len(small))
+
+    def test_failing_line_rolls_back_basket(self):
+        items = [{'product_id': b.product.product_id, 'batch_id': b.id, 'quantity': q, 'unit_price': '10.00'}
+                 for b, q in [(self.batches[0], 2), (self.batches[1], 11)]]
+        response = self.post_json('/api/order-items/', {'order_id': self.order.order_id, 'items': items})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(), [10] * 6)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_other_shops_batches_are_not_found(self):
+        other_manager = Manager.objects.create(phone='9000000009', name='Other', password='x')
+        other = self.make_batch(product_id='X1', batch_number='X1', shop=Shop.objects.create(shopname='Other', manager=other_manager))
+        response = self.add([other])
+        self.assertEqual(response.status_code, 400)
+        other.refresh_from_db()
+        self.assertEqual(other.quantity_in_stock, 10)
@@ -0,0 +1,71 @@
+import datetime
+
+from api.models import Order
+from api.tests.base import ApiTestCase
+
+BASE = datetime.datetime(2026, 1, 1, 12, 0)
+
+
+class OrderCursorTests(ApiTestCase):
+    """user-004: get_orders pages with a keyset cursor on (-order_date, -order_id)."""
+
+    def make_order(self, minutes, name):
+        order = Order.objects.create(shop=self.shop, customer_name=name, total_amount=1)
+        # order_date is auto_now_add; move it to the time the test needs
+        Order.objects.filter(pk=order.pk).update(order_date=BASE + datetime.timedelta(minutes=minutes))
+        return order
+
+    def page(self, cursor=None, limit=2):
+        params = {'limit': limit, 'fields': 'order_id,customer_name'}
+        if cursor:
+            params['cursor'] = cursor
+        response = self.get_json('/api/orders/', self.headers, **params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def setUp(self):
+        super().setUp()
+        self.headers = self.auth()
+        # Two orders share a timestamp so the order_id tie-break is exercised
+        self.names = ['o5', 'o4', 'o3', 'o2', 'o1']
+        for minutes, name in [(1, 'o1'), (2, 'o2'), (3, 'o3'), (3, 'o4'), (5, 'o5')]:
+            self.make_order(minutes, name)
+
+    def collect(self, after_first_page=None):
+        first = self.page()
+        seen = [order['customer_name'] for order in first['results']]
+        if after_first_page:
+            after_first_page()
+        cursor = first['next_cursor']
+        while cursor:
+            page = self.page(cursor)
+            seen += [order['customer_name'] for order in page['results']]
+            cursor = page['next_cursor']
+        return seen
+
+    def test_pages_cover_every_order_once(self):
+        self.assertEqual(self.collect(), self.names)
+
+    def test_stable_under_inserts(self):
+        def insert():
+            # Newer orders, one tied with the cursor position, and an older one
+            self.make_order(10, 'new')
+            self.make_order(3, 'tied')
+            self.make_order(0, 'older')
+
+        seen = self.collect(after_first_page=insert)
+        self.assertEqual(seen[:len(self.names)], self.names)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertNotIn('new', seen)
+        self.assertNotIn('tied', seen)
+        self.assertIn('older', seen)
+
+    def test_stable_under_deletes(self):
+        def delete():
+            Order.objects.filter(customer_name='o3').delete()
+
+        self.assertEqual(self.collect(after_first_page=delete), ['o5', 'o4', 'o2', 'o1'])
+
+    def test_invalid_cursor(self):
+        response = self.get_json('/api/orders/', self.headers, cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,70 @@
+import re
+
+from django.conf import settings
+from django.test import override_settings
+
+from api.tests.base import ApiTransactionTestCase
+from api.tests.test_identity_cache import legacy_token
+
+REQUEST_METRICS = {**settings.REQUEST_METRICS, 'ENABLED': True, 'BUDGET_ACTION': 'raise'}
+
+
+@override_settings(REQUEST_METRICS=REQUEST_METRICS)
+class QueryBudgetTests(ApiTransactionTestCase):
+    """user-022: every budgeted endpoint stays within its budget, measured by the
+    metrics middleware on cold caches with a legacy token (the costliest case).
+
+    Runs with real commits, as in production: inside a test transaction every
+    atomic block would add SAVEPOINT and RELEASE queries.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for number in range(3):
+            self.make_batch(product_id=f'P{number}', batch_number=f'B{number}', quantity=5)
+        self.make_batch(product_id='P0', batch_number='B9', quantity=50, days_to_expiry=20)
+        self.batch = self.make_batch(product_id='P3', batch_number='B3', quantity=100)
+        self.measured = {}
+
+    def call(self, endpoint, method, url, data=None, **params):
+        self.clear_caches()
+        headers = self.bearer(legacy_token(self.manager.phone, self.shop.shop_id))
+        if method == 'get':
+            response = self.get_json(url, headers, **params)
+        else:
+            response = self.post_json(url, data, headers)
+        self.assertLess(response.status_code, 300, (endpoint, response.content))
+        self.measured[endpoint] = int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1))
+        return response
+
+    def checkout_payload(self, quantity=1):
+        return {
+            'order': {'total_amount': '10.00'},
+            'items': [{'product_id': 'P3', 'batch_id': self.batch.id, 'quantity': quantity, 'unit_price': '10.00'}],
+            'payments': [{'payment_type': 'cash', 'transaction_amount': '10.00'}],
+        }
+
+    def test_budgeted_endpoints(self):
+        self.call('login_user', 'post', '/api/login/', {'phone': self.manager.phone, 'password': self.password})
+        self.call('checkout', 'post', '/api/checkout/', self.checkout_payload())
+        order_id = self.call('create_order', 'post', '/api/orders/create/', {'total_amount': '20.00'}).json()['order_id']
+        self.call('add_order_items', 'post', '/api/order-items/', {'order_id': order_id, 'items': [
+            {'product_id': 'P3', 'batch_id': self.batch.id, 'quantity': 2, 'unit_price': '10.00'},
+        ]})
+        self.call('add_payment', 'post', '/api/payments/add/', {'payments': [{'payment_type': 'UPI', 'transaction_amount': '20.00'}]})
+        self.call('search_medicines_with_batches', 'get', '/api/search/medicines/', search='gen')
+        self.call('get_medicine_suggestions', 'get', '/api/search/suggestions/', q='gen')
+        self.call('get_orders', 'get', '/api/orders/')
+        self.call('dashboard_stats', 'get', '/api/dashboard/stats/')
+        self.call('expiring_soon', 'get', '/api/dashboard/expiring-soon/')
+        self.call('expiry_summary', 'get', '/api/dashboard/expiry-summary/')
+        self.call('low_stock', 'get', '/api/dashboard/low-stock/')
+        self.call('low_stock_products', 'get', '/api/dashboard/low-stock-products/')
+        self.call('sales_data', 'get', '/api/dashboard/sales/')
+        budgets = settings.REQUEST_METRICS['QUERY_BUDGETS']
+        self.assertEqual(set(self.measured), set(budgets), 'measure every budgeted endpoint here')
+        # Going over fails the request above; a budget with room to spare
+        # would hide the next regression, so lower it to the measured count
+        loose = {endpoint: (queries, budgets[endpoint]) for endpoint, queries in self.measured.items()
+                 if budgets[endpoint] > queries + 1}
+        self.assertEqual(loose, {}, 'budgets above the measured (queries, budget)')
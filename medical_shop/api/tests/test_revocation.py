@@ -0,0 +1,82 @@
+from api.auth import issue_tokens_for
+from api.models import Shop, Staff
+from api.tests.base import ApiTestCase
+
+STAFF_PHONE = '9000000002'
+
+
+class TokenRevocationTests(ApiTestCase):
+    """user-024: logout, staff removal and shop deletion revoke tokens for good."""
+
+    def add_staff(self):
+        response = self.post_json(f'/api/shops/{self.shop.shop_id}/staffs/add/',
+                                  {'phone': STAFF_PHONE, 'password': 'staff-pw', 'name': 'Staff'})
+        self.assertEqual(response.status_code, 201)
+        return Staff.objects.get(phone=STAFF_PHONE)
+
+    def remove_staff(self):
+        response = self.delete_json(f'/api/shops/{self.shop.shop_id}/staffs/{STAFF_PHONE}/remove/')
+        self.assertEqual(response.status_code, 200)
+
+    def status(self, tokens):
+        return self.get_json('/api/products/', self.bearer(tokens['token'])).status_code
+
+    def refresh_status(self, tokens):
+        return self.client.post('/api/token/refresh/', {'refresh_token': tokens['refresh_token']},
+                                content_type='application/json').status_code
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        tokens = issue_tokens_for(self.manager, self.shop.shop_id)
+        self.assertEqual(self.status(tokens), 200)
+        self.assertEqual(self.post_json('/api/logout/', headers=self.bearer(tokens['token'])).status_code, 200)
+        self.assertEqual(self.status(tokens), 401)
+        self.assertEqual(self.refresh_status(tokens), 401)
+        self.assertEqual(self.status(issue_tokens_for(self.manager, self.shop.shop_id)), 200)
+
+    def test_revocations_survive_a_cache_flush(self):
+        tokens = issue_tokens_for(self.manager, self.shop.shop_id)
+        self.post_json('/api/logout/', headers=self.bearer(tokens['token']))
+        self.clear_caches()
+        self.assertEqual(self.status(tokens), 401)
+
+    def test_removed_staff_tokens_stay_revoked_after_re_add(self):
+        staff = self.add_staff()
+        old = issue_tokens_for(staff, self.shop.shop_id)
+        self.assertEqual(self.status(old), 200)
+
+        self.remove_staff()
+        self.assertEqual(self.status(old), 401)
+        self.assertEqual(self.refresh_status(old), 401)
+
+        staff = self.add_staff()
+        self.assertGreater(staff.token_epoch, 0)
+        new = issue_tokens_for(staff, self.shop.shop_id)
+        self.assertEqual(self.status(new), 200)
+        self.assertEqual(self.refresh_status(new), 200)
+        self.clear_caches()
+        self.assertEqual(self.status(old), 401)
+        self.assertEqual(self.refresh_status(old), 401)
+
+    def test_epoch_keeps_rising_across_removals(self):
+        epochs = []
+        for _ in range(3):
+            epochs.append(self.add_staff().token_epoch)
+            self.remove_staff()
+        self.assertEqual(epochs, sorted(set(epochs)))
+
+    def test_re_add_keeps_the_logout_revocation(self):
+        staff = self.add_staff()
+        before_logout = issue_tokens_for(staff, self.shop.shop_id)
+        self.post_json('/api/logout/', headers=self.bearer(before_logout['token']))
+        self.remove_staff()
+        self.add_staff()
+        self.assertEqual(self.status(before_logout), 401)
+        self.assertEqual(self.refresh_status(before_logout), 401)
+
+    def test_deleted_shop_tokens_are_rejected(self):
+        shop = Shop.objects.create(shopname='Second', manager=self.manager)
+        tokens = issue_tokens_for(self.manager, shop.shop_id)
+        self.assertEqual(self.delete_json(f'/api/shops/{shop.shop_id}/delete/').status_code, 200)
+        self.clear_caches()
+        self.assertEqual(self.status(tokens), 401)
+        self.assertEqual(self.status(issue_tokens_for(self.manager, self.shop.shop_id)), 200)
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import ShopDailyStats
+from api.tests.base import ApiTestCase
+
+
+class DailyStatsTests(ApiTestCase):
+    """user-009: the daily stats row is updated last, just before commit."""
+
+    def setUp(self):
+        super().setUp()
+        self.batch = self.make_batch(quantity=5)
+        self.headers = self.auth()
+
+    def checkout(self):
+        return self.post_json('/api/checkout/', {
+            'order': {'total_amount': '20.00'},
+            'items': [{'product_id': 'P1', 'batch_id': self.batch.id, 'quantity': 2, 'unit_price': '10.00'}],
+            'payments': [{'payment_type': 'upi', 'transaction_amount': '20.00'}],
+        }, self.headers)
+
+    def test_checkout_updates_the_day(self):
+        self.assertEqual(self.checkout().status_code, 201)
+        self.assertEqual(self.checkout().status_code, 201)
+        stats = ShopDailyStats.objects.get(shop=self.shop, date=date.today())
+        self.assertEqual(stats.order_count, 2)
+        self.assertEqual(stats.item_count, 4)
+        self.assertEqual(stats.revenue, 40)
+        self.assertEqual(stats.upi_amount, 40)
+
+    def test_stats_row_is_written_once_after_every_other_row(self):
+        self.checkout()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.checkout().status_code, 201)
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        stats = [i for i, sql in enumerate(writes) if 'api_shop_daily_stats' in sql]
+        self.assertEqual(stats, [len(writes) - 1])
@@ -0,0 +1,37 @@
+from api import search_index
+from api.models import Product, ProductSearchToken
+from api.tests.base import ApiTestCase
+
+
+class SearchIndexTests(ApiTestCase):
+    """user-007: medicine search narrows candidates with a trigram index."""
+
+    def search(self, query):
+        response = self.get_json('/api/search/medicines/', search=query)
+        self.assertEqual(response.status_code, 200)
+        return sorted({row['product_id'] for row in response.json()})
+
+    def test_finds_substring_matches(self):
+        self.make_batch(product_id='P1')
+        self.make_batch(product_id='P2', batch_number='B2')
+        Product.objects.filter(product_id='P1').update(generic_name='Paracetamol')
+        Product.objects.filter(product_id='P2').update(generic_name='Amoxicillin')
+        search_index.index_products(Product.objects.all())
+        self.assertEqual(self.search('cetam'), ['P1'])
+        self.assertEqual(self.search('CILL'), ['P2'])
+        self.assertEqual(self.search('zzz'), [])
+
+    def test_trigrams_are_folded(self):
+        self.assertEqual(search_index.trigrams('Crème', 'CREME'), {'cre', 'rem', 'eme'})
+        self.assertEqual(search_index.normalize('  Straße  Café '), 'strasse cafe')
+
+    def test_names_with_accented_and_plain_letters_index(self):
+        # "é" and "e" are one trigram after folding, as they are under
+        # MySQL's accent-insensitive collations
+        batch = self.make_batch(product_id='P1')
+        product = batch.product
+        product.generic_name = 'Crème creme CRÈME'
+        product.save()
+        grams = list(ProductSearchToken.objects.filter(product=product).values_list('gram', flat=True))
+        self.assertEqual(len(grams), len(set(grams)))
+        self.assertEqual(self.search('crème'), ['P1'])
@@ -0,0 +1,35 @@
+import csv
+import io
+import json
+
+from api.tests.base import ApiTestCase
+
+
+class AsgiStreamingTests(ApiTestCase):
+    """user-013: streamed lists and exports are async iterators under ASGI."""
+
+    def setUp(self):
+        super().setUp()
+        for number in range(3):
+            self.make_batch(product_id=f'P{number}', batch_number=f'B{number}')
+        self.headers = {'Authorization': self.auth()['HTTP_AUTHORIZATION']}
+
+    async def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    async def test_list_streams_chunk_by_chunk(self):
+        response = await self.async_client.get('/api/batches/', {'stream': '1'}, headers=self.headers)
+        rows = json.loads(await self.read(response))
+        self.assertEqual(sorted(row['batch_number'] for row in rows), ['B0', 'B1', 'B2'])
+
+    async def test_export_streams_chunk_by_chunk(self):
+        response = await self.async_client.get('/api/export/batches/', headers=self.headers)
+        rows = list(csv.reader(io.StringIO((await self.read(response)).decode())))
+        self.assertEqual(len(rows), 4)
+
+    def test_wsgi_keeps_the_sync_iterator(self):
+        response = self.get_json('/api/batches/', stream='1')
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 3)
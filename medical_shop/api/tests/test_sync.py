@@ -0,0 +1,79 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from api import changelog
+from api.models import CatalogChange
+from api.tests.base import ApiTestCase
+
+
+class SyncTests(ApiTestCase):
+    """user-012: /api/sync/ answers with a delta, or a full reset for stale tokens."""
+
+    def setUp(self):
+        super().setUp()
+        self.headers = self.auth()
+        self.first = self.make_batch(product_id='P1', batch_number='B1')
+        self.second = self.make_batch(product_id='P2', batch_number='B2')
+
+    def sync(self, since=None):
+        params = {} if since is None else {'since': since}
+        response = self.get_json('/api/sync/', self.headers, **params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_is_a_reset(self):
+        body = self.sync()
+        self.assertTrue(body['reset'])
+        self.assertEqual([p['product_id'] for p in body['products']], ['P1', 'P2'])
+        self.assertEqual(len(body['batches']), 2)
+
+    def test_delta_carries_only_changes_since_the_token(self):
+        token = self.sync()['next']
+        self.assertEqual(self.client.put(f'/api/batches/{self.first.id}/', {'quantity_in_stock': 3},
+                                         content_type='application/json', **self.headers).status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/batches/{self.second.id}/', **self.headers).status_code, 200)
+
+        body = self.sync(token)
+        self.assertFalse(body['reset'])
+        self.assertEqual([b['id'] for b in body['batches']], [self.first.id])
+        self.assertEqual(body['batches'][0]['quantity_in_stock'], 3)
+        self.assertEqual(body['deleted']['batches'], [self.second.id])
+        self.assertEqual(body['products'], [])
+
+        later = self.sync(body['next'])
+        self.assertFalse(later['reset'])
+        self.assertEqual((later['batches'], later['deleted']['batches']), ([], []))
+
+    def test_token_older_than_the_pruned_log_resets(self):
+        token = self.sync()['next']
+        self.make_batch(product_id='P3', batch_number='B3')
+        CatalogChange.objects.filter(shop=self.shop).update(changed_at=timezone.now() - timedelta(days=40))
+        self.assertGreater(changelog.prune(30), 0)
+
+        body = self.sync(token)
+        self.assertTrue(body['reset'])
+        self.assertEqual(len(body['batches']), 3)
+        # Pruning emptied the log; the token handed out must still be current
+        self.assertFalse(CatalogChange.objects.filter(shop=self.shop).exists())
+        self.assertFalse(self.sync(body['next'])['reset'])
+
+    def test_delta_pages_with_has_more(self):
+        token = self.sync()['next']
+        for number in range(3):
+            self.make_batch(product_id=f'Q{number}', batch_number=f'C{number}')
+        seen = set()
+        with mock.patch('api.views.sync_views.SYNC_MAX_CHANGES', 2):
+            for _ in range(10):
+                page = self.sync(token)
+                self.assertFalse(page['reset'])
+                seen.update(b['batch_number'] for b in page['batches'])
+                token = page['next']
+                if not page['has_more']:
+                    break
+        self.assertEqual(seen, {'C0', 'C1', 'C2'})
+
+    def test_invalid_token(self):
+        self.assertEqual(self.get_json('/api/sync/', self.headers, since='abc').status_code, 400)
+        self.assertEqual(self.get_json('/api/sync/', self.headers, since='-1').status_code, 400)
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+
+from api import events, versioning
+from api.models import Batch, CatalogChange, Order, ShopDataVersion
+from api.tests.base import ApiTestCase, ApiTransactionTestCase
+
+
+def checkout_payload(batch, quantity=1):
+    return {
+        'order': {'total_amount': '10.00'},
+        'items': [{'product_id': batch.product.product_id, 'batch_id': batch.id, 'quantity': quantity, 'unit_price': '10.00'}],
+        'payments': [{'payment_type': 'cash', 'transaction_amount': '10.00'}],
+    }
+
+
+def statement_index(queries, prefix):
+    return [i for i, query in enumerate(queries) if query['sql'].startswith(prefix)]
+
+
+class WriteTransactionTests(ApiTestCase):
+    """user-011: version bumps and change log rows commit with the data they describe."""
+
+    def setUp(self):
+        super().setUp()
+        self.batch = self.make_batch(quantity=5)
+        self.headers = self.auth()
+
+    def test_checkout_bumps_versions_and_logs_changes(self):
+        before = versioning.get_versions(self.shop.shop_id)
+        last_change = CatalogChange.objects.order_by('-id').values_list('id', flat=True).first()
+        response = self.post_json('/api/checkout/', checkout_payload(self.batch), self.headers)
+        self.assertEqual(response.status_code, 201)
+        after = versioning.get_versions(self.shop.shop_id)
+        for kind in ('stock', 'orders', 'payments'):
+            self.assertEqual(after[kind], before[kind] + 1, kind)
+        self.assertEqual(
+            list(CatalogChange.objects.filter(id__gt=last_change).values_list('kind', 'key')),
+            [('batch', str(self.batch.id))],
+        )
+
+    def test_version_row_is_locked_after_the_data_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.post_json('/api/checkout/', checkout_payload(self.batch), self.headers)
+        queries = queries.captured_queries
+        batch_updates = statement_index(queries, 'UPDATE "api_batch"')
+        version_updates = statement_index(queries, 'UPDATE "api_shop_data_version"')
+        change_inserts = statement_index(queries, 'INSERT INTO "api_catalog_change"')
+        self.assertEqual(len(version_updates), 1)
+        self.assertLess(max(batch_updates), version_updates[0])
+        self.assertLess(version_updates[0], min(change_inserts))
+
+    def test_failed_change_log_rolls_back_the_sale(self):
+        versions = versioning.get_versions(self.shop.shop_id)
+        with mock.patch.object(CatalogChange.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            response = self.post_json('/api/checkout/', checkout_payload(self.batch), self.headers)
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Order.objects.exists())
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.quantity_in_stock, 5)
+        self.assertEqual(versioning.get_versions(self.shop.shop_id), versions)
+
+    def test_batch_edit_logs_change(self):
+        response = self.client.put(f'/api/batches/{self.batch.id}/', {'quantity_in_stock': 7},
+                                   content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(CatalogChange.objects.filter(kind='batch', key=str(self.batch.id)).exists())
+
+    def test_shop_delete_leaves_no_derived_rows(self):
+        # Deleting the catalog fires batch and product signals while the shop goes
+        response = self.delete_json(f'/api/shops/{self.shop.shop_id}/delete/', self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ShopDataVersion.objects.filter(shop_id=self.shop.shop_id).exists())
+        self.assertFalse(CatalogChange.objects.filter(shop_id=self.shop.shop_id).exists())
+        self.assertFalse(Batch.objects.exists())
+
+
+class CommittedWriteTests(ApiTransactionTestCase):
+    """user-011: nothing that runs after commit can fail a committed checkout."""
+
+    def test_broker_failure_after_commit_keeps_the_order(self):
+        batch = self.make_batch(quantity=5)
+        with mock.patch.object(events.get_broker(), 'publish', side_effect=ConnectionError('broker down')):
+            with self.assertLogs('django.db.backends.base', 'ERROR'):
+                response = self.post_json('/api/checkout/', checkout_payload(batch))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Order.objects.filter(order_id=response.json()['order_id']).exists())
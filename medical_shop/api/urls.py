@@ -6,12 +6,15 @@ from .views import (
     BatchView,
     register_user,
     login_user,
+    refresh_token,
+    logout_user,
     get_users,
     update_shop,
     delete_shop,
     create_order,
     get_orders,
     get_order_items,
+    checkout,
     update_order,
     delete_order,
     add_order_items,
@@ -24,8 +27,19 @@ from .views import (
     search_medicines_with_batches,
     get_dashboard_stats,
     get_expiring_soon,
+    get_expiry_summary,
     get_low_stock,
+    get_low_stock_products,
     get_sales_data,
+    sync_catalog,
+    shop_events,
+    analytics_summary,
+    analytics_top_products,
+    analytics_categories,
+    analytics_heatmap,
+    bulk_import_view,
+    export_data,
+    metrics_view,
     predict_salts,
     list_staffs,
     add_staff,
@@ -46,9 +60,16 @@ def welcome_view(request):
             'batches': '/api/batches/',
             'users': '/api/users/',
             'orders': '/api/orders/',
+            'checkout': '/api/checkout/',
             'payments': '/api/payments/',
             'search': '/api/search/medicines/',
             'dashboard': '/api/dashboard/stats/',
+            'analytics': '/api/analytics/summary/',
+            'sync': '/api/sync/',
+            'import': '/api/import/<products|batches>/',
+            'export': '/api/export/<products|batches|orders|order-items|payments>/',
+            'metrics': '/api/_metrics',
+            'events': '/api/events/',
         }
     })
 
@@ -66,6 +87,8 @@ urlpatterns = [
     # ==================== USER/REGISTER URLS ====================
     path('register/', register_user, name='register_user'),  # POST
     path('login/', login_user, name='login_user'),  # POST
+    path('token/refresh/', refresh_token, name='refresh_token'),  # POST {refresh_token}
+    path('logout/', logout_user, name='logout_user'),  # POST, revokes all of the account's tokens
     path('users/', get_users, name='get_users'),  # GET all shops
     path('shops/<int:shop_id>/', update_shop, name='update_shop'),  # PUT
     path('shops/<int:shop_id>/delete/', delete_shop, name='delete_shop'),  # DELETE
@@ -76,6 +99,8 @@ urlpatterns = [
     path('orders/<int:order_id>/', update_order, name='update_order'),  # PUT
     path('orders/<int:order_id>/delete/', delete_order, name='delete_order'),  # DELETE
     
+    path('checkout/', checkout, name='checkout'),  # POST order + items + payment in one call
+
     # ==================== ORDER ITEMS URLS ====================
     path('order-items/', add_order_items, name='add_order_items'),  # POST
     path('orders/<int:order_id>/items/', get_order_items, name='get_order_items'),  # GET
@@ -95,9 +120,28 @@ urlpatterns = [
     
     # ==================== DASHBOARD/ANALYTICS URLS ====================
     path('dashboard/stats/', get_dashboard_stats, name='dashboard_stats'),  # GET
-    path('dashboard/expiring-soon/', get_expiring_soon, name='expiring_soon'),  # GET
+    path('dashboard/expiring-soon/', get_expiring_soon, name='expiring_soon'),  # GET ?horizon=7|30|90
+    path('dashboard/expiry-summary/', get_expiry_summary, name='expiry_summary'),  # GET
     path('dashboard/low-stock/', get_low_stock, name='low_stock'),  # GET
+    path('dashboard/low-stock-products/', get_low_stock_products, name='low_stock_products'),  # GET below reorder point
     path('dashboard/sales/', get_sales_data, name='sales_data'),  # GET
+    path('analytics/summary/', analytics_summary, name='analytics_summary'),  # GET ?days=
+    path('analytics/top-products/', analytics_top_products, name='analytics_top_products'),  # GET ?days=&by=&limit=
+    path('analytics/categories/', analytics_categories, name='analytics_categories'),  # GET ?days=
+    path('analytics/heatmap/', analytics_heatmap, name='analytics_heatmap'),  # GET ?days=
+
+    # ==================== SYNC URLS ====================
+    path('sync/', sync_catalog, name='sync_catalog'),  # GET ?since=<token>
+
+    # ==================== BULK IMPORT / EXPORT URLS ====================
+    path('import/<str:kind>/', bulk_import_view, name='bulk_import'),  # POST CSV/JSON/NDJSON
+    path('export/<str:kind>/', export_data, name='export_data'),  # GET ?format=csv|columnar&compress=gzip
+
+    # ==================== REQUEST METRICS ====================
+    path('_metrics', metrics_view, name='metrics'),  # GET Prometheus text format
+
+    # ==================== PUSH EVENTS (ASGI) ====================
+    path('events/', shop_events, name='shop_events'),  # GET text/event-stream
 
     # ==================== SHOP STAFF MANAGEMENT ====================
     path('shops/<int:shop_id>/staffs/', list_staffs, name='list_staffs'),  # GET
@@ -0,0 +1,243 @@
+"""Per-shop data versions and conditional GET support.
+
+Every shop has one ShopDataVersion row with a counter per kind of data
+(catalog, stock, orders, payments). Signal handlers in api.signals, and the
+bulk paths that bypass signals, call `bump` inside the writing transaction.
+
+Write paths run in a `writing()` block. Bumps, change log rows
+(api.changelog) and daily rollups (api.rollups) requested inside it are
+applied when the block ends, still inside the transaction: first the
+version rows of the touched shops, locked in shop_id order, then the rest
+in the order requested, and last the totals added up with `accumulate`
+(one statement per row, in key order). Every writer therefore takes its data row locks
+first and these per-shop rows last. Writers neither deadlock over the two
+nor queue on a shop's rows for longer than the few statements before
+commit. Outside a `writing()` block the same writes run immediately.
+
+GET views declare which kinds they read with `@versioned(...)`, placed under
+`@jwt_required`. The ETag is built from those counters and today's date
+(expiry filters and "today" totals change at midnight), so a matching
+If-None-Match is answered with 304 after reading only the version row.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import date
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from api.models import Shop, ShopDataVersion
+
+KINDS = ('catalog', 'stock', 'orders', 'payments')
+
+_state = threading.local()
+
+
+class _PendingWrites:
+    """Writes collected by a `writing()` block."""
+
+    def __init__(self):
+        self.kinds = {}
+        self.deferred = []
+        self.totals = {}
+
+    def apply(self):
+        for shop_id in sorted(self.kinds):
+            if self.kinds[shop_id]:
+                _increment(shop_id, self.kinds[shop_id])
+            else:
+                lock(shop_id)
+        for func in self.deferred:
+            func()
+        for (func, key), totals in sorted(self.totals.items(), key=lambda item: item[0][1]):
+            totals = {field: total for field, total in totals.items() if total}
+            if totals:
+                func(key, totals)
+
+
+def _pending():
+    return getattr(_state, 'pending', None)
+
+
+def _deleting():
+    """Shops whose deletion is in progress in this thread."""
+    if not hasattr(_state, 'deleting') or not transaction.get_connection().in_atomic_block:
+        # Deletes run in a transaction; one that failed left its marks behind
+        _state.deleting = set()
+    return _state.deleting
+
+
+def shop_deleting(shop_id):
+    """Skip bumps and deferred writes for a shop until `shop_deleted`.
+
+    The shop's derived rows are deleted with it, and writing new ones in the
+    same transaction would point at the deleted shop.
+    """
+    _deleting().add(shop_id)
+
+
+def shop_deleted(shop_id):
+    _deleting().discard(shop_id)
+
+
+@contextmanager
+def writing():
+    """`transaction.atomic()` whose version bumps and deferred writes run last.
+
+    Nested blocks join the outermost one. Code in the block that catches an
+    exception from a savepoint still gets the writes requested before it,
+    which at worst bumps a version or logs a change once too often.
+    """
+    if _pending() is not None:
+        with transaction.atomic():
+            yield
+        return
+    _state.pending = pending = _PendingWrites()
+    try:
+        with transaction.atomic():
+            yield
+            _state.pending = None
+            pending.apply()
+    finally:
+        _state.pending = None
+
+
+def defer(shop_id, func):
+    """Run `func` after the shop's version row is locked: at the end of the
+    current `writing()` block, or now outside one."""
+    if shop_id in _deleting():
+        return
+    pending = _pending()
+    if pending is None:
+        func()
+        return
+    pending.kinds.setdefault(shop_id, set())
+    pending.deferred.append(func)
+
+
+def accumulate(shop_id, func, key, totals):
+    """Add `totals` to the block's running totals for `key`, and call
+    `func(key, totals)` once with the sums at the very end of the block.
+
+    Outside a `writing()` block `func` runs now. Keys must be sortable.
+    """
+    if shop_id in _deleting():
+        return
+    pending = _pending()
+    if pending is None:
+        func(key, totals)
+        return
+    pending.kinds.setdefault(shop_id, set())
+    running = pending.totals.setdefault((func, key), {})
+    for field, total in totals.items():
+        running[field] = running.get(field, 0) + total
+
+
+def bump(shop_id, *kinds):
+    """Increment the given counters of a shop's data version.
+
+    Inside a `writing()` block the increment waits for the end of the block.
+    """
+    kinds = set(kinds)
+    if not kinds or shop_id is None or shop_id in _deleting():
+        return
+    pending = _pending()
+    if pending is None:
+        _increment(shop_id, kinds)
+        return
+    pending.kinds.setdefault(shop_id, set()).update(kinds)
+
+
+def _increment(shop_id, kinds):
+    changes = {kind: F(kind) + 1 for kind in kinds}
+    if ShopDataVersion.objects.filter(shop_id=shop_id).update(**changes):
+        return
+    if not Shop.objects.filter(shop_id=shop_id).exists():
+        return
+    try:
+        with transaction.atomic():
+            ShopDataVersion.objects.create(shop_id=shop_id, **{kind: 1 for kind in kinds})
+    except IntegrityError:
+        # Another transaction created the row first
+        ShopDataVersion.objects.filter(shop_id=shop_id).update(**changes)
+
+
+def lock(shop_id):
+    """Lock a shop's version row until the current transaction ends, creating it if needed.
+
+    Returns False when the shop has been deleted.
+    """
+    rows = ShopDataVersion.objects.select_for_update().filter(shop_id=shop_id)
+    if rows.exists():
+        return True
+    if not Shop.objects.filter(shop_id=shop_id).exists():
+        return False
+    try:
+        with transaction.atomic():
+            # The new row stays locked by this transaction
+            ShopDataVersion.objects.create(shop_id=shop_id)
+        return True
+    except IntegrityError:
+        # Another transaction created the row first; wait for its lock
+        return rows.exists()
+
+
+def get_versions(shop_id):
+    """Return {kind: counter} for a shop; all zero before its first write."""
+    row = ShopDataVersion.objects.filter(shop_id=shop_id).values(*KINDS).first()
+    return row or dict.fromkeys(KINDS, 0)
+
+
+def make_etag(shop_id, kinds, versions=None):
+    versions = versions or get_versions(shop_id)
+    counters = '.'.join(str(versions[kind]) for kind in kinds)
+    return f'W/"{shop_id}-{counters}-{date.today().isoformat()}"'
+
+
+def _matches(etag, if_none_match):
+    etags = parse_etags(if_none_match)
+    if '*' in etags:
+        return True
+    # If-None-Match uses the weak comparison
+    strip = lambda tag: tag[2:] if tag.startswith('W/') else tag
+    return strip(etag) in {strip(tag) for tag in etags}
+
+
+def versioned(*kinds):
+    """Answer GETs with an ETag over the shop's `kinds` counters.
+
+    Must run after jwt_required, which sets request.register_user.
+    """
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise ValueError(f"Unknown data version kinds: {', '.join(sorted(unknown))}")
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            shop = getattr(request, 'register_user', None)
+            if request.method not in ('GET', 'HEAD') or shop is None:
+                return view_func(request, *args, **kwargs)
+
+            # Kept on the request so the view (e.g. api.catalog_cache) can reuse them
+            request.data_versions = get_versions(shop.shop_id)
+            etag = make_etag(shop.shop_id, kinds, request.data_versions)
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match and _matches(etag, if_none_match):
+                response = HttpResponseNotModified()
+            else:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            # Let browsers keep the body but revalidate on every poll
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return _wrapped
+
+    return decorator
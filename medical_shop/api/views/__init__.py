@@ -1,16 +1,24 @@
 from .product_views import ProductView
 from .batch_views import BatchView
-from .user_views import register_user, login_user, get_users, update_shop, delete_shop, list_staffs, add_staff, remove_staff, my_shops, switch_shop, add_shop
-from .order_views import create_order, get_orders, update_order, delete_order, add_order_items, get_order_items
+from .user_views import register_user, login_user, refresh_token, logout_user, get_users, update_shop, delete_shop, list_staffs, add_staff, remove_staff, my_shops, switch_shop, add_shop
+from .order_views import create_order, get_orders, update_order, delete_order, add_order_items, get_order_items, checkout
 from .payment_views import add_payment, update_payment, delete_payment, get_payments, get_payment_summary
 from .search_views import get_medicine_suggestions, search_medicines_with_batches, predict_salts
-from .dashboard_views import get_dashboard_stats, get_expiring_soon, get_low_stock, get_sales_data
+from .dashboard_views import get_dashboard_stats, get_expiring_soon, get_expiry_summary, get_low_stock, get_low_stock_products, get_sales_data
+from .sync_views import sync_catalog
+from .event_views import shop_events
+from .analytics_views import analytics_summary, analytics_top_products, analytics_categories, analytics_heatmap
+from .import_views import bulk_import_view
+from .export_views import export_data
+from .metrics_views import metrics_view
 
 __all__ = [
     'ProductView',
     'BatchView',
     'register_user',
     'login_user',
+    'refresh_token',
+    'logout_user',
     'get_users',
     'update_shop',
     'delete_shop',
@@ -23,6 +31,7 @@ __all__ = [
     'create_order',
     'get_orders',
     'get_order_items',
+    'checkout',
     'update_order',
     'delete_order',
     'add_order_items',
@@ -36,6 +45,17 @@ __all__ = [
     'predict_salts',
     'get_dashboard_stats',
     'get_expiring_soon',
+    'get_expiry_summary',
     'get_low_stock',
+    'get_low_stock_products',
     'get_sales_data',
+    'sync_catalog',
+    'shop_events',
+    'analytics_summary',
+    'analytics_top_products',
+    'analytics_categories',
+    'analytics_heatmap',
+    'bulk_import_view',
+    'export_data',
+    'metrics_view',
 ]
\ No newline at end of file
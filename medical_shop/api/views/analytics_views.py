@@ -0,0 +1,73 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from api.auth import jwt_required
+from api.versioning import versioned
+from api import analytics
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_DAYS = 3660
+TOP_PRODUCTS_MAX = 100
+
+
+def _days(request):
+    return min(max(int(request.GET.get('days', 30)), 1), MAX_DAYS)
+
+
+def _report(request, name, compute, **params):
+    """Run an analytics report over the last ?days= days (default 30), cached per data version."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed. Use GET.'}, status=405)
+    try:
+        shop = request.register_user
+        days = _days(request)
+        result = analytics.cached_report(
+            shop.shop_id, name, {'days': days, **params},
+            lambda: compute(analytics.load_sales(shop.shop_id, days)),
+        )
+        return JsonResponse({'days': days, **params, 'results': result}, status=200)
+    except ValueError:
+        return JsonResponse({'error': 'days must be a number'}, status=400)
+    except Exception as e:
+        logger.error(f"Error computing {name} analytics: {str(e)}")
+        return JsonResponse({'error': f'Failed to compute {name} analytics'}, status=500)
+
+
+@csrf_exempt
+@jwt_required
+@versioned('orders', 'catalog', 'stock')
+def analytics_summary(request):
+    """Revenue, units and gross margin for the authenticated shop"""
+    return _report(request, 'summary', analytics.summary)
+
+
+@csrf_exempt
+@jwt_required
+@versioned('orders', 'catalog', 'stock')
+def analytics_top_products(request):
+    """Top products by ?by=revenue|units|margin (default revenue), ?limit= (default 10)"""
+    by = request.GET.get('by', 'revenue')
+    if by not in ('revenue', 'units', 'margin'):
+        return JsonResponse({'error': 'by must be one of: revenue, units, margin'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), TOP_PRODUCTS_MAX)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    return _report(request, 'top-products', lambda sales: analytics.top_products(sales, limit, by), by=by, limit=limit)
+
+
+@csrf_exempt
+@jwt_required
+@versioned('orders', 'catalog', 'stock')
+def analytics_categories(request):
+    """Revenue share and margin per therapeutic category"""
+    return _report(request, 'categories', analytics.category_mix)
+
+
+@csrf_exempt
+@jwt_required
+@versioned('orders', 'catalog', 'stock')
+def analytics_heatmap(request):
+    """Revenue and units by weekday and hour of day"""
+    return _report(request, 'heatmap', analytics.hourly_heatmap)
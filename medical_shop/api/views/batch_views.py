@@ -1,17 +1,37 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import HttpResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import ProtectedError
 from api.models import Batch, Product
 from api.auth import jwt_required
+from api.versioning import versioned
+from api import metrics, catalog_cache, versioning
+from api.streaming import wants_stream, stream_json_list, CHUNK_SIZE
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def serialize_batch(b):
+    return {
+        'id': b.id,
+        'batch_number': b.batch_number,
+        'product_id': b.product.product_id,
+        'expiry_date': b.expiry_date,
+        'average_purchase_price': float(b.average_purchase_price) if b.average_purchase_price else None,
+        'selling_price': float(b.selling_price),
+        'quantity_in_stock': b.quantity_in_stock,
+        'generic_name': b.product.generic_name,
+        'brand_name': b.product.brand_name
+    }
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(jwt_required, name='get')
+@method_decorator(versioned('catalog', 'stock'), name='get')
 @method_decorator(jwt_required, name='post')
 @method_decorator(jwt_required, name='put')
 @method_decorator(jwt_required, name='delete')
@@ -30,18 +50,7 @@ class BatchView(APIView):
                         query = query.filter(shop=shop)
                     batch = query.get(id=batch_id)
                     
-                    batch_data = {
-                        'id': batch.id,
-                        'batch_number': batch.batch_number,
-                        'product_id': batch.product.product_id,
-                        'expiry_date': batch.expiry_date,
-                        'average_purchase_price': float(batch.average_purchase_price) if batch.average_purchase_price else None,
-                        'selling_price': float(batch.selling_price),
-                        'quantity_in_stock': batch.quantity_in_stock,
-                        'generic_name': batch.product.generic_name,
-                        'brand_name': batch.product.brand_name
-                    }
-                    return Response(batch_data, status=status.HTTP_200_OK)
+                    return Response(serialize_batch(batch), status=status.HTTP_200_OK)
                 except Batch.DoesNotExist:
                     return Response({'error': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
             else:
@@ -49,18 +58,20 @@ class BatchView(APIView):
                 if shop:
                     batches = batches.filter(shop=shop)
                 batches = batches.order_by('-expiry_date')
-                
-                results = [{
-                    'id': b.id,
-                    'batch_number': b.batch_number,
-                    'product_id': b.product.product_id,
-                    'expiry_date': b.expiry_date,
-                    'average_purchase_price': float(b.average_purchase_price) if b.average_purchase_price else None,
-                    'selling_price': float(b.selling_price),
-                    'quantity_in_stock': b.quantity_in_stock,
-                    'generic_name': b.product.generic_name,
-                    'brand_name': b.product.brand_name
-                } for b in batches]
+
+                if wants_stream(request):
+                    return stream_json_list(request, (serialize_batch(b) for b in batches.iterator(chunk_size=CHUNK_SIZE)))
+
+                if shop:
+                    # Served from the shop's catalog cache until a product or batch changes
+                    with metrics.span('serialize'):
+                        content = catalog_cache.get_or_build(
+                            'batches', shop.shop_id, lambda: [serialize_batch(b) for b in batches],
+                            getattr(request, 'data_versions', None),
+                        )
+                    return HttpResponse(content, content_type='application/json')
+
+                results = [serialize_batch(b) for b in batches]
                 return Response(results, status=status.HTTP_200_OK)
         
         except Exception as e:
@@ -89,15 +100,16 @@ class BatchView(APIView):
                 return Response({'error': 'Batch already exists for this product in your shop'}, status=status.HTTP_400_BAD_REQUEST)
             
             # Create new batch
-            Batch.objects.create(
-                shop=shop,
-                batch_number=data['batch_number'],
-                product=product,
-                expiry_date=data['expiry_date'],
-                average_purchase_price=data.get('average_purchase_price', 0.0),
-                selling_price=data.get('selling_price', 0.0),
-                quantity_in_stock=data.get('quantity_in_stock', 0)
-            )
+            with versioning.writing():
+                Batch.objects.create(
+                    shop=shop,
+                    batch_number=data['batch_number'],
+                    product=product,
+                    expiry_date=data['expiry_date'],
+                    average_purchase_price=data.get('average_purchase_price', 0.0),
+                    selling_price=data.get('selling_price', 0.0),
+                    quantity_in_stock=data.get('quantity_in_stock', 0)
+                )
 
             return Response({'message': 'Batch created successfully'}, status=status.HTTP_201_CREATED)
 
@@ -127,7 +139,8 @@ class BatchView(APIView):
             if not updated:
                 return Response({'error': 'No fields to update'}, status=status.HTTP_400_BAD_REQUEST)
             
-            batch.save()
+            with versioning.writing():
+                batch.save()
             return Response({'message': 'Batch updated successfully'}, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -144,10 +157,11 @@ class BatchView(APIView):
                 return Response({'error': 'Batch not found in your shop'}, status=status.HTTP_404_NOT_FOUND)
             
             # Check if batch is used in any orders
-            if batch.orderitem_set.exists():
+            if batch.order_items.exists():
                 return Response({'error': 'Cannot delete batch with existing orders'}, status=status.HTTP_400_BAD_REQUEST)
             
-            batch.delete()
+            with versioning.writing():
+                batch.delete()
             return Response({'message': 'Batch deleted successfully'}, status=status.HTTP_200_OK)
 
         except ProtectedError:
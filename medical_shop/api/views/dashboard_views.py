@@ -3,54 +3,75 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Count, Sum, Q, F
 from django.utils import timezone
 from datetime import timedelta, date
-from api.models import Product, Batch, Order
+from django.conf import settings
+from api.models import Product, Batch, Order, ShopDailyStats
 from api.auth import jwt_required
+from api.versioning import versioned
+from api import expiry, product_stock
 import logging
 
 logger = logging.getLogger(__name__)
 
+MAX_EXPIRY_HORIZON = 365
+
+# Map a day to the first day of its reporting period
+SALES_GRANULARITIES = {
+    'day': lambda d: d,
+    'week': lambda d: d - timedelta(days=d.weekday()),
+    'month': lambda d: d.replace(day=1),
+}
+
 @csrf_exempt
 @jwt_required
+@versioned('catalog', 'stock', 'orders')
 def get_dashboard_stats(request):
     """Get dashboard statistics for the authenticated shop"""
     if request.method == 'GET':
         try:
             shop = getattr(request, 'register_user', None)
             
-            # Filter all queries by shop if authenticated
+            today = date.today()
+            tomorrow = today + timedelta(days=1)
+
+            # One conditional-aggregation query per table
             product_query = Product.objects.all()
             batch_query = Batch.objects.all()
             order_query = Order.objects.all()
-            
+
             if shop:
                 product_query = product_query.filter(shop=shop)
                 batch_query = batch_query.filter(shop=shop)
                 order_query = order_query.filter(shop=shop)
-            
-            # Get total products
+
             total_products = product_query.count()
-            
-            # Get total batches
-            total_batches = batch_query.count()
-            
-            # Get total orders
-            total_orders = order_query.count()
-            
-            # Get low stock items (quantity < 10)
-            low_stock_items = batch_query.filter(quantity_in_stock__lt=10).count()
-            
-            # Get expired items
-            today = date.today()
-            expired_items = batch_query.filter(expiry_date__lt=today).count()
-            
-            # Get today's orders
-            todays_orders = order_query.filter(order_date__date=today).count()
-            
-            # Get today's revenue
-            todays_revenue_data = order_query.filter(
-                order_date__date=today
-            ).aggregate(total=Sum('total_amount'))
-            todays_revenue = float(todays_revenue_data['total']) if todays_revenue_data['total'] else 0.0
+
+            batch_stats = batch_query.aggregate(
+                total=Count('id'),
+                low_stock=Count('id', filter=Q(quantity_in_stock__lt=10)),
+                expired=Count('id', filter=Q(expiry_date__lt=today)),
+            )
+
+            if shop and settings.DASHBOARD_STATS_SOURCE == 'rollup':
+                # Order figures from the ShopDailyStats rollup
+                order_stats = ShopDailyStats.objects.filter(shop=shop).aggregate(
+                    total=Sum('order_count'),
+                    todays=Sum('order_count', filter=Q(date=today)),
+                    todays_revenue=Sum('revenue', filter=Q(date=today)),
+                )
+            else:
+                todays = Q(order_date__gte=today, order_date__lt=tomorrow)
+                order_stats = order_query.aggregate(
+                    total=Count('order_id'),
+                    todays=Count('order_id', filter=todays),
+                    todays_revenue=Sum('total_amount', filter=todays),
+                )
+
+            total_batches = batch_stats['total']
+            low_stock_items = batch_stats['low_stock']
+            expired_items = batch_stats['expired']
+            total_orders = order_stats['total'] or 0
+            todays_orders = order_stats['todays'] or 0
+            todays_revenue = float(order_stats['todays_revenue']) if order_stats['todays_revenue'] else 0.0
 
             stats = {
                 'total_products': total_products,
@@ -72,16 +93,20 @@ def get_dashboard_stats(request):
 
 @csrf_exempt
 @jwt_required
+@versioned('catalog', 'stock')
 def get_expiring_soon(request):
-    """Get items expiring within next 30 days for the authenticated shop"""
+    """Get items expiring within the next `horizon` days (default 30) for the authenticated shop"""
     if request.method == 'GET':
         try:
             shop = getattr(request, 'register_user', None)
+            horizon = int(request.GET.get('horizon', 30))
+            if not 0 < horizon <= MAX_EXPIRY_HORIZON:
+                return JsonResponse({'error': f'horizon must be between 1 and {MAX_EXPIRY_HORIZON} days'}, status=400)
             today = date.today()
-            thirty_days_later = today + timedelta(days=30)
+            horizon_end = today + timedelta(days=horizon)
             
             batches = Batch.objects.filter(
-                expiry_date__range=(today, thirty_days_later),
+                expiry_date__range=(today, horizon_end),
                 quantity_in_stock__gt=0
             )
             if shop:
@@ -97,6 +122,8 @@ def get_expiring_soon(request):
             } for b in batches]
             
             return JsonResponse(results, safe=False, status=200)
+        except ValueError:
+            return JsonResponse({'error': 'horizon must be a number of days'}, status=400)
         except Exception as e:
             logger.error(f"Error fetching expiring items: {str(e)}")
             return JsonResponse({'error': 'Failed to fetch expiring items'}, status=500)
@@ -105,6 +132,31 @@ def get_expiring_soon(request):
 
 @csrf_exempt
 @jwt_required
+@versioned('stock')
+def get_expiry_summary(request):
+    """Stock at risk per expiry bucket (expired, 7, 30 and 90 days) for the authenticated shop"""
+    if request.method == 'GET':
+        try:
+            shop = request.register_user
+            results = [{
+                'bucket': row.bucket,
+                'label': row.get_bucket_display(),
+                'batch_count': row.batch_count,
+                'units': row.units,
+                'value_at_risk': float(row.value_at_risk),
+                'computed_on': row.computed_on,
+            } for row in expiry.get_summary(shop.shop_id)]
+
+            return JsonResponse(results, safe=False, status=200)
+        except Exception as e:
+            logger.error(f"Error fetching expiry summary: {str(e)}")
+            return JsonResponse({'error': 'Failed to fetch expiry summary'}, status=500)
+
+    return JsonResponse({'error': 'Method not allowed. Use GET.'}, status=405)
+
+@csrf_exempt
+@jwt_required
+@versioned('catalog', 'stock')
 def get_low_stock(request):
     """Get items with low stock for the authenticated shop"""
     if request.method == 'GET':
@@ -138,42 +190,85 @@ def get_low_stock(request):
 
 @csrf_exempt
 @jwt_required
+@versioned('catalog', 'stock')
+def get_low_stock_products(request):
+    """Products whose unexpired stock is below their reorder point, neediest first"""
+    if request.method == 'GET':
+        try:
+            shop = request.register_user
+            # Totals whose earliest batch has expired since are recomputed first
+            product_stock.refresh_expired(shop_id=shop.shop_id)
+
+            products = Product.objects.filter(
+                shop=shop,
+                stock_on_hand__lt=F('reorder_point')
+            ).order_by('stock_on_hand', 'product_id').values(
+                'product_id', 'generic_name', 'brand_name', 'stock_on_hand', 'reorder_point', 'next_expiry'
+            )
+
+            results = [{
+                **p,
+                'shortfall': p['reorder_point'] - p['stock_on_hand'],
+            } for p in products]
+
+            return JsonResponse(results, safe=False, status=200)
+
+        except Exception as e:
+            logger.error(f"Error fetching low stock products: {str(e)}")
+            return JsonResponse({'error': 'Failed to fetch low stock products'}, status=500)
+
+    return JsonResponse({'error': 'Method not allowed. Use GET.'}, status=405)
+
+@csrf_exempt
+@jwt_required
+@versioned('orders', 'payments')
 def get_sales_data(request):
-    """Get daily sales revenue for the past N days for the authenticated shop"""
+    """Get sales for the past N days for the authenticated shop.
+
+    Reads the ShopDailyStats rollup. Query params: days (default 30, max
+    3660) and granularity (day, week or month; weeks start on Monday).
+    """
     if request.method == 'GET':
         try:
             shop = getattr(request, 'register_user', None)
-            days = int(request.GET.get('days', 30))
-            
+            days = min(int(request.GET.get('days', 30)), 3660)
+            granularity = request.GET.get('granularity', 'day')
+            if granularity not in SALES_GRANULARITIES:
+                return JsonResponse({'error': f'granularity must be one of: {", ".join(SALES_GRANULARITIES)}'}, status=400)
+
             # Calculate the date N days ago
             start_date = date.today() - timedelta(days=days)
-            
-            # Query to get daily revenue using ORM
-            from django.db.models.functions import TruncDate
-            
-            sales_data = Order.objects.filter(
-                order_date__gte=start_date
+
+            sales_data = ShopDailyStats.objects.filter(shop=shop, date__gte=start_date).order_by('date').values(
+                'date', 'revenue', 'order_count', 'item_count', 'upi_amount', 'cash_amount', 'card_amount'
             )
-            if shop:
-                sales_data = sales_data.filter(shop=shop)
-            
-            sales_data = sales_data.annotate(
-                date=TruncDate('order_date')
-            ).values('date').annotate(
-                revenue=Sum('total_amount')
-            ).order_by('date')
-            
-            results = []
+
+            buckets = {}
             for item in sales_data:
-                results.append({
-                    'date': item['date'].isoformat() if item['date'] else None,
-                    'revenue': float(item['revenue']) if item['revenue'] else 0.0
+                period = SALES_GRANULARITIES[granularity](item['date'])
+                bucket = buckets.setdefault(period, {
+                    'date': period.isoformat(),
+                    'revenue': 0.0,
+                    'order_count': 0,
+                    'item_count': 0,
+                    'upi_amount': 0.0,
+                    'cash_amount': 0.0,
+                    'card_amount': 0.0,
                 })
-            
+                bucket['revenue'] += float(item['revenue'])
+                bucket['order_count'] += item['order_count']
+                bucket['item_count'] += item['item_count']
+                bucket['upi_amount'] += float(item['upi_amount'])
+                bucket['cash_amount'] += float(item['cash_amount'])
+                bucket['card_amount'] += float(item['card_amount'])
+
+            results = list(buckets.values())
             return JsonResponse(results, safe=False, status=200)
-            
+
+        except ValueError:
+            return JsonResponse({'error': 'days must be a number'}, status=400)
         except Exception as e:
             logger.error(f"Error fetching sales data: {str(e)}")
             return JsonResponse({'error': 'Failed to fetch sales data'}, status=500)
-    
+
     return JsonResponse({'error': 'Method not allowed. Use GET.'}, status=405)
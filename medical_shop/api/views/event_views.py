@@ -0,0 +1,50 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.views.decorators.csrf import csrf_exempt
+from api.auth import async_jwt_required
+from api import events
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _format_event(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def _event_stream(shop_id):
+    keepalive = events.options()['KEEPALIVE']
+    subscription = events.get_broker().subscribe(shop_id)
+    try:
+        yield 'retry: 5000\n\n'
+        yield _format_event({'type': 'ready', 'data': {'shop_id': shop_id}})
+        while True:
+            event = await subscription.get(timeout=keepalive)
+            # A comment line keeps proxies from closing an idle connection
+            yield _format_event(event) if event is not None else ': keepalive\n\n'
+    finally:
+        await subscription.aclose()
+
+
+@csrf_exempt
+@async_jwt_required
+async def shop_events(request):
+    """Server-sent events for the authenticated shop: stock, low_stock and order.
+
+    Only served under ASGI (startup.sh, or `uvicorn medical_shop.asgi:application`
+    locally). A WSGI worker would be held by the stream for as long as it stays
+    open, so there the endpoint answers 501 and clients fall back to polling.
+    """
+    if request.method == 'GET':
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'error': 'Live events need the ASGI server'}, status=501)
+        shop = request.register_user
+        response = StreamingHttpResponse(_event_stream(shop.shop_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    return JsonResponse({'error': 'Method not allowed. Use GET.'}, status=405)
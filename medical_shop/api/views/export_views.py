@@ -0,0 +1,44 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from api.models import Manager
+from api.auth import jwt_required
+from api import export
+from api.streaming import iterate
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@require_GET
+@jwt_required
+def export_data(request, kind):
+    """Download all of the shop's rows of one kind as a streamed file.
+
+    `format` is csv (default) or columnar; `compress=gzip` gzips the file as
+    it is sent. Only the shop's manager may export.
+    """
+    if kind not in export.EXPORTS:
+        return JsonResponse({'error': f'Unknown export: {kind}. Use one of {", ".join(export.EXPORTS)}'}, status=404)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return JsonResponse({'error': 'format must be csv or columnar'}, status=400)
+    compress = request.GET.get('compress', '') == 'gzip'
+
+    try:
+        shop = request.register_user
+        caller_account = getattr(request, 'account_user', None)
+        is_manager = isinstance(caller_account, Manager) and shop.manager and str(caller_account.phone) == str(shop.manager.phone)
+        if not is_manager:
+            return JsonResponse({'error': 'Only the shop manager can export data'}, status=403)
+
+        content_type = 'application/gzip' if compress else export.FORMATS[fmt][0]
+        response = StreamingHttpResponse(iterate(request, export.export(kind, shop.shop_id, fmt, compress)),
+                                         content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export.filename(kind, shop.shop_id, fmt, compress)}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+    except Exception as e:
+        logger.error(f"Error exporting {kind}: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
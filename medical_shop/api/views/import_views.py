@@ -0,0 +1,57 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from api.auth import jwt_required
+from api import bulk_import
+import csv
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORTERS = {
+    'products': bulk_import.import_products,
+    'batches': bulk_import.import_batches,
+}
+
+
+def _upload(request):
+    """The import stream and its format: a multipart `file` upload or the raw body."""
+    upload = request.FILES.get('file')
+    if upload is not None:
+        name = upload.name.lower()
+        if name.endswith(('.ndjson', '.jsonl')):
+            return upload, 'application/x-ndjson'
+        if name.endswith('.json'):
+            return upload, 'application/json'
+        return upload, upload.content_type or 'text/csv'
+    return request, request.content_type or 'text/csv'
+
+
+@csrf_exempt
+@require_POST
+@jwt_required
+def bulk_import_view(request, kind):
+    """Create or update products/batches of the authenticated shop in bulk.
+
+    Accepts CSV (header row with model field names), a JSON array or NDJSON,
+    either as the request body or as a multipart `file`. Existing rows are
+    matched on product_id (products) or batch_number + product_id (batches)
+    and updated in place. Invalid rows are skipped and reported by row number.
+    A file that becomes unreadable part way through gets a 400 carrying the
+    report, because the rows before that point have been imported.
+    """
+    importer = IMPORTERS.get(kind)
+    if importer is None:
+        return JsonResponse({'error': f'Unknown import type: {kind}'}, status=404)
+    try:
+        stream, content_type = _upload(request)
+        report = importer(request.register_user, bulk_import.read_rows(stream, content_type))
+        if report.read_error:
+            return JsonResponse({**report.as_dict(), 'error': report.read_error}, status=400)
+        return JsonResponse(report.as_dict(), status=200)
+    except (ValueError, csv.Error) as e:
+        # json.JSONDecodeError and UnicodeDecodeError are ValueErrors too
+        return JsonResponse({'error': f'Could not read import file: {e}'}, status=400)
+    except Exception as e:
+        logger.error(f"Error importing {kind}: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
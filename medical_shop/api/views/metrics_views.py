@@ -0,0 +1,27 @@
+import hmac
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from api import metrics
+
+
+@csrf_exempt
+@require_GET
+def metrics_view(request):
+    """Per-endpoint request metrics in the Prometheus text format.
+
+    Scrapers authenticate with `Authorization: Bearer <REQUEST_METRICS['TOKEN']>`.
+    Without a configured token the endpoint is only served when DEBUG is on.
+    Any worker answers with every worker's series (see api.metrics), so one
+    scrape target covers them all.
+    """
+    token = metrics.get_settings()['TOKEN']
+    if token:
+        auth_header = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(auth_header.encode(), f'Bearer {token}'.encode()):
+            return JsonResponse({'error': 'Invalid metrics token'}, status=401)
+    elif not settings.DEBUG:
+        return JsonResponse({'error': 'Not found'}, status=404)
+
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
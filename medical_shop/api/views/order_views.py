@@ -1,14 +1,232 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
-from django.db.models import F, Q, Prefetch
-from api.models import Order, OrderItem, Batch, Product
+from django.db.models import F, Q, Case, When, IntegerField, FloatField
+from django.db.models.functions import Cast
+from api.models import Order, OrderItem, Batch, Product, Payment
 from api.auth import jwt_required
+from api.versioning import versioned
+from api.signals import stock_changed
+from api import rollups, versioning, changelog, events, metrics
+from api.streaming import wants_stream, stream_json_list, CHUNK_SIZE
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import base64
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+ORDER_ITEM_FIELDS = ['product_id', 'batch_id', 'quantity', 'unit_price']
+PAYMENT_TYPES = {choice for choice, _ in Payment.PAYMENT_TYPES}
+CENT = Decimal('0.01')
+MAX_ORDER_AMOUNT = Decimal('1e8')  # Order.total_amount holds 8 digits before the point
+
+ORDER_FIELDS = ['order_id', 'customer_name', 'customer_number', 'doctor_name',
+                'total_amount', 'discount_percentage', 'order_date', 'items']
+ORDERS_PAGE_SIZE = 50
+ORDERS_MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(order):
+    """Opaque cursor pointing just past a serialized order in (-order_date, -order_id) order."""
+    raw = json.dumps({'d': order['order_date'], 'id': order['order_id']})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return {'order_date': datetime.fromisoformat(data['d']), 'order_id': int(data['id'])}
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError('invalid cursor') from e
+
+
+def serialize_orders(orders, fields=ORDER_FIELDS):
+    """Serialize an ordered Order queryset into dicts.
+
+    Headers come from one values() query and, when `items` is requested, all
+    line items of those orders from one more values() query joined across
+    batch__product. Numeric columns are cast to float in SQL, so no model
+    instances or Decimals are built.
+    """
+    rows = list(orders.values(
+        'order_id', 'customer_name', 'customer_number', 'doctor_name', 'discount_percentage', 'order_date',
+        total=Cast('total_amount', FloatField()),
+    ))
+
+    results = []
+    by_order = {}
+    for row in rows:
+        order_data = {
+            'order_id': row['order_id'],
+            'customer_name': row['customer_name'],
+            'customer_number': row['customer_number'],
+            'doctor_name': row['doctor_name'],
+            'total_amount': row['total'] or 0,
+            'discount_percentage': row['discount_percentage'] or 0,
+            'order_date': row['order_date'].isoformat() if row['order_date'] else None,
+        }
+        if 'items' in fields:
+            order_data['items'] = by_order[row['order_id']] = []
+        results.append(order_data)
+
+    if by_order:
+        items = OrderItem.objects.filter(order_id__in=list(by_order)).order_by('id').annotate(
+            unit_price_f=Cast('unit_price', FloatField()),
+            gst_f=Cast('batch__product__gst', FloatField()),
+            amount_f=Cast(F('quantity') * F('unit_price'), FloatField()),
+        ).values_list(
+            'order_id', 'quantity', 'batch__batch_number', 'batch__product__generic_name', 'batch__product__brand_name',
+            'unit_price_f', 'gst_f', 'amount_f',
+        )
+        for order_id, quantity, batch_number, generic_name, brand_name, unit_price, gst, amount in items:
+            by_order[order_id].append({
+                'quantity': quantity,
+                'unit_price': unit_price or 0,
+                'medicine_name': generic_name,
+                'brand_name': brand_name,
+                'gst': gst or 0,
+                'batch_number': batch_number,
+                'amount': amount or 0
+            })
+
+    return results
+
+
+def _after(orders, order_date, order_id):
+    """Restrict `orders` to rows after (order_date, order_id) in newest-first order."""
+    return orders.filter(Q(order_date__lt=order_date) | Q(order_date=order_date, order_id__lt=order_id))
+
+
+def _iter_orders(orders, fields, page_size=CHUNK_SIZE):
+    """Yield every order of a newest-first queryset, one keyset page at a time."""
+    page_qs = orders
+    while True:
+        page = serialize_orders(page_qs[:page_size], fields)
+        for order in page:
+            yield {key: value for key, value in order.items() if key in fields}
+        if len(page) < page_size:
+            return
+        last = page[-1]
+        page_qs = _after(orders, datetime.fromisoformat(last['order_date']), last['order_id'])
+
+
+class StockError(Exception):
+    """Raised when a basket cannot be fulfilled from the shop's batches."""
+
+
+class OrderInputError(ValueError):
+    """Raised when order items or payments carry invalid numbers."""
+
+
+def parse_amount(value):
+    """`value` as a Decimal rounded to the paisa, or None.
+
+    None means it is not a finite number that fits the order money columns
+    (10 digits, 2 after the point).
+    """
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or abs(amount) >= MAX_ORDER_AMOUNT:
+        return None
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _parse_whole(value):
+    """`value` as a positive int, or None; "2.9", 2.9 and true are not whole numbers."""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    if not number.is_finite() or number <= 0 or number != number.to_integral_value():
+        return None
+    return int(number)
+
+
+def parse_order_items(items):
+    """Validate a basket before any row is touched.
+
+    Returns one dict per item with an int `batch_id` and `quantity` and a
+    Decimal `unit_price`; raises OrderInputError with a message for the client.
+    """
+    lines = []
+    for item in items:
+        if not isinstance(item, dict) or not all(key in item for key in ORDER_ITEM_FIELDS):
+            raise OrderInputError(f'Each item must have: {", ".join(ORDER_ITEM_FIELDS)}')
+        batch_id = _parse_whole(item['batch_id'])
+        if batch_id is None:
+            raise OrderInputError('batch_id must be a positive whole number')
+        quantity = _parse_whole(item['quantity'])
+        if quantity is None:
+            raise OrderInputError(f'Quantity must be a positive whole number for batch {batch_id}')
+        unit_price = parse_amount(item['unit_price'])
+        if unit_price is None or unit_price < 0:
+            raise OrderInputError(f'unit_price must be a valid amount for batch {batch_id}')
+        lines.append({'product_id': item['product_id'], 'batch_id': batch_id, 'quantity': quantity, 'unit_price': unit_price})
+    return lines
+
+
+def _reserve_stock(shop, order, lines):
+    """Create the order items for `order` and take their quantities out of stock.
+
+    `lines` come from `parse_order_items`. All batches in the basket are
+    locked with a single SELECT ... FOR UPDATE ordered by id, so concurrent
+    counters always acquire row locks in the same order, and the stock is
+    decremented with one conditional UPDATE. Must be called inside
+    versioning.writing(), which applies the daily rollup, version bumps and
+    change log entries after these row locks; raises StockError to roll back.
+    """
+    quantities = {}
+    first_lines = {}
+    for line in lines:
+        batch_id = line['batch_id']
+        quantities[batch_id] = quantities.get(batch_id, 0) + line['quantity']
+        first_lines.setdefault(batch_id, line)
+
+    batches = {
+        b.id: b for b in Batch.objects.select_for_update().filter(shop=shop, id__in=quantities).order_by('id')
+    }
+
+    for batch_id, quantity in quantities.items():
+        batch = batches.get(batch_id)
+        if batch is None:
+            raise StockError(f'Batch {batch_id} not found')
+        if batch.quantity_in_stock < quantity:
+            raise StockError(
+                f'Insufficient stock for product {first_lines[batch_id]["product_id"]}, batch {batch_id}. Available: {batch.quantity_in_stock}'
+            )
+
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, batch_id=batch_id, quantity=quantity, unit_price=first_lines[batch_id]['unit_price'])
+        for batch_id, quantity in quantities.items()
+    ])
+
+    # The guard makes the UPDATE skip any row that would go negative, so a
+    # short row count means the stock moved underneath us.
+    guard = Q()
+    for batch_id, quantity in quantities.items():
+        guard |= Q(id=batch_id, quantity_in_stock__gte=quantity)
+    updated = Batch.objects.filter(guard).update(
+        quantity_in_stock=Case(
+            *[When(id=batch_id, then=F('quantity_in_stock') - quantity) for batch_id, quantity in quantities.items()],
+            output_field=IntegerField(),
+        )
+    )
+    if updated != len(quantities):
+        raise StockError('Stock changed while processing the order, please retry')
+
+    rollups.items_added(order, sum(quantities.values()))
+    stock_changed(shop.shop_id, {batch.product_id for batch in batches.values()})
+    changelog.record(shop.shop_id, 'batch', quantities)
+    for batch_id, quantity in quantities.items():
+        batch = batches[batch_id]
+        events.stock_moved(shop.shop_id, batch, batch.quantity_in_stock, batch.quantity_in_stock - quantity)
+
 @csrf_exempt
 @jwt_required
 def create_order(request):
@@ -18,14 +236,15 @@ def create_order(request):
             data = json.loads(request.body)
             shop = request.register_user
             
-            order = Order.objects.create(
-                shop=shop,
-                customer_name=data.get('customer_name'),
-                customer_number=data.get('customer_number'),
-                doctor_name=data.get('doctor_name'),
-                total_amount=data.get('total_amount', 0),
-                discount_percentage=data.get('discount_percentage', 0)
-            )
+            with versioning.writing():
+                order = Order.objects.create(
+                    shop=shop,
+                    customer_name=data.get('customer_name'),
+                    customer_number=data.get('customer_number'),
+                    doctor_name=data.get('doctor_name'),
+                    total_amount=data.get('total_amount', 0),
+                    discount_percentage=data.get('discount_percentage', 0)
+                )
 
             return JsonResponse({'message': 'Order created successfully', 'order_id': order.order_id}, status=201)
 
@@ -39,55 +258,79 @@ def create_order(request):
 
 @csrf_exempt
 @jwt_required
+@versioned('orders', 'catalog', 'stock')
 def get_orders(request):
-    """Get all orders for the authenticated shop"""
+    """Get a page of orders for the authenticated shop, newest first.
+
+    Query params:
+    - limit: page size (default 50, max 200)
+    - cursor: opaque `next_cursor` value from the previous page
+    - fields: comma separated subset of ORDER_FIELDS; include `items` for line items
+    - from / to: inclusive order date range (YYYY-MM-DD)
+    - stream: 1 to stream every matching order instead of a single page
+    """
     if request.method == 'GET':
         try:
             shop = getattr(request, 'register_user', None)
-            orders = Order.objects.prefetch_related(
-                Prefetch('orderitem_set',
-                        queryset=OrderItem.objects.select_related('batch__product'))
-            )
+
+            try:
+                limit = min(max(int(request.GET.get('limit', ORDERS_PAGE_SIZE)), 1), ORDERS_MAX_PAGE_SIZE)
+            except ValueError:
+                return JsonResponse({'error': 'limit must be a number'}, status=400)
+
+            fields = ORDER_FIELDS
+            if request.GET.get('fields'):
+                fields = [f.strip() for f in request.GET['fields'].split(',') if f.strip()]
+                unknown = [f for f in fields if f not in ORDER_FIELDS]
+                if unknown:
+                    return JsonResponse({'error': f'Unknown fields: {", ".join(unknown)}'}, status=400)
+
+            orders = Order.objects.all()
             if shop:
                 orders = orders.filter(shop=shop)
-            orders = orders.order_by('-order_date')
-            
-            results = []
-            for order in orders:
-                order_data = {
-                    'order_id': order.order_id,
-                    'customer_name': order.customer_name,
-                    'customer_number': order.customer_number,
-                    'doctor_name': order.doctor_name,
-                    'total_amount': float(order.total_amount) if order.total_amount else 0,
-                    'discount_percentage': float(order.discount_percentage) if order.discount_percentage else 0,
-                    'order_date': order.order_date.isoformat() if order.order_date else None,
-                    'items': []
-                }
-                
-                for item in order.orderitem_set.all():
-                    order_data['items'].append({
-                        'quantity': item.quantity,
-                        'unit_price': float(item.unit_price) if item.unit_price else 0,
-                        'medicine_name': item.batch.product.generic_name if item.batch and item.batch.product else 'Unknown',
-                        'brand_name': item.batch.product.brand_name if item.batch and item.batch.product else 'Unknown',
-                        'gst': float(item.batch.product.gst) if item.batch and item.batch.product and item.batch.product.gst else 0,
-                        'batch_number': item.batch.batch_number if item.batch else 'Unknown',
-                        'amount': float(item.quantity * item.unit_price) if item.quantity and item.unit_price else 0
-                    })
-                
-                results.append(order_data)
-                
-            return JsonResponse(results, safe=False, status=200)
-            
+
+            try:
+                if request.GET.get('from'):
+                    start = date.fromisoformat(request.GET['from'])
+                    orders = orders.filter(order_date__gte=datetime.combine(start, time.min))
+                if request.GET.get('to'):
+                    end = date.fromisoformat(request.GET['to']) + timedelta(days=1)
+                    orders = orders.filter(order_date__lt=datetime.combine(end, time.min))
+            except ValueError:
+                return JsonResponse({'error': 'Dates must be in YYYY-MM-DD format'}, status=400)
+
+            # Keyset pagination on (shop, -order_date); order_id breaks ties
+            cursor = request.GET.get('cursor')
+            if cursor:
+                try:
+                    position = _decode_cursor(cursor)
+                except ValueError:
+                    return JsonResponse({'error': 'Invalid cursor'}, status=400)
+                orders = _after(orders, position['order_date'], position['order_id'])
+            orders = orders.order_by('-order_date', '-order_id')
+
+            if wants_stream(request):
+                return stream_json_list(request, _iter_orders(orders, fields))
+
+            with metrics.span('serialize'):
+                page = serialize_orders(orders[:limit + 1], fields)
+                has_more = len(page) > limit
+                page = page[:limit]
+
+                results = [{key: value for key, value in order.items() if key in fields} for order in page]
+
+                next_cursor = _encode_cursor(page[-1]) if has_more else None
+                return JsonResponse({'results': results, 'next_cursor': next_cursor}, status=200)
+
         except Exception as e:
             logger.error(f"Error fetching orders: {str(e)}")
             return JsonResponse({'error': 'Failed to fetch orders'}, status=500)
-    
+
     return JsonResponse({'error': 'Method not allowed. Use GET.'}, status=405)
 
 @csrf_exempt
 @jwt_required
+@versioned('orders', 'catalog', 'stock')
 def get_order_items(request, order_id):
     """Get all items for a specific order"""
     if request.method == 'GET':
@@ -142,7 +385,8 @@ def update_order(request, order_id):
             if not updated:
                 return JsonResponse({'error': 'No fields to update'}, status=400)
             
-            order.save()
+            with versioning.writing():
+                order.save()
             return JsonResponse({'message': 'Order updated successfully'}, status=200)
 
         except json.JSONDecodeError:
@@ -163,7 +407,8 @@ def delete_order(request, order_id):
             try:
                 order = Order.objects.get(order_id=order_id, shop=shop)
                 # Django will cascade delete related items (payment, orderitems) automatically
-                order.delete()
+                with versioning.writing():
+                    order.delete()
                 return JsonResponse({'message': 'Order deleted successfully'}, status=200)
             except Order.DoesNotExist:
                 return JsonResponse({'error': 'Order not found in your shop'}, status=404)
@@ -187,51 +432,123 @@ def add_order_items(request):
             if not order_items:
                 return JsonResponse({'error': 'Order items are required'}, status=400)
 
-            # Validate each item
-            for item in order_items:
-                required_fields = ['product_id', 'batch_id', 'quantity', 'unit_price']
-                if not all(key in item for key in required_fields):
-                    return JsonResponse({'error': f'Each item must have: {", ".join(required_fields)}'}, status=400)
+            try:
+                lines = parse_order_items(order_items)
+            except OrderInputError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+            # Use the given order, else the last order for this shop
+            orders = Order.objects.filter(shop=shop)
+            if data.get('order_id'):
+                last_order = orders.filter(order_id=data['order_id']).first()
+            else:
+                last_order = orders.order_by('-order_id').first()
 
-            # Get the last order for this shop
-            last_order = Order.objects.filter(shop=shop).order_by('-order_id').first()
-            
             if not last_order:
                 return JsonResponse({'error': 'No orders found'}, status=400)
 
-            # Use transaction for data consistency
-            with transaction.atomic():
-                for item in order_items:
-                    # Get the batch
-                    try:
-                        batch = Batch.objects.select_for_update().get(id=item['batch_id'])
-                    except Batch.DoesNotExist:
-                        return JsonResponse({'error': f'Batch {item["batch_id"]} not found'}, status=400)
-                    
-                    # Check if stock is sufficient before updating
-                    if batch.quantity_in_stock < item['quantity']:
-                        return JsonResponse({
-                            'error': f'Insufficient stock for product {item["product_id"]}, batch {item["batch_id"]}. Available: {batch.quantity_in_stock}'
-                        }, status=400)
-                    
-                    # Create order item
-                    OrderItem.objects.create(
-                        order=last_order,
-                        batch=batch,
-                        unit_price=item['unit_price'],
-                        quantity=item['quantity']
-                    )
-                    
-                    # Update batch stock
-                    batch.quantity_in_stock = F('quantity_in_stock') - item['quantity']
-                    batch.save()
+            # Lock, validate and decrement all batches in one pass
+            try:
+                with versioning.writing():
+                    _reserve_stock(shop, last_order, lines)
+                    # Listed orders carry their items
+                    versioning.bump(shop.shop_id, 'orders')
+            except StockError as e:
+                return JsonResponse({'error': str(e)}, status=400)
 
             return JsonResponse({'message': 'Order items added successfully', 'order_id': last_order.order_id}, status=201)
 
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'Item quantities and batch ids must be numbers'}, status=400)
         except Exception as e:
             logger.error(f"Error adding order items: {str(e)}")
             return JsonResponse({'error': 'Failed to add order items'}, status=500)
 
     return JsonResponse({'error': 'Method not allowed. Use POST.'}, status=405)
+
+@csrf_exempt
+@jwt_required
+def checkout(request):
+    """Create an order with its items and payment in one transaction.
+
+    Payload: {"order": {...order fields...}, "items": [...], "payments": [...]}
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            shop = request.register_user
+            if not isinstance(data, dict):
+                return JsonResponse({'error': 'Payload must be a JSON object'}, status=400)
+            header = data.get('order', {})
+            items = data.get('items', [])
+            payments = data.get('payments', [])
+
+            if not isinstance(header, dict) or not isinstance(items, list) or not isinstance(payments, list):
+                return JsonResponse({'error': 'order must be an object, items and payments lists'}, status=400)
+            if not items:
+                return JsonResponse({'error': 'Order items are required'}, status=400)
+
+            # Every number is checked before the transaction starts, so bad
+            # input is a 400 and never a half-written order.
+            try:
+                lines = parse_order_items(items)
+            except OrderInputError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+            # Payment is one-to-one with Order, so entries of the same type are
+            # folded together and mixed payment types are rejected.
+            payment_type = None
+            payment_amount = Decimal('0')
+            for payment in payments:
+                if not isinstance(payment, dict) or not all(key in payment for key in ['payment_type', 'transaction_amount']):
+                    return JsonResponse({'error': 'Each payment must have payment_type and transaction_amount'}, status=400)
+                amount = parse_amount(payment['transaction_amount'])
+                if amount is None or amount < 0:
+                    return JsonResponse({'error': 'transaction_amount must be a valid number'}, status=400)
+                payment_amount += amount
+                current_type = str(payment['payment_type']).upper()
+                if current_type not in PAYMENT_TYPES:
+                    return JsonResponse({'error': f'payment_type must be one of: {", ".join(sorted(PAYMENT_TYPES))}'}, status=400)
+                if payment_type and current_type != payment_type:
+                    return JsonResponse({'error': 'Only one payment type is supported per order'}, status=400)
+                payment_type = current_type
+            if payment_amount >= MAX_ORDER_AMOUNT:
+                return JsonResponse({'error': 'transaction_amount must be a valid number'}, status=400)
+
+            total_amount = parse_amount(header.get('total_amount', 0))
+            try:
+                discount_percentage = Decimal(str(header.get('discount_percentage', 0)))
+            except InvalidOperation:
+                discount_percentage = Decimal('NaN')
+            if total_amount is None or not (discount_percentage.is_finite() and 0 <= discount_percentage <= 100):
+                return JsonResponse({'error': 'total_amount and discount_percentage must be valid numbers'}, status=400)
+
+            try:
+                with versioning.writing():
+                    order = Order.objects.create(
+                        shop=shop,
+                        customer_name=header.get('customer_name'),
+                        customer_number=header.get('customer_number'),
+                        doctor_name=header.get('doctor_name'),
+                        total_amount=total_amount,
+                        discount_percentage=float(discount_percentage)
+                    )
+                    _reserve_stock(shop, order, lines)
+                    if payment_type:
+                        Payment.objects.create(order=order, payment_type=payment_type, transaction_amount=payment_amount)
+            except StockError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+            return JsonResponse({'message': 'Order placed successfully', 'order_id': order.order_id}, status=201)
+
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'Item quantities and batch ids must be numbers'}, status=400)
+        except Exception as e:
+            logger.error(f"Error during checkout: {str(e)}")
+            return JsonResponse({'error': 'Failed to place order'}, status=500)
+
+    return JsonResponse({'error': 'Method not allowed. Use POST.'}, status=405)
@@ -3,12 +3,27 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Sum, Q, Count, F
 from api.models import Payment, Order
 from api.auth import jwt_required
+from api.versioning import versioned
+from api import versioning
+from api.streaming import wants_stream, stream_json_list, CHUNK_SIZE
 import json
 import logging
 from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
+
+def serialize_payment(p):
+    return {
+        'order_id': p.order_id,
+        'payment_type': p.payment_type or 'Unknown',
+        'transaction_amount': float(p.transaction_amount) if p.transaction_amount else 0.0,
+        'customer_name': p.order.customer_name or 'Unknown Customer',
+        'total_amount': float(p.order.total_amount) if p.order.total_amount else 0.0,
+        'order_date': p.order.order_date.strftime('%Y-%m-%d %H:%M:%S') if p.order.order_date else None
+    }
+
+
 @csrf_exempt
 @jwt_required
 def add_payment(request):
@@ -32,19 +47,20 @@ def add_payment(request):
                 except (ValueError, TypeError):
                     return JsonResponse({'error': 'transaction_amount must be a valid number'}, status=400)
 
-            # Get the last order
-            last_order = Order.objects.order_by('-order_id').first()
+            # Get the last order for this shop
+            last_order = Order.objects.filter(shop=request.register_user).order_by('-order_id').first()
 
             if not last_order:
                 return JsonResponse({'error': 'No orders found'}, status=400)
 
             # Insert payments
-            for payment in payments:
-                Payment.objects.create(
-                    order=last_order,
-                    payment_type=payment['payment_type'],
-                    transaction_amount=float(payment['transaction_amount'])
-                )
+            with versioning.writing():
+                for payment in payments:
+                    Payment.objects.create(
+                        order=last_order,
+                        payment_type=payment['payment_type'],
+                        transaction_amount=float(payment['transaction_amount'])
+                    )
 
             return JsonResponse({'message': 'Payments added successfully', 'order_id': last_order.order_id}, status=201)
 
@@ -86,7 +102,8 @@ def update_payment(request, order_id):
             if not updated:
                 return JsonResponse({'error': 'No fields to update'}, status=400)
             
-            payment.save()
+            with versioning.writing():
+                payment.save()
             return JsonResponse({'message': 'Payment updated successfully'}, status=200)
 
         except json.JSONDecodeError:
@@ -105,7 +122,8 @@ def delete_payment(request, order_id):
         try:
             try:
                 payment = Payment.objects.get(order_id=order_id)
-                payment.delete()
+                with versioning.writing():
+                    payment.delete()
                 return JsonResponse({'message': 'Payment deleted successfully'}, status=200)
             except Payment.DoesNotExist:
                 return JsonResponse({'error': 'Payment not found'}, status=404)
@@ -118,6 +136,7 @@ def delete_payment(request, order_id):
 
 @csrf_exempt
 @jwt_required
+@versioned('payments')
 def get_payments(request):
     """Get all payments for the authenticated shop"""
     if request.method == 'GET':
@@ -127,18 +146,11 @@ def get_payments(request):
             if shop:
                 payments = payments.filter(order__shop=shop)
             payments = payments.order_by('-order__order_date')
-            
-            results = []
-            for p in payments:
-                results.append({
-                    'order_id': p.order_id,
-                    'payment_type': p.payment_type or 'Unknown',
-                    'transaction_amount': float(p.transaction_amount) if p.transaction_amount else 0.0,
-                    'customer_name': p.order.customer_name or 'Unknown Customer',
-                    'total_amount': float(p.order.total_amount) if p.order.total_amount else 0.0,
-                    'order_date': p.order.order_date.strftime('%Y-%m-%d %H:%M:%S') if p.order.order_date else None
-                })
-                
+
+            if wants_stream(request):
+                return stream_json_list(request, (serialize_payment(p) for p in payments.iterator(chunk_size=CHUNK_SIZE)))
+
+            results = [serialize_payment(p) for p in payments]
             return JsonResponse(results, safe=False, status=200)
             
         except Exception as e:
@@ -149,6 +161,7 @@ def get_payments(request):
 
 @csrf_exempt
 @jwt_required
+@versioned('payments')
 def get_payment_summary(request):
     """Get payment summary statistics"""
     if request.method == 'GET':
@@ -1,17 +1,37 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import HttpResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from api.auth import jwt_required
+from api.versioning import versioned
+from api import metrics, catalog_cache, versioning
 from django.db.models import ProtectedError
 from api.models import Product
+from api.streaming import wants_stream, stream_json_list, CHUNK_SIZE
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def serialize_product(p):
+    return {
+        'product_id': p.product_id,
+        'brand_name': p.brand_name,
+        'generic_name': p.generic_name,
+        'hsn': p.hsn,
+        'gst': float(p.gst) if p.gst else None,
+        'prescription_required': p.prescription_required,
+        'composition_id': p.composition_id,
+        'therapeutic_category': p.therapeutic_category,
+        'reorder_point': p.reorder_point
+    }
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 @method_decorator(jwt_required, name='get')
+@method_decorator(versioned('catalog'), name='get')
 @method_decorator(jwt_required, name='post')
 @method_decorator(jwt_required, name='put')
 @method_decorator(jwt_required, name='delete')
@@ -34,17 +54,7 @@ class ProductView(APIView):
                     if not product:
                         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
                     
-                    product_data = {
-                        'product_id': product.product_id,
-                        'brand_name': product.brand_name,
-                        'generic_name': product.generic_name,
-                        'hsn': product.hsn,
-                        'gst': float(product.gst) if product.gst else None,
-                        'prescription_required': product.prescription_required,
-                        'composition_id': product.composition_id,
-                        'therapeutic_category': product.therapeutic_category
-                    }
-                    return Response(product_data, status=status.HTTP_200_OK)
+                    return Response(serialize_product(product), status=status.HTTP_200_OK)
                 except Exception as e:
                     return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
             else:
@@ -53,17 +63,21 @@ class ProductView(APIView):
                 if shop:
                     products = products.filter(shop=shop)
                 products = products.order_by('product_id')
-                
-                results = [{
-                    'product_id': p.product_id,
-                    'brand_name': p.brand_name,
-                    'generic_name': p.generic_name,
-                    'hsn': p.hsn,
-                    'gst': float(p.gst) if p.gst else None,
-                    'prescription_required': p.prescription_required,
-                    'composition_id': p.composition_id,
-                    'therapeutic_category': p.therapeutic_category
-                } for p in products]
+
+                if wants_stream(request):
+                    return stream_json_list(request, (serialize_product(p) for p in products.iterator(chunk_size=CHUNK_SIZE)))
+
+                if shop:
+                    # Served from the shop's catalog cache until a product changes
+                    with metrics.span('serialize'):
+                        content = catalog_cache.get_or_build(
+                            'products', shop.shop_id, lambda: [serialize_product(p) for p in products],
+                            getattr(request, 'data_versions', None),
+                        )
+                    return HttpResponse(content, content_type='application/json')
+
+                with metrics.span('serialize'):
+                    results = [serialize_product(p) for p in products]
                 return Response(results, status=status.HTTP_200_OK)
         
         except Exception as e:
@@ -86,17 +100,19 @@ class ProductView(APIView):
                 return Response({'error': 'Product with this ID already exists in your shop'}, status=status.HTTP_400_BAD_REQUEST)
             
             # Create new product
-            Product.objects.create(
-                product_id=data['product_id'],
-                shop=shop,
-                composition_id=data['composition_id'],
-                generic_name=data['generic_name'],
-                brand_name=data['brand_name'],
-                hsn=data.get('hsn', ''),
-                gst=data.get('gst', 0),
-                prescription_required=data.get('prescription_required', False),
-                therapeutic_category=data.get('therapeutic_category', '')
-            )
+            with versioning.writing():
+                Product.objects.create(
+                    product_id=data['product_id'],
+                    shop=shop,
+                    composition_id=data['composition_id'],
+                    generic_name=data['generic_name'],
+                    brand_name=data['brand_name'],
+                    hsn=data.get('hsn', ''),
+                    gst=data.get('gst', 0),
+                    prescription_required=data.get('prescription_required', False),
+                    therapeutic_category=data.get('therapeutic_category', ''),
+                    reorder_point=data.get('reorder_point', 10)
+                )
 
             return Response({'message': 'Product created successfully'}, status=status.HTTP_201_CREATED)
 
@@ -118,7 +134,7 @@ class ProductView(APIView):
             # Update fields if provided
             updated = False
             
-            for field in ['composition_id', 'generic_name', 'brand_name', 'hsn', 'gst', 'prescription_required', 'therapeutic_category']:
+            for field in ['composition_id', 'generic_name', 'brand_name', 'hsn', 'gst', 'prescription_required', 'therapeutic_category', 'reorder_point']:
                 if field in data:
                     setattr(product, field, data[field])
                     updated = True
@@ -126,7 +142,8 @@ class ProductView(APIView):
             if not updated:
                 return Response({'error': 'No fields to update'}, status=status.HTTP_400_BAD_REQUEST)
             
-            product.save()
+            with versioning.writing():
+                product.save()
             return Response({'message': 'Product updated successfully'}, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -143,10 +160,11 @@ class ProductView(APIView):
                 return Response({'error': 'Product not found in your shop'}, status=status.HTTP_404_NOT_FOUND)
             
             # Check if product has associated batches
-            if product.batch_set.exists():
+            if product.batches.exists():
                 return Response({'error': 'Cannot delete product with existing batches'}, status=status.HTTP_400_BAD_REQUEST)
             
-            product.delete()
+            with versioning.writing():
+                product.delete()
             return Response({'message': 'Product deleted successfully'}, status=status.HTTP_200_OK)
 
         except ProtectedError:
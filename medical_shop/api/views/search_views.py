@@ -1,18 +1,20 @@
 # file: ./medical_shop/api/views/search_views.py
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET
-from django.db.models import Q, Min, Sum
-from api.models import Product, Batch
+from django.db.models import Q
+from api.models import Batch
 from api.auth import jwt_required
+from api.versioning import versioned
+from api import search_index, suggestions, forecast, metrics, catalog_cache
 import logging
-import random
 from datetime import date
 
 logger = logging.getLogger(__name__)
 
 @csrf_exempt
 @jwt_required
+@versioned('catalog', 'stock')
 def search_medicines_with_batches(request):
     """Search for medicines with their available batches in the authenticated shop"""
     if request.method == "GET":
@@ -22,22 +24,30 @@ def search_medicines_with_batches(request):
 
         try:
             shop = getattr(request, 'register_user', None)
-            today = date.today()
-            
-            # Use Q objects for complex OR queries
-            batches = Batch.objects.filter(
-                Q(product__generic_name__icontains=search_query) |
-                Q(product__brand_name__icontains=search_query),
-                quantity_in_stock__gt=0,
-                expiry_date__gt=today
-            )
-            if shop:
-                batches = batches.filter(shop=shop)
-            batches = batches.select_related('product').order_by('product__brand_name', 'expiry_date')
-            
-            results = []
-            for b in batches:
-                results.append({
+            def search():
+                today = date.today()
+                batches = Batch.objects.filter(quantity_in_stock__gt=0, expiry_date__gt=today)
+                if shop:
+                    batches = batches.filter(shop=shop)
+
+                # Narrow to the trigram index candidates, then confirm the substring
+                # match on that small set; queries too short for a trigram fall back
+                # to a prefix match, which the (shop, generic_name) index can serve.
+                candidates = search_index.matching_product_ids(shop, search_query) if shop else None
+                if candidates is not None:
+                    batches = batches.filter(
+                        Q(product__generic_name__icontains=search_query) |
+                        Q(product__brand_name__icontains=search_query),
+                        product_id__in=candidates
+                    )
+                else:
+                    batches = batches.filter(
+                        Q(product__generic_name__istartswith=search_query) |
+                        Q(product__brand_name__istartswith=search_query)
+                    )
+                batches = batches.select_related('product').order_by('product__brand_name', 'expiry_date')
+
+                return [{
                     'product_id': b.product.product_id,
                     'generic_name': b.product.generic_name,
                     'brand_name': b.product.brand_name,
@@ -48,9 +58,17 @@ def search_medicines_with_batches(request):
                     'average_purchase_price': float(b.average_purchase_price) if b.average_purchase_price else 0.0,
                     'selling_price': float(b.selling_price),
                     'quantity_in_stock': b.quantity_in_stock
-                })
-
-            return JsonResponse(results, safe=False, status=200)
+                } for b in batches]
+
+            with metrics.span('serialize'):
+                if not shop:
+                    return JsonResponse(search(), safe=False, status=200)
+                # Served from the shop's catalog cache until a product or batch changes
+                content = catalog_cache.get_or_build(
+                    'search', shop.shop_id, search, getattr(request, 'data_versions', None),
+                    catalog_cache.search_variant(search_query),
+                )
+                return HttpResponse(content, content_type='application/json')
 
         except Exception as e:
             logger.error(f"Medicine search error: {str(e)}")
@@ -61,19 +79,17 @@ def search_medicines_with_batches(request):
 
 @csrf_exempt
 @require_GET
+@jwt_required
 def predict_salts(request):
     """
-    Dummy prediction endpoint for salts needed by city and month.
-    Accepts query params: month (1-12 or month name) and city (string).
-    Returns a randomized list of salts (static dataset) each call.
+    Forecast the salts (generic names) most in demand for a month.
+    Accepts query params: month (1-12 or month name, default this month), city
+    (city-wide forecast; defaults to the authenticated shop's own) and limit.
+    Reads DemandForecast, trained offline by `manage.py train_demand_forecast`.
     """
     month_param = request.GET.get('month', '').strip()
     city_param = request.GET.get('city', '').strip()
 
-    # Basic validation
-    if not city_param:
-        return JsonResponse({'error': 'City parameter is required'}, status=400)
-
     # Helper: parse month into integer 1-12 if possible
     month_map = {
         'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
@@ -89,66 +105,42 @@ def predict_salts(request):
         except ValueError:
             m = month_param[:3].lower()
             month = month_map.get(m)
-
-    # Static dataset: for demo purposes only
-    # Keys are lowercase city names; values map month -> list of salts
-    static_dataset = {
-        'mumbai': {
-            1: ['Paracetamol', 'Amoxicillin', 'Cetirizine', 'Rabeprazole'],
-            2: ['Azithromycin', 'Metformin', 'Pantoprazole'],
-            3: ['Amlodipine', 'Cefixime', 'Levocetirizine'],
-        },
-        'delhi': {
-            1: ['Cetirizine', 'Doxycycline', 'Pantoprazole'],
-            2: ['Paracetamol', 'Ciprofloxacin', 'Metformin'],
-            3: ['Amlodipine', 'Losartan', 'Omeprazole'],
-        },
-        'kolkata': {
-            1: ['Paracetamol', 'Ranitidine', 'Azithromycin'],
-            2: ['Levocetirizine', 'Amoxicillin', 'Metformin'],
-            3: ['Cefixime', 'Atorvastatin', 'Ondansetron'],
-        }
-    }
-
-    city_key = city_param.lower()
-    city_data = static_dataset.get(city_key, {})
-
-    # If month provided and we have data for it, use that; otherwise, flatten city data
-    salts_pool = []
-    if month and month in city_data:
-        salts_pool = list(city_data[month])
-    else:
-        # collect all salts for the city or from all cities as fallback
-        if city_data:
-            for lst in city_data.values():
-                salts_pool.extend(lst)
-        else:
-            # fallback: aggregate all salts across dataset
-            for c in static_dataset.values():
-                for lst in c.values():
-                    salts_pool.extend(lst)
-
-    # Ensure unique pool
-    salts_pool = list(dict.fromkeys(salts_pool))
-
-    # Randomize order every time and return a limited list
-    random.shuffle(salts_pool)
-    # choose first N (e.g., up to 6)
-    suggested = salts_pool[:6]
-    selected = suggested[0] if suggested else None
-
+    month = month or date.today().month
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 6)), 1), forecast.TOP_N)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+
+    try:
+        shop = request.register_user
+        scope = 'city'
+        rows = forecast.predictions(month, city=city_param, limit=limit) if city_param else []
+        if not rows:
+            # No city-wide forecast: fall back to the shop's own history
+            scope = 'shop'
+            rows = forecast.predictions(month, shop_id=shop.shop_id, limit=limit)
+    except Exception as e:
+        logger.error(f"Error fetching salt predictions: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch salt predictions'}, status=500)
+
+    suggested = [row['generic_name'] for row in rows]
     response = {
-        'month': month if month else None,
+        'month': month,
         'city': city_param,
+        'scope': scope,
         'predicted_salts': suggested,
-        'selected_salt': selected,
-        'note': 'This is a dummy prediction using a static dataset. Real model will replace this.'
+        'selected_salt': suggested[0] if suggested else None,
+        'forecast': [{'generic_name': row['generic_name'], 'predicted_units': round(row['predicted_units'], 1)} for row in rows],
+        'trained_at': rows[0]['trained_at'] if rows else None,
+        'note': 'Seasonal forecast from order history.' if rows else 'No forecast yet. Run manage.py train_demand_forecast.'
     }
 
     return JsonResponse(response, status=200)
 
 @csrf_exempt
 @jwt_required
+@versioned('catalog', 'stock')
 def get_medicine_suggestions(request):
     """Get medicine suggestions for autocomplete in the authenticated shop"""
     if request.method == "GET":
@@ -158,26 +150,10 @@ def get_medicine_suggestions(request):
 
         try:
             shop = getattr(request, 'register_user', None)
-            today = date.today()
-            
-            # Get products with their batch information
-            products = Product.objects.filter(
-                Q(generic_name__icontains=search_query) |
-                Q(brand_name__icontains=search_query),
-                batch__quantity_in_stock__gt=0,
-                batch__expiry_date__gt=today
-            )
-            if shop:
-                products = products.filter(shop=shop)
-            
-            products = products.annotate(
-                min_price=Min('batch__selling_price'),
-                total_stock=Sum('batch__quantity_in_stock')
-            ).values(
-                'product_id', 'generic_name', 'brand_name', 'min_price', 'total_stock'
-            ).distinct().order_by('brand_name')[:10]
-            
-            results = list(products)
+
+            # Served from the in-process per-shop prefix index; the database
+            # is only queried when the index is built or refreshed
+            results = suggestions.get_index(shop.shop_id).search(search_query)
 
             return JsonResponse(results, safe=False, status=200)
 
@@ -0,0 +1,79 @@
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from api.models import Product, Batch
+from api.auth import jwt_required
+from api.versioning import versioned
+from api import changelog
+from .product_views import serialize_product
+from .batch_views import serialize_batch
+import logging
+
+logger = logging.getLogger(__name__)
+
+SYNC_MAX_CHANGES = 5000
+
+
+@csrf_exempt
+@jwt_required
+@versioned('catalog', 'stock')
+def sync_catalog(request):
+    """Products and batches changed since a sync token for the authenticated shop.
+
+    Without `since` (or with a token older than the pruned change log) the
+    whole catalog is returned with `reset: true`. Otherwise only rows changed
+    after the token, plus `deleted` product_ids / batch ids. Pass `next` back
+    as `since`; while `has_more` is true, call again straight away.
+    """
+    if request.method == 'GET':
+        try:
+            shop = request.register_user
+            since = int(request.GET.get('since') or 0)
+            if since < 0:
+                return JsonResponse({'error': 'since must not be negative'}, status=400)
+
+            products = Product.objects.filter(shop=shop).order_by('product_id')
+            batches = Batch.objects.select_related('product').filter(shop=shop).order_by('id')
+
+            floor = changelog.sync_floor(shop.shop_id)
+            if since == 0 or since < floor:
+                # Read the token first: anything committed meanwhile is resent.
+                # The floor stands in for a log that was pruned empty.
+                next_token = max(changelog.last_change_id(shop.shop_id), floor)
+                return JsonResponse({
+                    'reset': True,
+                    'next': str(next_token),
+                    'has_more': False,
+                    'products': [serialize_product(p) for p in products],
+                    'batches': [serialize_batch(b) for b in batches],
+                    'deleted': {'products': [], 'batches': []},
+                }, status=200)
+
+            changed, deleted, next_token, has_more = changelog.changes_since(shop.shop_id, since, SYNC_MAX_CHANGES)
+
+            products = list(products.filter(product_id__in=changed['product']))
+            batch_ids = [int(key) for key in changed['batch']]
+            batches = list(batches.filter(id__in=batch_ids))
+
+            # Rows logged as changed but gone by now are reported as deleted
+            deleted_products = deleted['product'] | (changed['product'] - {p.product_id for p in products})
+            deleted_batches = {int(key) for key in deleted['batch']} | (set(batch_ids) - {b.id for b in batches})
+
+            return JsonResponse({
+                'reset': False,
+                'next': str(next_token),
+                'has_more': has_more,
+                'products': [serialize_product(p) for p in products],
+                'batches': [serialize_batch(b) for b in batches],
+                'deleted': {
+                    'products': sorted(deleted_products),
+                    'batches': sorted(deleted_batches),
+                },
+            }, status=200)
+
+        except ValueError:
+            return JsonResponse({'error': 'since must be a sync token returned as next'}, status=400)
+        except Exception as e:
+            logger.error(f"Error syncing catalog: {str(e)}")
+            return JsonResponse({'error': 'Failed to sync catalog'}, status=500)
+
+    return JsonResponse({'error': 'Method not allowed. Use GET.'}, status=405)
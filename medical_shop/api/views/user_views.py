@@ -1,11 +1,18 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth.hashers import make_password, check_password
 from django.core.exceptions import ValidationError
-from django.db.models import Q
+from django.db.models import Q, F, Value, Subquery, OuterRef, CharField, BooleanField
 from api.models import Shop, Staff, Manager
-from api.auth import generate_token, jwt_required
+from api.auth import (
+    jwt_required, decode_token, issue_tokens, issue_tokens_for,
+    revoke_account_tokens, revoke_removed_staff_tokens, revoke_shop_tokens,
+    staff_start_epoch,
+)
+from api.revocation import revocations
+from api.identity_cache import invalidate_shop, invalidate_account
+from api.passwords import hash_password, verify_password, HashingBusy
 import json
+import jwt
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,7 +38,7 @@ def register_user(request):
             if Manager.objects.filter(phone=phone).exists():
                 return JsonResponse({'error': 'Phone number already registered as manager'}, status=400)
 
-            hashed_password = make_password(password)
+            hashed_password = hash_password(password)
             
             # Create new manager
             manager = Manager.objects.create(
@@ -43,15 +50,16 @@ def register_user(request):
             # Create first shop for this manager
             shop = Shop.objects.create(
                 shopname=shopname,
-                manager=manager
+                manager=manager,
+                city=(data.get('city') or '').strip()
             )
 
-            # Generate JWT token for newly created manager
-            token = generate_token(account_phone=manager.phone, shop_id=shop.shop_id)
+            # Tokens for the newly created manager
+            tokens = issue_tokens(manager.phone, 'manager', manager.token_epoch, shop.shop_id, [shop.shop_id])
 
             return JsonResponse({
                 'message': 'Manager and shop registered successfully',
-                'token': token,
+                **tokens,
                 'shop_id': shop.shop_id,
                 'shopname': shop.shopname,
                 'manager': manager.phone
@@ -59,12 +67,47 @@ def register_user(request):
 
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+        except HashingBusy:
+            return _hashing_busy_response()
         except Exception as e:
             logger.error(f"Registration error: {str(e)}", exc_info=True)
             return JsonResponse({'error': f'Registration failed: {str(e)}'}, status=500)
 
     return JsonResponse({'error': 'Method not allowed. Use POST.'}, status=405)
 
+def _hashing_busy_response():
+    response = JsonResponse({'error': 'Server busy checking passwords, please retry'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _find_login_account(phone):
+    """Look up a login phone across staff and managers in one UNION query.
+
+    Returns (kind, phone, password, is_active, token_epoch, shop_id,
+    shopname, manager_phone) or None. Staff wins when the phone is both, as staff
+    phones are unique across shops. A manager's shop is their first one.
+    """
+    columns = ('kind', 'phone', 'password', 'active', 'token_epoch', 'login_shop_id', 'login_shopname', 'manager_phone')
+    staff = Staff.objects.filter(phone=phone).annotate(
+        kind=Value('staff', output_field=CharField()),
+        active=F('is_active'),
+        login_shop_id=F('shop_id'),
+        login_shopname=F('shop__shopname'),
+        manager_phone=F('shop__manager__phone'),
+    ).values_list(*columns)
+    first_shop = Shop.objects.filter(manager=OuterRef('pk')).order_by('shop_id')
+    managers = Manager.objects.filter(phone=phone).annotate(
+        kind=Value('manager', output_field=CharField()),
+        active=Value(True, output_field=BooleanField()),
+        login_shop_id=Subquery(first_shop.values('shop_id')[:1]),
+        login_shopname=Subquery(first_shop.values('shopname')[:1]),
+        manager_phone=F('phone'),
+    ).values_list(*columns)
+    rows = sorted(staff.union(managers, all=True), key=lambda row: row[0] != 'staff')
+    return rows[0] if rows else None
+
+
 @csrf_exempt
 def login_user(request):
     """User login"""
@@ -77,52 +120,38 @@ def login_user(request):
             if not all([phone, password]):
                 return JsonResponse({'error': 'Phone and password are required'}, status=400)
 
-            # First try staff login (staff phone is unique across all shops)
-            try:
-                staff = Staff.objects.get(phone=phone)
-                if not check_password(password, staff.password):
-                    return JsonResponse({'error': 'Invalid phone or password'}, status=401)
-                
-                if not staff.is_active:
-                    return JsonResponse({'error': 'Staff account is inactive'}, status=403)
-                
-                # Generate token for staff with shop context
-                token = generate_token(account_phone=staff.phone, shop_id=staff.shop.shop_id)
-                return JsonResponse({
-                    'message': 'Login successful', 
-                    'token': token,
-                    'shop_id': staff.shop.shop_id,
-                    'shopname': staff.shop.shopname, 
-                    'manager': staff.shop.manager.phone if staff.shop.manager else None,
-                    'is_staff': True
-                }, status=200)
-                
-            except Staff.DoesNotExist:
-                # Not a staff, try manager login
-                try:
-                    manager = Manager.objects.get(phone=phone)
-                    if not check_password(password, manager.password):
-                        return JsonResponse({'error': 'Invalid phone or password'}, status=401)
-
-                    # Get the first shop for this manager
-                    first_shop = Shop.objects.filter(manager=manager).first()
-                    if not first_shop:
-                        return JsonResponse({'error': 'No shops found for this manager'}, status=404)
-
-                    # Generate JWT token for manager with first shop context
-                    token = generate_token(account_phone=manager.phone, shop_id=first_shop.shop_id)
-
-                    return JsonResponse({
-                        'message': 'Login successful',
-                        'token': token,
-                        'shop_id': first_shop.shop_id,
-                        'shopname': first_shop.shopname,
-                        'manager': manager.phone,
-                        'is_manager': True
-                    }, status=200)
-                except Manager.DoesNotExist:
-                    return JsonResponse({'error': 'Invalid phone or password'}, status=401)
+            account = _find_login_account(phone)
+            if account is None:
+                return JsonResponse({'error': 'Invalid phone or password'}, status=401)
+            kind, account_phone, encoded, is_active, epoch, shop_id, shopname, manager_phone = account
+
+            model = Staff if kind == 'staff' else Manager
+            if not verify_password(password, encoded, model, account_phone):
+                return JsonResponse({'error': 'Invalid phone or password'}, status=401)
 
+            if kind == 'staff':
+                if not is_active:
+                    return JsonResponse({'error': 'Staff account is inactive'}, status=403)
+            elif shop_id is None:
+                return JsonResponse({'error': 'No shops found for this manager'}, status=404)
+
+            # Tokens for the staff member's shop, or the manager's first shop
+            if kind == 'staff':
+                shop_ids = [shop_id]
+            else:
+                shop_ids = list(Shop.objects.filter(manager_id=account_phone).order_by('shop_id').values_list('shop_id', flat=True))
+            tokens = issue_tokens(account_phone, kind, epoch, shop_id, shop_ids)
+            return JsonResponse({
+                'message': 'Login successful',
+                **tokens,
+                'shop_id': shop_id,
+                'shopname': shopname,
+                'manager': manager_phone,
+                'is_staff' if kind == 'staff' else 'is_manager': True
+            }, status=200)
+
+        except HashingBusy:
+            return _hashing_busy_response()
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON format'}, status=400)
         except Exception as e:
@@ -131,6 +160,72 @@ def login_user(request):
 
     return JsonResponse({'error': 'Method not allowed. Use POST.'}, status=405)
 
+@csrf_exempt
+def refresh_token(request):
+    """Trade a refresh token for a new access token.
+
+    The account is read again, so removed staff, deleted shops and revoked
+    (logged out) tokens are refused here.
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            token = data.get('refresh_token')
+            if not token:
+                return JsonResponse({'error': 'refresh_token is required'}, status=400)
+
+            try:
+                payload = decode_token(token)
+            except jwt.ExpiredSignatureError:
+                return JsonResponse({'error': 'Refresh token has expired.'}, status=401)
+            except jwt.InvalidTokenError:
+                return JsonResponse({'error': 'Invalid refresh token.'}, status=401)
+            if payload.get('typ') != 'refresh':
+                return JsonResponse({'error': 'Invalid refresh token.'}, status=401)
+
+            shop_id = payload['shop']
+            if payload['role'] == 'manager':
+                account = Manager.objects.filter(phone=payload['account']).first()
+                has_shop = account is not None and Shop.objects.filter(shop_id=shop_id, manager=account).exists()
+            else:
+                account = Staff.objects.filter(phone=payload['account'], shop_id=shop_id).first()
+                has_shop = account is not None
+                if has_shop and not account.is_active:
+                    return JsonResponse({'error': 'Staff account is inactive'}, status=403)
+            if not has_shop or account.token_epoch != payload['epoch'] or revocations.is_revoked(payload):
+                return JsonResponse({'error': 'Token has been revoked.'}, status=401)
+
+            tokens = issue_tokens_for(account, shop_id)
+            return JsonResponse({'token': tokens['token'], 'expires_in': tokens['expires_in']}, status=200)
+
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+        except Exception as e:
+            logger.error(f"Token refresh error: {str(e)}")
+            return JsonResponse({'error': 'Token refresh failed'}, status=500)
+
+    return JsonResponse({'error': 'Method not allowed. Use POST.'}, status=405)
+
+
+@csrf_exempt
+@jwt_required
+def logout_user(request):
+    """Revoke every access and refresh token of the calling account (all devices)."""
+    if request.method == 'POST':
+        try:
+            caller_account = getattr(request, 'account_user', None)
+            if not caller_account:
+                return JsonResponse({'error': 'Not authenticated'}, status=401)
+
+            revoke_account_tokens(caller_account)
+            return JsonResponse({'message': 'Logged out'}, status=200)
+        except Exception as e:
+            logger.error(f"Logout error: {str(e)}")
+            return JsonResponse({'error': 'Logout failed'}, status=500)
+
+    return JsonResponse({'error': 'Method not allowed. Use POST.'}, status=405)
+
+
 @csrf_exempt
 @jwt_required
 def get_users(request):
@@ -253,9 +348,9 @@ def switch_shop(request, shop_id):
             if not shop.manager or str(caller_account.phone) != str(shop.manager.phone):
                 return JsonResponse({'error': 'You do not manage this shop'}, status=403)
 
-            # generate token with manager as account and shop as context
-            token = generate_token(account_phone=caller_account.phone, shop_id=shop.shop_id)
-            return JsonResponse({'success': True, 'token': token, 'shop': {'shop_id': shop.shop_id, 'shopname': shop.shopname, 'manager': shop.manager.phone if shop.manager else None}}, status=200)
+            # Tokens with the manager as account and the shop as context
+            tokens = issue_tokens_for(caller_account, shop.shop_id)
+            return JsonResponse({'success': True, **tokens, 'shop': {'shop_id': shop.shop_id, 'shopname': shop.shopname, 'manager': shop.manager.phone if shop.manager else None}}, status=200)
         except Exception as e:
             logger.error(f"Error switching shop: {str(e)}")
             return JsonResponse({'error': 'Failed to switch shop'}, status=500)
@@ -296,11 +391,17 @@ def add_staff(request, shop_id):
             if Staff.objects.filter(phone=phone, shop=shop).exists():
                 return JsonResponse({'error': 'Staff already exists for this shop'}, status=400)
 
-            hashed = make_password(password)
-            staff = Staff.objects.create(phone=phone, name=name, password=hashed, shop=shop)
+            hashed = hash_password(password)
+            # A staff member added back continues above their old epoch, so
+            # tokens from before the removal stay revoked
+            staff = Staff.objects.create(phone=phone, name=name, password=hashed, shop=shop,
+                                         token_epoch=staff_start_epoch(phone))
+            invalidate_account(staff.phone, shop.shop_id)
             return JsonResponse({'message': 'Staff added', 'phone': staff.phone, 'shop_id': shop.shop_id}, status=201)
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except HashingBusy:
+            return _hashing_busy_response()
         except Exception as e:
             logger.error(f"Error adding staff: {str(e)}")
             return JsonResponse({'error': 'Failed to add staff'}, status=500)
@@ -330,6 +431,8 @@ def remove_staff(request, shop_id, staff_phone):
             try:
                 staff = Staff.objects.get(phone=staff_phone, shop=shop)
                 staff.delete()
+                invalidate_account(staff_phone, shop.shop_id)
+                revoke_removed_staff_tokens(staff_phone, staff.token_epoch)
                 return JsonResponse({'message': 'Staff removed'}, status=200)
             except Staff.DoesNotExist:
                 return JsonResponse({'error': 'Staff not found'}, status=404)
@@ -367,11 +470,16 @@ def update_shop(request, shop_id):
             if 'shopname' in data:
                 shop.shopname = data['shopname']
                 updated = True
+
+            if 'city' in data:
+                shop.city = (data['city'] or '').strip()
+                updated = True
             
             if not updated:
                 return JsonResponse({'error': 'No fields to update'}, status=400)
             
             shop.save()
+            invalidate_shop(shop.shop_id)
             return JsonResponse({'message': 'Shop updated successfully'}, status=200)
 
         except json.JSONDecodeError:
@@ -402,6 +510,8 @@ def delete_shop(request, shop_id):
                 return JsonResponse({'error': 'Permission denied'}, status=403)
 
             shop.delete()
+            invalidate_shop(shop_id)
+            revoke_shop_tokens(shop_id)
             return JsonResponse({'message': 'Shop deleted successfully'}, status=200)
 
         except Exception as e:
@@ -431,7 +541,8 @@ def add_shop(request):
             # Create new shop for this manager
             shop = Shop.objects.create(
                 shopname=shopname,
-                manager=caller_account
+                manager=caller_account,
+                city=(data.get('city') or '').strip()
             )
 
             return JsonResponse({
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config, Csv
 import dj_database_url
 
@@ -61,6 +62,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -139,6 +141,30 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing for Manager/Staff accounts (api.passwords).
+# HASHER: "argon2" (requires argon2-cffi), "scrypt" or "pbkdf2". Hashes made
+# with another hasher or other costs are rehashed on the next login.
+# MAX_CONCURRENT bounds simultaneous hashes per process; a request waiting
+# longer than ACQUIRE_TIMEOUT seconds gets a 503.
+PASSWORD_HASHING = {
+    "HASHER": config("PASSWORD_HASHER", default="argon2"),
+    "PBKDF2_ITERATIONS": config("PBKDF2_ITERATIONS", default=1_000_000, cast=int),
+    "SCRYPT_WORK_FACTOR": config("SCRYPT_WORK_FACTOR", default=2**14, cast=int),
+    "ARGON2_TIME_COST": config("ARGON2_TIME_COST", default=2, cast=int),
+    "ARGON2_MEMORY_COST": config("ARGON2_MEMORY_COST", default=19456, cast=int),
+    "ARGON2_PARALLELISM": config("ARGON2_PARALLELISM", default=1, cast=int),
+    "MAX_CONCURRENT": config("PASSWORD_HASHING_MAX_CONCURRENT", default=2, cast=int),
+    "ACQUIRE_TIMEOUT": config("PASSWORD_HASHING_ACQUIRE_TIMEOUT", default=5, cast=float),
+}
+_PASSWORD_HASHERS = {
+    "argon2": "api.passwords.Argon2PasswordHasher",
+    "scrypt": "api.passwords.ScryptPasswordHasher",
+    "pbkdf2": "api.passwords.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHING["HASHER"]]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHING["HASHER"]
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -177,3 +203,125 @@ if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
     SECURE_CONTENT_TYPE_NOSNIFF = True
     X_FRAME_OPTIONS = "DENY"
+
+# Django caches. "catalog" holds each shop's serialized product/batch lists
+# and search results (api.catalog_cache). Local memory suits a single
+# process. Share one across workers with the file-based backend
+# (django.core.cache.backends.filebased.FileBasedCache, LOCATION a directory)
+# or Redis (django.core.cache.backends.redis.RedisCache, LOCATION
+# redis://host:6379/1, requires the redis package).
+# "shared" holds state every worker process must see the same way: cached
+# token identities and their invalidations, token revocations and request
+# metrics. The file-based default covers the gunicorn workers of one host;
+# use Redis when running several hosts.
+CATALOG_CACHE_BACKEND = config("CATALOG_CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache")
+SHARED_CACHE_BACKEND = config("SHARED_CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": SHARED_CACHE_BACKEND,
+        "LOCATION": config("SHARED_CACHE_LOCATION", default=os.path.join(tempfile.gettempdir(), "medical_shop_cache")),
+        "OPTIONS": {} if "redis" in SHARED_CACHE_BACKEND.lower() else {
+            "MAX_ENTRIES": config("SHARED_CACHE_MAX_ENTRIES", default=10000, cast=int),
+        },
+    },
+    "catalog": {
+        "BACKEND": CATALOG_CACHE_BACKEND,
+        "LOCATION": config("CATALOG_CACHE_LOCATION", default="catalog"),
+        # Redis evicts by its own maxmemory policy and rejects this option
+        "OPTIONS": {} if "redis" in CATALOG_CACHE_BACKEND.lower() else {
+            "MAX_ENTRIES": config("CATALOG_CACHE_MAX_ENTRIES", default=5000, cast=int),
+        },
+    },
+}
+CATALOG_CACHE = {
+    "ENABLED": config("CATALOG_CACHE_ENABLED", default=True, cast=bool),
+    "CACHE_ALIAS": "catalog",
+    "TTL": config("CATALOG_CACHE_TTL", default=3600, cast=int),
+}
+
+# Access/refresh tokens (api.auth). Access tokens carry role, shops and a
+# revocation epoch and are checked against the revocation set: rows of
+# api_token_revocation fronted by the REVOCATION_CACHE alias ("shared", so
+# revocations reach every worker at once), so only a cache miss costs a
+# query. ACCEPT_LEGACY keeps accepting the old account/shop-only
+# tokens until they expire; they are resolved from the database and rejected
+# after a logout or once the account left the shop.
+AUTH_TOKENS = {
+    "ACCESS_TTL": config("ACCESS_TOKEN_TTL", default=900, cast=int),
+    "REFRESH_TTL": config("REFRESH_TOKEN_TTL", default=7 * 24 * 3600, cast=int),
+    "ACCEPT_LEGACY": config("ACCEPT_LEGACY_TOKENS", default=True, cast=bool),
+    "REVOCATION_CACHE": "shared",
+}
+
+# Identity cache used by api.auth.jwt_required to avoid resolving a legacy
+# token's shop/account from the database on every request.
+# BACKEND: "django" (CACHES alias, "shared" so that removing staff or a shop
+# takes effect in every worker), "local" (in-process LRU; only for a single
+# worker process, other workers keep stale entries for up to TTL) or "none"
+IDENTITY_CACHE = {
+    "BACKEND": config("IDENTITY_CACHE_BACKEND", default="django"),
+    "TTL": config("IDENTITY_CACHE_TTL", default=60, cast=int),
+    "MAX_ENTRIES": config("IDENTITY_CACHE_MAX_ENTRIES", default=1024, cast=int),
+    "CACHE_ALIAS": config("IDENTITY_CACHE_ALIAS", default="shared"),
+}
+
+# In-process autocomplete index used by get_medicine_suggestions (api.suggestions).
+# TTL bounds how long another worker's stock/price changes can go unseen.
+SUGGESTION_INDEX = {
+    "TTL": config("SUGGESTION_INDEX_TTL", default=300, cast=int),
+    "MAX_SHOPS": config("SUGGESTION_INDEX_MAX_SHOPS", default=64, cast=int),
+}
+
+# Where get_dashboard_stats reads order figures from: "live" aggregates the
+# api_order table, "rollup" reads the incrementally maintained ShopDailyStats.
+DASHBOARD_STATS_SOURCE = config("DASHBOARD_STATS_SOURCE", default="live")
+
+# Server-sent events pushed from /api/events/ (api.events); only served under
+# ASGI (startup.sh runs gunicorn with uvicorn workers).
+# BROKER: "local" (in-process pub/sub, which only reaches streams on the
+# worker that made the write, so a single worker), "redis" (default when
+# REDIS_URL is set) or a dotted path to a broker class.
+REDIS_URL = config("REDIS_URL", default="")
+SHOP_EVENTS = {
+    "BROKER": config("SHOP_EVENTS_BROKER", default="redis" if REDIS_URL else "local"),
+    "REDIS_URL": config("SHOP_EVENTS_REDIS_URL", default=REDIS_URL or "redis://localhost:6379/0"),
+    "LOW_STOCK_THRESHOLD": config("LOW_STOCK_THRESHOLD", default=10, cast=int),
+    "KEEPALIVE": config("SHOP_EVENTS_KEEPALIVE", default=15, cast=int),
+}
+
+# Per-endpoint query counts and timings (api.metrics): Server-Timing headers
+# and /api/_metrics for Prometheus (Bearer METRICS_TOKEN; DEBUG only if unset).
+# QUERY_BUDGETS caps the queries per request by URL name; BUDGET_ACTION "log"
+# logs a warning when one is exceeded, "raise" fails the request (for tests).
+# Each worker copies its totals to CACHE_ALIAS every PUBLISH_INTERVAL seconds,
+# so any worker can serve all of them, labelled by worker.
+REQUEST_METRICS = {
+    "ENABLED": config("REQUEST_METRICS_ENABLED", default=True, cast=bool),
+    "SERVER_TIMING": config("SERVER_TIMING", default=True, cast=bool),
+    "TOKEN": config("METRICS_TOKEN", default=""),
+    "BUDGET_ACTION": config("QUERY_BUDGET_ACTION", default="log"),
+    "CACHE_ALIAS": "shared",
+    "PUBLISH_INTERVAL": config("METRICS_PUBLISH_INTERVAL", default=5, cast=int),
+    # Worst case of each endpoint, measured by api.tests.test_query_budgets:
+    # cold caches and a legacy token (3 identity lookups and 1 revocation
+    # lookup), without the SAVEPOINT/RELEASE pairs a test transaction would add
+    "QUERY_BUDGETS": {
+        "login_user": 2,
+        "search_medicines_with_batches": 6,
+        "get_medicine_suggestions": 6,
+        "create_order": 8,
+        "add_order_items": 16,
+        "add_payment": 9,
+        "checkout": 20,
+        "get_orders": 7,
+        "dashboard_stats": 8,
+        "expiring_soon": 6,
+        "expiry_summary": 11,  # recomputes the day's buckets on its first call
+        "low_stock": 6,
+        "low_stock_products": 7,
+        "sales_data": 6,
+    },
+}
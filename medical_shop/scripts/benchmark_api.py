@@ -0,0 +1,265 @@
+"""
+Benchmark the billing hot path end to end through the Django test client.
+
+Creates a separate test database (test_<NAME>, like manage.py test) and fills
+it at a fixed scale with the synthetic generator (api.synthetic). It then
+drives login, search, suggestions, the checkout flow (create_order ->
+add_order_items -> add_payment, and the one-call checkout), get_orders and
+the dashboard endpoints in-process. For each it records latency percentiles,
+throughput and SQL queries per request. Results are written as JSON; pass an
+earlier file with --compare to flag regressions.
+
+Requests are issued one at a time, so throughput is per single client.
+Against MySQL the configured user needs permission to create the test
+database; --keepdb reuses it (and its fixture) between runs.
+
+Usage: python scripts/benchmark_api.py [--scale small|medium|large] [--requests N]
+       [--output FILE] [--compare BASELINE] [--threshold 0.2] [--keepdb]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+import django
+import numpy as np
+
+# Ensure project root is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "medical_shop.settings")
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from api import synthetic
+from api.models import Batch, Order, OrderItem, Product, Shop
+
+# scale -> generate_synthetic_data options
+SCALES = {
+    "small": {"shops": 2, "products": 500, "orders": 20_000},
+    "medium": {"shops": 4, "products": 2_000, "orders": 200_000},
+    "large": {"shops": 8, "products": 10_000, "orders": 1_000_000},
+}
+SEED = 2024
+PASSWORD = "benchmark"
+SEARCH_TERMS = ["para", "amox", "vitamin", "ceti", "omep", "dolo", "metf", "ibu", "azith", "pan"]
+PERCENTILES = [50, 90, 95, 99]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the billing API in-process.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint")
+    parser.add_argument("--login-requests", type=int, help="Measured logins (default requests / 10; hashing is slow)")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p95 slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--keepdb", action="store_true", help="Keep the test database and fixture for the next run")
+    return parser.parse_args()
+
+
+class Recorder:
+    """Times client requests and counts their queries, per endpoint name."""
+
+    def __init__(self, client, token):
+        self.client = client
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        self.samples = defaultdict(list)  # name -> [(seconds, queries, ok)]
+        self.measuring = True
+
+    def request(self, name, method, path, data=None, auth=True):
+        headers = self.headers if auth else {}
+        kwargs = {"data": json.dumps(data), "content_type": "application/json"} if data is not None else {}
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, **kwargs, **headers)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        if self.measuring:
+            self.samples[name].append((elapsed, len(queries), response.status_code < 400))
+        return response
+
+    def record(self, name, seconds, queries, ok):
+        if self.measuring:
+            self.samples[name].append((seconds, queries, ok))
+
+
+def build_fixture(scale):
+    if Shop.objects.filter(shopname__startswith=synthetic.SHOP_NAME_PREFIX).exists():
+        print("Reusing the existing fixture")
+        return
+    print(f"Generating the {scale} fixture...")
+    synthetic.generate(seed=SEED, password=PASSWORD, log=lambda message: None, **SCALES[scale])
+
+
+def pick_baskets(shop, count, rng):
+    """Baskets of 1-3 in-stock batches; quantities of 1 keep stock from running out."""
+    batches = list(
+        Batch.objects.filter(shop=shop, quantity_in_stock__gte=100)
+        .order_by("-quantity_in_stock")
+        .values("id", "product__product_id", "selling_price")[:300]
+    )
+    baskets = []
+    for _ in range(count):
+        lines = rng.sample(batches, rng.randint(1, min(3, len(batches))))
+        items = [{"product_id": b["product__product_id"], "batch_id": b["id"], "quantity": 1,
+                  "unit_price": float(b["selling_price"])} for b in lines]
+        baskets.append((items, round(sum(i["unit_price"] for i in items), 2)))
+    return baskets
+
+
+def checkout_flow(rec, items, total):
+    """The three-call billing flow, recorded per step and as a whole."""
+    before = {name: len(rec.samples[name]) for name in ("create_order", "add_order_items", "add_payment")}
+    order = rec.request("create_order", "post", "/api/orders/create/",
+                        {"customer_name": "Bench", "total_amount": total, "discount_percentage": 0})
+    order_id = order.json().get("order_id")
+    rec.request("add_order_items", "post", "/api/order-items/", {"order_id": order_id, "items": items})
+    rec.request("add_payment", "post", "/api/payments/add/",
+                {"payments": [{"payment_type": "UPI", "transaction_amount": total}]})
+    if rec.measuring:
+        steps = [rec.samples[name][before[name]] for name in before]
+        rec.record("checkout_flow", sum(s[0] for s in steps), sum(s[1] for s in steps), all(s[2] for s in steps))
+
+
+def workloads(rec, shop, phone, rng, args):
+    """(name, count, callable(i)) for every benchmarked endpoint."""
+    baskets = pick_baskets(shop, 2 * (args.requests + args.warmup), rng)
+    terms = SEARCH_TERMS
+    login_count = args.login_requests or max(args.requests // 10, 5)
+    return [
+        ("login", login_count, lambda i: rec.request("login", "post", "/api/login/",
+                                                     {"phone": phone, "password": PASSWORD}, auth=False)),
+        ("search", args.requests, lambda i: rec.request("search", "get", f"/api/search/medicines/?search={terms[i % len(terms)]}")),
+        ("suggestions", args.requests, lambda i: rec.request("suggestions", "get", f"/api/search/suggestions/?q={terms[i % len(terms)]}")),
+        ("checkout_flow", args.requests, lambda i: checkout_flow(rec, *baskets[i])),
+        ("checkout", args.requests, lambda i: rec.request("checkout", "post", "/api/checkout/", {
+            "order": {"customer_name": "Bench", "total_amount": baskets[-1 - i][1]},
+            "items": baskets[-1 - i][0],
+            "payments": [{"payment_type": "CASH", "transaction_amount": baskets[-1 - i][1]}],
+        })),
+        ("get_orders", args.requests, lambda i: rec.request("get_orders", "get", "/api/orders/")),
+        ("dashboard_stats", args.requests, lambda i: rec.request("dashboard_stats", "get", "/api/dashboard/stats/")),
+        ("expiring_soon", args.requests, lambda i: rec.request("expiring_soon", "get", "/api/dashboard/expiring-soon/")),
+        ("expiry_summary", args.requests, lambda i: rec.request("expiry_summary", "get", "/api/dashboard/expiry-summary/")),
+        ("low_stock", args.requests, lambda i: rec.request("low_stock", "get", "/api/dashboard/low-stock/")),
+        ("low_stock_products", args.requests, lambda i: rec.request("low_stock_products", "get", "/api/dashboard/low-stock-products/")),
+        ("sales", args.requests, lambda i: rec.request("sales", "get", "/api/dashboard/sales/?days=30")),
+    ]
+
+
+def summarize(samples):
+    seconds = np.array([s[0] for s in samples])
+    queries = np.array([s[1] for s in samples])
+    latency = {"mean": seconds.mean() * 1000, **{f"p{p}": np.percentile(seconds, p) * 1000 for p in PERCENTILES},
+               "max": seconds.max() * 1000}
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s[2]),
+        "throughput_rps": round(len(samples) / seconds.sum(), 2),
+        "latency_ms": {k: round(float(v), 3) for k, v in latency.items()},
+        "queries": {"mean": round(float(queries.mean()), 2), "max": int(queries.max())},
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print p50/p95/query changes against a baseline; returns flagged endpoint names."""
+    flagged = []
+    print(f"\n{'endpoint':<20}{'p50 ms':>18}{'p95 ms':>18}{'queries':>14}")
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        p50 = (before["latency_ms"]["p50"], current["latency_ms"]["p50"])
+        p95 = (before["latency_ms"]["p95"], current["latency_ms"]["p95"])
+        queries = (before["queries"]["mean"], current["queries"]["mean"])
+        slower = p95[1] > p95[0] * (1 + threshold)
+        more_queries = queries[1] > queries[0]
+        if slower or more_queries:
+            flagged.append(name)
+        print(f"{name:<20}{p50[0]:>8.2f} -> {p50[1]:<7.2f}{p95[0]:>8.2f} -> {p95[1]:<7.2f}"
+              f"{queries[0]:>5.1f} -> {queries[1]:<5.1f}{'  REGRESSION' if slower or more_queries else ''}")
+    return flagged
+
+
+def main():
+    args = parse_args()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=args.keepdb, serialize=False)
+    try:
+        build_fixture(args.scale)
+        shop = Shop.objects.filter(shopname__startswith=synthetic.SHOP_NAME_PREFIX).order_by("shop_id").first()
+        phone = shop.manager.phone
+
+        def login():
+            return Client().post("/api/login/", json.dumps({"phone": phone, "password": PASSWORD}),
+                                 content_type="application/json").json()["token"]
+
+        rec = Recorder(Client(), login())
+        rng = random.Random(SEED)
+        started = time.perf_counter()
+        for name, count, call in workloads(rec, shop, phone, rng, args):
+            # Access tokens are short-lived; take a fresh one per endpoint
+            rec.headers = {"HTTP_AUTHORIZATION": f"Bearer {login()}"}
+            rec.measuring = False
+            for i in range(min(args.warmup, count)):
+                call(count + i)
+            rec.measuring = True
+            for i in range(count):
+                call(i)
+            print(f"  {name}: {count} requests")
+        elapsed = time.perf_counter() - started
+
+        results = {name: summarize(samples) for name, samples in rec.samples.items()}
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "scale": args.scale,
+                "fixture": {
+                    "shops": Shop.objects.count(),
+                    "products": Product.objects.count(),
+                    "orders": Order.objects.count(),
+                    "order_items": OrderItem.objects.count(),
+                },
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "requests_per_endpoint": args.requests,
+                "wall_seconds": round(elapsed, 2),
+            },
+            "results": results,
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+        teardown_test_environment()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'endpoint':<20}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'errors':>8}")
+    for name, r in results.items():
+        print(f"{name:<20}{r['throughput_rps']:>9.1f}{r['latency_ms']['p50']:>10.2f}{r['latency_ms']['p95']:>10.2f}"
+              f"{r['latency_ms']['p99']:>10.2f}{r['queries']['mean']:>9.1f}{r['errors']:>8}")
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            flagged = compare(results, json.load(f), args.threshold)
+        if flagged:
+            print(f"\nRegressions: {', '.join(flagged)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark demand-forecast training (api.forecast) on synthetic order items.
+
+Generates N order-item rows as columns (shop, generic name, month, units)
+spread over S shops and G generic names, then times the NumPy stages:
+build_series (aggregation), fit_seasonal and top_forecasts. No database rows
+are written; loading from the database is not included.
+
+Usage: python scripts/benchmark_forecast.py [items] [shops] [generics] [repeats]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+import django
+import numpy as np
+
+# Ensure project root is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "medical_shop.settings")
+django.setup()
+
+from api import forecast
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SHOPS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+GENERICS = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+REPEATS = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+MONTHS = forecast.HISTORY_MONTHS
+
+
+def synthetic_items(rng):
+    first_month = forecast.month_index(2023, 1)
+    # Skewed popularity so a few salts dominate, with a summer peak for some
+    generic_ids = np.minimum(rng.zipf(1.3, ITEMS) - 1, GENERICS - 1)
+    names = np.array([f"Generic {i}" for i in range(GENERICS)], dtype=object)[generic_ids]
+    shops = rng.integers(1, SHOPS + 1, ITEMS)
+    months = first_month + rng.integers(0, MONTHS, ITEMS)
+    summer = ((months % 12) >= 5) & ((months % 12) <= 7) & (generic_ids % 7 == 0)
+    units = rng.integers(1, 6, ITEMS) * np.where(summer, 3, 1)
+    return first_month, shops.astype(np.int64), names, months.astype(np.int64), units.astype(np.float64)
+
+
+def timed(label, fn):
+    best = None
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<16} best of {REPEATS}: {best * 1000:9.1f} ms")
+    return best, result
+
+
+rng = np.random.default_rng(42)
+print(f"Generating {ITEMS:,} order items over {SHOPS} shops, {GENERICS} generics, {MONTHS} months...")
+first_month, shops, names, months, units = synthetic_items(rng)
+
+build, (series_shop, series_name, matrix) = timed(
+    "build_series", lambda: forecast.build_series(shops, names, months, units, first_month, MONTHS)
+)
+fit, prediction = timed("fit_seasonal", lambda: forecast.fit_seasonal(matrix, first_month))
+rank, rows = timed("top_forecasts", lambda: list(forecast.top_forecasts(series_shop, series_name, prediction)))
+
+print(f"{len(matrix):,} series, {len(rows):,} forecast rows")
+print(f"Total: {(build + fit + rank) * 1000:.1f} ms ({ITEMS / (build + fit + rank):,.0f} items/s)")
@@ -0,0 +1,117 @@
+"""
+Benchmark the get_orders serializer: model-instance prefetch vs values() projection.
+
+Creates a throwaway shop with N orders inside a transaction that is rolled
+back at the end, so it can be pointed at a development database safely.
+
+Usage: python scripts/benchmark_order_serializer.py [orders] [items_per_order] [repeats]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+import django
+
+# Ensure project root is on sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "medical_shop.settings")
+django.setup()
+
+from django.db import transaction
+from django.db.models import Prefetch
+from api.models import Manager, Shop, Product, Batch, Order, OrderItem
+from api.views.order_views import serialize_orders
+
+ORDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+ITEMS_PER_ORDER = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+REPEATS = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+
+def legacy_serialize(orders):
+    """The previous implementation: model instances and per-field Decimal->float."""
+    orders = orders.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('batch__product'))
+    )
+    results = []
+    for order in orders:
+        order_data = {
+            'order_id': order.order_id,
+            'customer_name': order.customer_name,
+            'customer_number': order.customer_number,
+            'doctor_name': order.doctor_name,
+            'total_amount': float(order.total_amount) if order.total_amount else 0,
+            'discount_percentage': float(order.discount_percentage) if order.discount_percentage else 0,
+            'order_date': order.order_date.isoformat() if order.order_date else None,
+            'items': []
+        }
+        for item in order.items.all():
+            order_data['items'].append({
+                'quantity': item.quantity,
+                'unit_price': float(item.unit_price) if item.unit_price else 0,
+                'medicine_name': item.batch.product.generic_name,
+                'brand_name': item.batch.product.brand_name,
+                'gst': float(item.batch.product.gst) if item.batch.product.gst else 0,
+                'batch_number': item.batch.batch_number,
+                'amount': float(item.quantity * item.unit_price) if item.quantity and item.unit_price else 0
+            })
+        results.append(order_data)
+    return results
+
+
+def populate():
+    manager = Manager.objects.create(phone="0000000000", name="Benchmark", password="!")
+    shop = Shop.objects.create(shopname="Benchmark Shop", manager=manager)
+    products = Product.objects.bulk_create([
+        Product(product_id=f"B{i:05d}", shop=shop, generic_name=f"Generic {i}", brand_name=f"Brand {i}", gst=Decimal("12.00"))
+        for i in range(200)
+    ])
+    batches = Batch.objects.bulk_create([
+        Batch(batch_number=f"BN{i:05d}", product=p, shop=shop, expiry_date=date.today() + timedelta(days=365),
+              average_purchase_price=Decimal("5.00"), selling_price=Decimal("9.50"), quantity_in_stock=1000)
+        for i, p in enumerate(products)
+    ])
+    orders = Order.objects.bulk_create([
+        Order(shop=shop, customer_name=f"Customer {i}", total_amount=Decimal("100.00"))
+        for i in range(ORDERS)
+    ], batch_size=1000)
+    if orders[0].order_id is None:
+        # Backends without RETURNING on bulk inserts
+        orders = list(Order.objects.filter(shop=shop).order_by("order_id"))
+    rng = random.Random(42)
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, batch=batch, quantity=rng.randint(1, 5), unit_price=batch.selling_price)
+        for order in orders
+        for batch in rng.sample(batches, ITEMS_PER_ORDER)
+    ], batch_size=2000)
+    return shop
+
+
+def timed(label, fn):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<22} best of {REPEATS}: {best * 1000:9.1f} ms")
+    return best
+
+
+with transaction.atomic():
+    print(f"Populating {ORDERS} orders x {ITEMS_PER_ORDER} items...")
+    shop = populate()
+    orders = Order.objects.filter(shop=shop).order_by("-order_date", "-order_id")
+
+    assert len(legacy_serialize(orders)) == len(serialize_orders(orders)) == ORDERS
+
+    legacy = timed("legacy (prefetch)", lambda: legacy_serialize(orders))
+    current = timed("values() projection", lambda: serialize_orders(orders))
+    print(f"Speedup: {legacy / current:.2f}x")
+
+    transaction.set_rollback(True)
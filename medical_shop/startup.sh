@@ -32,4 +32,12 @@ fi
 echo "[startup] Starting Gunicorn..."
 PORT=${PORT:-8000}
 GUNICORN_WORKERS=${GUNICORN_WORKERS:-3}
-exec gunicorn medical_shop.wsgi:application --bind 0.0.0.0:${PORT} --workers ${GUNICORN_WORKERS} --log-file -
+
+# Live dashboard events (/api/events/) only reach other workers through Redis
+if [ "${GUNICORN_WORKERS}" -gt 1 ] && [ -z "${REDIS_URL-}" ] && [ "${SHOP_EVENTS_BROKER:-local}" = "local" ]; then
+  echo "[startup] WARNING: ${GUNICORN_WORKERS} workers without REDIS_URL; live events only reach streams on the worker that made the change"
+fi
+
+# ASGI with uvicorn workers: an open event stream waits on the event loop
+# instead of holding a worker
+exec gunicorn medical_shop.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:${PORT} --workers ${GUNICORN_WORKERS} --log-file -